@@ -0,0 +1,111 @@
+"""add conflict sweep tables
+
+Revision ID: 003
+Revises: 002
+Create Date: 2025-02-03
+
+This migration adds:
+- barridos_conflictos table (firm-wide conflict sweep runs + checkpoint)
+- coincidencias_barrido table (sweep report rows)
+"""
+
+from typing import Sequence, Union
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy import text
+
+
+revision: str = '003'
+down_revision: Union[str, None] = '002'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def table_exists(table_name: str) -> bool:
+    """Check if a table exists."""
+    conn = op.get_bind()
+    result = conn.execute(text(
+        "SELECT EXISTS (SELECT FROM information_schema.tables WHERE table_name = :name)"
+    ), {"name": table_name})
+    return result.scalar()
+
+
+def upgrade() -> None:
+    """Create conflict sweep tables."""
+
+    print("\n" + "=" * 60)
+    print("Professional Hubs - Conflict Sweep Migration")
+    print("=" * 60 + "\n")
+
+    # ==========================================================================
+    # CREATE BARRIDOS_CONFLICTOS TABLE
+    # ==========================================================================
+    if not table_exists('barridos_conflictos'):
+        op.execute(text("""
+            CREATE TABLE barridos_conflictos (
+                id SERIAL PRIMARY KEY,
+                firma_id INTEGER NOT NULL REFERENCES firmas(id) ON DELETE CASCADE,
+                estado VARCHAR(20) NOT NULL DEFAULT 'PENDIENTE',
+                umbral INTEGER NOT NULL,
+                ultimo_cliente_id INTEGER NOT NULL DEFAULT 0,
+                clientes_procesados INTEGER NOT NULL DEFAULT 0,
+                pares_evaluados INTEGER NOT NULL DEFAULT 0,
+                coincidencias_encontradas INTEGER NOT NULL DEFAULT 0,
+                iniciado_en TIMESTAMP,
+                finalizado_en TIMESTAMP,
+                error TEXT,
+                esta_activo BOOLEAN NOT NULL DEFAULT true,
+                creado_en TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+                actualizado_en TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+            )
+        """))
+        op.execute(text("CREATE INDEX ix_barridos_conflictos_id ON barridos_conflictos(id)"))
+        op.execute(text("CREATE INDEX ix_barridos_conflictos_firma_id ON barridos_conflictos(firma_id)"))
+        op.execute(text("CREATE INDEX ix_barridos_firma_estado ON barridos_conflictos(firma_id, estado)"))
+        print("  + Created: barridos_conflictos")
+    else:
+        print("  - Exists: barridos_conflictos")
+
+    # ==========================================================================
+    # CREATE COINCIDENCIAS_BARRIDO TABLE
+    # ==========================================================================
+    if not table_exists('coincidencias_barrido'):
+        op.execute(text("""
+            CREATE TABLE coincidencias_barrido (
+                id SERIAL PRIMARY KEY,
+                barrido_id INTEGER NOT NULL REFERENCES barridos_conflictos(id) ON DELETE CASCADE,
+                firma_id INTEGER NOT NULL,
+                tipo_coincidencia VARCHAR(30) NOT NULL,
+                cliente_id INTEGER NOT NULL,
+                cliente_nombre VARCHAR(500) NOT NULL,
+                parte_id INTEGER,
+                asunto_id INTEGER,
+                otro_cliente_id INTEGER,
+                contraparte_nombre VARCHAR(500) NOT NULL,
+                tipo_relacion VARCHAR(30),
+                similitud_score DOUBLE PRECISION NOT NULL,
+                nivel_confianza VARCHAR(10) NOT NULL,
+                creado_en TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+            )
+        """))
+        op.execute(text("CREATE INDEX ix_coincidencias_barrido_id ON coincidencias_barrido(id)"))
+        op.execute(text("CREATE INDEX ix_coincidencias_barrido_barrido_id ON coincidencias_barrido(barrido_id)"))
+        op.execute(text("CREATE INDEX ix_coincidencias_barrido_score ON coincidencias_barrido(barrido_id, similitud_score)"))
+        op.execute(text("CREATE INDEX ix_coincidencias_barrido_cliente ON coincidencias_barrido(barrido_id, cliente_id)"))
+        print("  + Created: coincidencias_barrido")
+    else:
+        print("  - Exists: coincidencias_barrido")
+
+    print("\n" + "=" * 60)
+    print("Migration Complete!")
+    print("=" * 60 + "\n")
+
+
+def downgrade() -> None:
+    """Drop conflict sweep tables."""
+    conn = op.get_bind()
+
+    for table in ['coincidencias_barrido', 'barridos_conflictos']:
+        if table_exists(table):
+            conn.execute(text(f"DROP TABLE {table} CASCADE"))
+            print(f"  - Dropped: {table}")
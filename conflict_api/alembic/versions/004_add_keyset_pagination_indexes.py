@@ -0,0 +1,45 @@
+"""add keyset pagination indexes
+
+Revision ID: 004
+Revises: 003
+Create Date: 2025-02-10
+
+This migration adds indexes that back keyset (cursor) pagination
+on the list endpoints:
+- clientes (firma_id, esta_activo, id) and (firma_id, esta_activo, creado_en, id)
+- asuntos (creado_en, id)
+- partes_relacionadas (creado_en, id)
+"""
+
+from typing import Sequence, Union
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy import text
+
+
+revision: str = '004'
+down_revision: Union[str, None] = '003'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+INDEXES = [
+    ("ix_clientes_firma_activo_id", "clientes", "firma_id, esta_activo, id"),
+    ("ix_clientes_firma_activo_creado", "clientes", "firma_id, esta_activo, creado_en, id"),
+    ("ix_asuntos_creado_id", "asuntos", "creado_en, id"),
+    ("ix_partes_creado_id", "partes_relacionadas", "creado_en, id"),
+]
+
+
+def upgrade() -> None:
+    """Create keyset pagination indexes."""
+    for name, table, columns in INDEXES:
+        op.execute(text(f"CREATE INDEX IF NOT EXISTS {name} ON {table}({columns})"))
+        print(f"  + Index: {name}")
+
+
+def downgrade() -> None:
+    """Drop keyset pagination indexes."""
+    for name, _table, _columns in INDEXES:
+        op.execute(text(f"DROP INDEX IF EXISTS {name}"))
+        print(f"  - Dropped: {name}")
@@ -0,0 +1,146 @@
+"""add billing aging aggregates
+
+Revision ID: 005
+Revises: 004
+Create Date: 2025-02-17
+
+This migration adds:
+- billing_aging_firma table (one precomputed dashboard row per firm:
+  outstanding totals and aging buckets 0-30 / 30-60 / 60+ days)
+- trigger on invoices that applies each change to the firm's row
+
+Buckets are relative to billing_aging_firma.calculado_para; the daily
+scheduler recomputes every firm when the date rolls over.
+"""
+
+from typing import Sequence, Union
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy import text
+
+
+revision: str = '005'
+down_revision: Union[str, None] = '004'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def table_exists(table_name: str) -> bool:
+    """Check if a table exists."""
+    conn = op.get_bind()
+    result = conn.execute(text(
+        "SELECT EXISTS (SELECT FROM information_schema.tables WHERE table_name = :name)"
+    ), {"name": table_name})
+    return result.scalar()
+
+
+def upgrade() -> None:
+    """Create billing aging aggregates table and invoices trigger."""
+
+    print("\n" + "=" * 60)
+    print("Professional Hubs - Billing Aging Aggregates Migration")
+    print("=" * 60 + "\n")
+
+    # ==========================================================================
+    # CREATE BILLING_AGING_FIRMA TABLE
+    # ==========================================================================
+    if not table_exists('billing_aging_firma'):
+        op.execute(text("""
+            CREATE TABLE billing_aging_firma (
+                firma_id INTEGER PRIMARY KEY REFERENCES firmas(id) ON DELETE CASCADE,
+                calculado_para DATE NOT NULL,
+                total_invoices INTEGER NOT NULL DEFAULT 0,
+                total_outstanding NUMERIC(14, 2) NOT NULL DEFAULT 0,
+                bucket_0_30_count INTEGER NOT NULL DEFAULT 0,
+                bucket_0_30_amount NUMERIC(14, 2) NOT NULL DEFAULT 0,
+                bucket_30_60_count INTEGER NOT NULL DEFAULT 0,
+                bucket_30_60_amount NUMERIC(14, 2) NOT NULL DEFAULT 0,
+                bucket_60_plus_count INTEGER NOT NULL DEFAULT 0,
+                bucket_60_plus_amount NUMERIC(14, 2) NOT NULL DEFAULT 0,
+                actualizado_en TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+            )
+        """))
+        print("  + Created: billing_aging_firma")
+    else:
+        print("  - Exists: billing_aging_firma")
+
+    # ==========================================================================
+    # INCREMENTAL REFRESH TRIGGER
+    # ==========================================================================
+    # Aplica +1/-1 factura al bucket que le corresponde según la fecha del
+    # snapshot. Si el bufete no tiene snapshot no hace nada: el dashboard
+    # calcula en vivo hasta que el scheduler lo crea.
+    op.execute(text("""
+        CREATE OR REPLACE FUNCTION billing_aging_aplicar(
+            p_client_id INTEGER, p_amount NUMERIC, p_due_date DATE, p_signo INTEGER
+        ) RETURNS void AS $$
+        DECLARE
+            v_firma_id INTEGER;
+            v_dias INTEGER;
+        BEGIN
+            SELECT firma_id INTO v_firma_id FROM clientes WHERE id = p_client_id;
+            IF v_firma_id IS NULL THEN
+                RETURN;
+            END IF;
+
+            SELECT calculado_para - p_due_date INTO v_dias
+            FROM billing_aging_firma WHERE firma_id = v_firma_id;
+            IF v_dias IS NULL THEN
+                RETURN;
+            END IF;
+
+            UPDATE billing_aging_firma SET
+                total_invoices = total_invoices + p_signo,
+                total_outstanding = total_outstanding + p_signo * p_amount,
+                bucket_0_30_count = bucket_0_30_count + CASE WHEN v_dias < 30 THEN p_signo ELSE 0 END,
+                bucket_0_30_amount = bucket_0_30_amount + CASE WHEN v_dias < 30 THEN p_signo * p_amount ELSE 0 END,
+                bucket_30_60_count = bucket_30_60_count + CASE WHEN v_dias >= 30 AND v_dias < 60 THEN p_signo ELSE 0 END,
+                bucket_30_60_amount = bucket_30_60_amount + CASE WHEN v_dias >= 30 AND v_dias < 60 THEN p_signo * p_amount ELSE 0 END,
+                bucket_60_plus_count = bucket_60_plus_count + CASE WHEN v_dias >= 60 THEN p_signo ELSE 0 END,
+                bucket_60_plus_amount = bucket_60_plus_amount + CASE WHEN v_dias >= 60 THEN p_signo * p_amount ELSE 0 END,
+                actualizado_en = CURRENT_TIMESTAMP
+            WHERE firma_id = v_firma_id;
+        END;
+        $$ LANGUAGE plpgsql
+    """))
+
+    op.execute(text("""
+        CREATE OR REPLACE FUNCTION billing_aging_invoices_trigger() RETURNS trigger AS $$
+        BEGIN
+            IF TG_OP IN ('UPDATE', 'DELETE') AND OLD.status = 'pending' AND OLD.esta_activo THEN
+                PERFORM billing_aging_aplicar(OLD.client_id, OLD.amount, OLD.due_date, -1);
+            END IF;
+            IF TG_OP IN ('INSERT', 'UPDATE') AND NEW.status = 'pending' AND NEW.esta_activo THEN
+                PERFORM billing_aging_aplicar(NEW.client_id, NEW.amount, NEW.due_date, 1);
+            END IF;
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql
+    """))
+
+    op.execute(text("DROP TRIGGER IF EXISTS trg_invoices_billing_aging ON invoices"))
+    op.execute(text("""
+        CREATE TRIGGER trg_invoices_billing_aging
+        AFTER INSERT OR DELETE OR UPDATE OF client_id, amount, due_date, status, esta_activo
+        ON invoices
+        FOR EACH ROW EXECUTE FUNCTION billing_aging_invoices_trigger()
+    """))
+    print("  + Trigger: trg_invoices_billing_aging")
+
+    print("\n" + "=" * 60)
+    print("Migration Complete!")
+    print("=" * 60 + "\n")
+
+
+def downgrade() -> None:
+    """Drop billing aging trigger, functions and table."""
+    conn = op.get_bind()
+
+    conn.execute(text("DROP TRIGGER IF EXISTS trg_invoices_billing_aging ON invoices"))
+    conn.execute(text("DROP FUNCTION IF EXISTS billing_aging_invoices_trigger()"))
+    conn.execute(text("DROP FUNCTION IF EXISTS billing_aging_aplicar(INTEGER, NUMERIC, DATE, INTEGER)"))
+    print("  - Dropped: trg_invoices_billing_aging")
+
+    if table_exists('billing_aging_firma'):
+        conn.execute(text("DROP TABLE billing_aging_firma CASCADE"))
+        print("  - Dropped: billing_aging_firma")
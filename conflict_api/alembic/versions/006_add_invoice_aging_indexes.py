@@ -0,0 +1,48 @@
+"""add invoice aging indexes
+
+Revision ID: 006
+Revises: 005
+Create Date: 2025-02-24
+
+This migration adds partial indexes for the billing queries, which now
+filter on due_date ranges (due_date <= CURRENT_DATE - :min_days) instead
+of CURRENT_DATE - due_date expressions:
+- invoices (client_id, due_date) for pending, active invoices
+  (overdue / danger-zone listings per firm)
+- invoices (due_date) for pending, active invoices (daily scheduler scan)
+"""
+
+from typing import Sequence, Union
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy import text
+
+
+revision: str = '006'
+down_revision: Union[str, None] = '005'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# Solo facturas pendientes y activas: las pagadas no entran al índice
+PENDING = "esta_activo = true AND status = 'pending'"
+
+INDEXES = [
+    ("ix_invoices_pending_client_due", "invoices", "client_id, due_date", PENDING),
+    ("ix_invoices_pending_due", "invoices", "due_date", PENDING),
+]
+
+
+def upgrade() -> None:
+    """Create invoice aging indexes."""
+    for name, table, columns, where in INDEXES:
+        op.execute(text(f"CREATE INDEX IF NOT EXISTS {name} ON {table}({columns}) WHERE {where}"))
+        print(f"  + Index: {name}")
+    op.execute(text("ANALYZE invoices"))
+
+
+def downgrade() -> None:
+    """Drop invoice aging indexes."""
+    for name, _table, _columns, _where in INDEXES:
+        op.execute(text(f"DROP INDEX IF EXISTS {name}"))
+        print(f"  - Dropped: {name}")
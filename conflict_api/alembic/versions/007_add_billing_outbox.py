@@ -0,0 +1,89 @@
+"""add billing outbox
+
+Revision ID: 007
+Revises: 006
+Create Date: 2025-03-03
+
+This migration adds:
+- billing_outbox table (transactional outbox of reminder sends: the
+  scheduler enqueues intents, dispatch workers claim them with
+  FOR UPDATE SKIP LOCKED, send, and retry with exponential backoff)
+- partial index over open rows (PENDING / PROCESSING) for the claim query
+"""
+
+from typing import Sequence, Union
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy import text
+
+
+revision: str = '007'
+down_revision: Union[str, None] = '006'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def table_exists(table_name: str) -> bool:
+    """Check if a table exists."""
+    conn = op.get_bind()
+    result = conn.execute(text(
+        "SELECT EXISTS (SELECT FROM information_schema.tables WHERE table_name = :name)"
+    ), {"name": table_name})
+    return result.scalar()
+
+
+def upgrade() -> None:
+    """Create billing outbox table and indexes."""
+
+    print("\n" + "=" * 60)
+    print("Professional Hubs - Billing Outbox Migration")
+    print("=" * 60 + "\n")
+
+    # ==========================================================================
+    # CREATE BILLING_OUTBOX TABLE
+    # ==========================================================================
+    if not table_exists('billing_outbox'):
+        op.execute(text("""
+            CREATE TABLE billing_outbox (
+                id SERIAL PRIMARY KEY,
+                invoice_id INTEGER NOT NULL REFERENCES invoices(id) ON DELETE CASCADE,
+                channel VARCHAR(20) NOT NULL,
+                reminder_level INTEGER NOT NULL,
+                days_overdue INTEGER NOT NULL,
+                payload JSONB NOT NULL,
+                status VARCHAR(20) NOT NULL DEFAULT 'PENDING',
+                attempts INTEGER NOT NULL DEFAULT 0,
+                next_attempt_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+                locked_until TIMESTAMP,
+                last_error TEXT,
+                external_id VARCHAR(255),
+                creado_en TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+                actualizado_en TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+            )
+        """))
+        print("  + Created: billing_outbox")
+    else:
+        print("  - Exists: billing_outbox")
+
+    op.execute(text("CREATE INDEX IF NOT EXISTS ix_billing_outbox_invoice_id ON billing_outbox(invoice_id)"))
+    op.execute(text("CREATE INDEX IF NOT EXISTS ix_billing_outbox_status_next ON billing_outbox(status, next_attempt_at)"))
+
+    # Solo filas abiertas: la query de claim y el filtro del scheduler
+    # nunca leen filas SENT / FAILED
+    op.execute(text("""
+        CREATE INDEX IF NOT EXISTS ix_billing_outbox_open
+        ON billing_outbox(next_attempt_at, invoice_id)
+        WHERE status IN ('PENDING', 'PROCESSING')
+    """))
+    print("  + Index: ix_billing_outbox_open")
+
+    print("\n" + "=" * 60)
+    print("Migration Complete!")
+    print("=" * 60 + "\n")
+
+
+def downgrade() -> None:
+    """Drop billing outbox table."""
+    if table_exists('billing_outbox'):
+        op.execute(text("DROP TABLE billing_outbox CASCADE"))
+        print("  - Dropped: billing_outbox")
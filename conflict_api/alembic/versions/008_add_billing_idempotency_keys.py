@@ -0,0 +1,114 @@
+"""add billing idempotency keys
+
+Revision ID: 008
+Revises: 007
+Create Date: 2025-03-10
+
+This migration adds unique indexes used as idempotency keys, so that
+concurrent or repeated scheduler runs (including manual triggers) can
+only enqueue each send once (INSERT ... ON CONFLICT DO NOTHING):
+- billing_outbox (invoice_id, reminder_level, channel)
+- billing_communication_logs (invoice_id) for active danger-zone marks
+  (reminder_sequence = 4)
+
+Existing duplicates are removed first: extra outbox rows are deleted
+(keeping the oldest) and extra danger-zone logs are soft-deleted.
+"""
+
+from typing import Sequence, Union
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy import text
+
+
+revision: str = '008'
+down_revision: Union[str, None] = '007'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def table_exists(table_name: str) -> bool:
+    """Check if a table exists."""
+    conn = op.get_bind()
+    result = conn.execute(text(
+        "SELECT EXISTS (SELECT FROM information_schema.tables WHERE table_name = :name)"
+    ), {"name": table_name})
+    return result.scalar()
+
+
+def index_exists(index_name: str) -> bool:
+    """Check if an index exists."""
+    conn = op.get_bind()
+    result = conn.execute(text(
+        "SELECT EXISTS (SELECT FROM pg_indexes WHERE indexname = :name)"
+    ), {"name": index_name})
+    return result.scalar()
+
+
+def upgrade() -> None:
+    """Deduplicate and create billing idempotency indexes."""
+
+    print("\n" + "=" * 60)
+    print("Professional Hubs - Billing Idempotency Keys Migration")
+    print("=" * 60 + "\n")
+
+    # ==========================================================================
+    # OUTBOX: one send per invoice, level and channel
+    # ==========================================================================
+    if not table_exists('billing_outbox'):
+        print("  - Missing: billing_outbox (skipped)")
+    elif index_exists('ux_billing_outbox_idempotency'):
+        print("  - Exists: ux_billing_outbox_idempotency")
+    else:
+        result = op.get_bind().execute(text("""
+            DELETE FROM billing_outbox a
+            USING billing_outbox b
+            WHERE a.invoice_id = b.invoice_id
+            AND a.reminder_level = b.reminder_level
+            AND a.channel = b.channel
+            AND a.id > b.id
+        """))
+        print(f"  - Removed {result.rowcount} duplicate billing_outbox rows")
+
+        op.execute(text("""
+            CREATE UNIQUE INDEX ux_billing_outbox_idempotency
+            ON billing_outbox(invoice_id, reminder_level, channel)
+        """))
+        print("  + Index: ux_billing_outbox_idempotency")
+
+    # ==========================================================================
+    # LOGS: one active danger-zone mark per invoice
+    # ==========================================================================
+    if not table_exists('billing_communication_logs'):
+        print("  - Missing: billing_communication_logs (skipped)")
+    elif index_exists('ux_billing_comms_danger_zone'):
+        print("  - Exists: ux_billing_comms_danger_zone")
+    else:
+        result = op.get_bind().execute(text("""
+            UPDATE billing_communication_logs a
+            SET esta_activo = false, actualizado_en = CURRENT_TIMESTAMP
+            FROM billing_communication_logs b
+            WHERE a.invoice_id = b.invoice_id
+            AND a.reminder_sequence = 4 AND b.reminder_sequence = 4
+            AND a.esta_activo = true AND b.esta_activo = true
+            AND a.id > b.id
+        """))
+        print(f"  - Soft-deleted {result.rowcount} duplicate danger-zone logs")
+
+        op.execute(text("""
+            CREATE UNIQUE INDEX ux_billing_comms_danger_zone
+            ON billing_communication_logs(invoice_id)
+            WHERE reminder_sequence = 4 AND esta_activo = true
+        """))
+        print("  + Index: ux_billing_comms_danger_zone")
+
+    print("\n" + "=" * 60)
+    print("Migration Complete!")
+    print("=" * 60 + "\n")
+
+
+def downgrade() -> None:
+    """Drop billing idempotency indexes."""
+    for name in ("ux_billing_outbox_idempotency", "ux_billing_comms_danger_zone"):
+        op.execute(text(f"DROP INDEX IF EXISTS {name}"))
+        print(f"  - Dropped: {name}")
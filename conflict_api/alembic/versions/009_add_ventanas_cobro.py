@@ -0,0 +1,67 @@
+"""add ventanas cobro
+
+Revision ID: 009
+Revises: 008
+Create Date: 2025-03-17
+
+This migration adds:
+- ventanas_cobro table (per-firm billing send window: local time of day,
+  timezone, weekdays and holidays). Firms without a row use the defaults
+  from settings (billing_window_*).
+"""
+
+from typing import Sequence, Union
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy import text
+
+
+revision: str = '009'
+down_revision: Union[str, None] = '008'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def table_exists(table_name: str) -> bool:
+    """Check if a table exists."""
+    conn = op.get_bind()
+    result = conn.execute(text(
+        "SELECT EXISTS (SELECT FROM information_schema.tables WHERE table_name = :name)"
+    ), {"name": table_name})
+    return result.scalar()
+
+
+def upgrade() -> None:
+    """Create ventanas_cobro table."""
+
+    # ==========================================================================
+    # CREATE VENTANAS_COBRO TABLE
+    # ==========================================================================
+    if not table_exists('ventanas_cobro'):
+        op.execute(text("""
+            CREATE TABLE ventanas_cobro (
+                id SERIAL PRIMARY KEY,
+                firma_id INTEGER NOT NULL UNIQUE REFERENCES firmas(id) ON DELETE CASCADE,
+                zona_horaria VARCHAR(64) NOT NULL DEFAULT 'America/Puerto_Rico',
+                hora_inicio TIME NOT NULL,
+                hora_fin TIME NOT NULL,
+                dias_semana JSONB NOT NULL DEFAULT '[0, 1, 2, 3, 4, 5, 6]'::jsonb,
+                feriados JSONB NOT NULL DEFAULT '[]'::jsonb,
+                esta_activo BOOLEAN NOT NULL DEFAULT true,
+                creado_en TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+                actualizado_en TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+                CONSTRAINT ck_ventanas_cobro_horas CHECK (hora_fin > hora_inicio)
+            )
+        """))
+        op.execute(text("CREATE INDEX ix_ventanas_cobro_id ON ventanas_cobro(id)"))
+        op.execute(text("CREATE INDEX ix_ventanas_cobro_firma_id ON ventanas_cobro(firma_id)"))
+        print("  + Created: ventanas_cobro")
+    else:
+        print("  - Exists: ventanas_cobro")
+
+
+def downgrade() -> None:
+    """Drop ventanas_cobro table."""
+    if table_exists('ventanas_cobro'):
+        op.execute(text("DROP TABLE ventanas_cobro CASCADE"))
+        print("  - Dropped: ventanas_cobro")
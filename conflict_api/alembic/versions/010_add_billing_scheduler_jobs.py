@@ -0,0 +1,93 @@
+"""add billing scheduler jobs
+
+Revision ID: 010
+Revises: 009
+Create Date: 2025-03-24
+
+This migration adds:
+- billing_scheduler_jobs table (manual, firm-scoped scheduler runs
+  triggered from the API and executed in the background, with progress),
+  with at most one open (PENDING / RUNNING) job per firm
+- billing_outbox.job_id (sends queued by a manual run, to report their
+  sent / failed / pending counts)
+"""
+
+from typing import Sequence, Union
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy import text
+
+
+revision: str = '010'
+down_revision: Union[str, None] = '009'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def table_exists(table_name: str) -> bool:
+    """Check if a table exists."""
+    conn = op.get_bind()
+    result = conn.execute(text(
+        "SELECT EXISTS (SELECT FROM information_schema.tables WHERE table_name = :name)"
+    ), {"name": table_name})
+    return result.scalar()
+
+
+def upgrade() -> None:
+    """Create billing scheduler jobs table and link outbox rows."""
+
+    # ==========================================================================
+    # CREATE BILLING_SCHEDULER_JOBS TABLE
+    # ==========================================================================
+    if not table_exists('billing_scheduler_jobs'):
+        op.execute(text("""
+            CREATE TABLE billing_scheduler_jobs (
+                id SERIAL PRIMARY KEY,
+                firma_id INTEGER NOT NULL REFERENCES firmas(id) ON DELETE CASCADE,
+                status VARCHAR(20) NOT NULL DEFAULT 'PENDING',
+                invoices_scanned INTEGER NOT NULL DEFAULT 0,
+                invoices_processed INTEGER NOT NULL DEFAULT 0,
+                sends_queued INTEGER NOT NULL DEFAULT 0,
+                danger_zone_marked INTEGER NOT NULL DEFAULT 0,
+                started_at TIMESTAMP,
+                finished_at TIMESTAMP,
+                error TEXT,
+                esta_activo BOOLEAN NOT NULL DEFAULT true,
+                creado_en TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+                actualizado_en TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+            )
+        """))
+        op.execute(text("CREATE INDEX ix_billing_scheduler_jobs_id ON billing_scheduler_jobs(id)"))
+        op.execute(text("CREATE INDEX ix_billing_scheduler_jobs_firma_id ON billing_scheduler_jobs(firma_id)"))
+        print("  + Created: billing_scheduler_jobs")
+    else:
+        print("  - Exists: billing_scheduler_jobs")
+
+    # Un solo job abierto por bufete: dos triggers simultáneos no crean dos jobs
+    op.execute(text("""
+        CREATE UNIQUE INDEX IF NOT EXISTS ux_billing_scheduler_jobs_open
+        ON billing_scheduler_jobs(firma_id)
+        WHERE status IN ('PENDING', 'RUNNING') AND esta_activo = true
+    """))
+    print("  + Index: ux_billing_scheduler_jobs_open")
+
+    # ==========================================================================
+    # LINK OUTBOX ROWS TO THEIR JOB
+    # ==========================================================================
+    op.execute(text("""
+        ALTER TABLE billing_outbox
+        ADD COLUMN IF NOT EXISTS job_id INTEGER REFERENCES billing_scheduler_jobs(id) ON DELETE SET NULL
+    """))
+    op.execute(text("CREATE INDEX IF NOT EXISTS ix_billing_outbox_job_id ON billing_outbox(job_id)"))
+    print("  + Column: billing_outbox.job_id")
+
+
+def downgrade() -> None:
+    """Drop billing scheduler jobs."""
+    op.execute(text("DROP INDEX IF EXISTS ix_billing_outbox_job_id"))
+    op.execute(text("ALTER TABLE billing_outbox DROP COLUMN IF EXISTS job_id"))
+    print("  - Dropped: billing_outbox.job_id")
+
+    if table_exists('billing_scheduler_jobs'):
+        op.execute(text("DROP TABLE billing_scheduler_jobs CASCADE"))
+        print("  - Dropped: billing_scheduler_jobs")
@@ -0,0 +1,39 @@
+"""add billing comms external_id index
+
+Revision ID: 011
+Revises: 010
+Create Date: 2025-03-31
+
+This migration adds:
+- billing_communication_logs (external_id) partial index: delivery
+  webhooks (SendGrid events / Twilio status callbacks) update logs in
+  bulk keyed on the provider message id
+"""
+
+from typing import Sequence, Union
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy import text
+
+
+revision: str = '011'
+down_revision: Union[str, None] = '010'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Create billing comms external_id index."""
+    op.execute(text("""
+        CREATE INDEX IF NOT EXISTS ix_billing_comms_external_id
+        ON billing_communication_logs(external_id)
+        WHERE external_id IS NOT NULL
+    """))
+    print("  + Index: ix_billing_comms_external_id")
+    op.execute(text("ANALYZE billing_communication_logs"))
+
+
+def downgrade() -> None:
+    """Drop billing comms external_id index."""
+    op.execute(text("DROP INDEX IF EXISTS ix_billing_comms_external_id"))
+    print("  - Dropped: ix_billing_comms_external_id")
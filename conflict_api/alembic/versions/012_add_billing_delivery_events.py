@@ -0,0 +1,64 @@
+"""add billing delivery events
+
+Revision ID: 012
+Revises: 011
+Create Date: 2025-04-07
+
+This migration adds:
+- billing_delivery_events table (inbox of delivery webhook events from
+  SendGrid / Twilio). Webhooks insert the events before acknowledging
+  them; a background worker applies them in batches to
+  billing_communication_logs and deletes them, so a restart never loses
+  an acknowledged event.
+"""
+
+from typing import Sequence, Union
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy import text
+
+
+revision: str = '012'
+down_revision: Union[str, None] = '011'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def table_exists(table_name: str) -> bool:
+    """Check if a table exists."""
+    conn = op.get_bind()
+    result = conn.execute(text(
+        "SELECT EXISTS (SELECT FROM information_schema.tables WHERE table_name = :name)"
+    ), {"name": table_name})
+    return result.scalar()
+
+
+def upgrade() -> None:
+    """Create billing_delivery_events table."""
+
+    # ==========================================================================
+    # CREATE BILLING_DELIVERY_EVENTS TABLE
+    # ==========================================================================
+    if not table_exists('billing_delivery_events'):
+        op.execute(text("""
+            CREATE TABLE billing_delivery_events (
+                id SERIAL PRIMARY KEY,
+                provider VARCHAR(20) NOT NULL,
+                external_id VARCHAR(255) NOT NULL,
+                status VARCHAR(20) NOT NULL,
+                delivered_at TIMESTAMP,
+                read_at TIMESTAMP,
+                error_message TEXT,
+                recibido_en TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+            )
+        """))
+        print("  + Created: billing_delivery_events")
+    else:
+        print("  - Exists: billing_delivery_events")
+
+
+def downgrade() -> None:
+    """Drop billing_delivery_events table."""
+    if table_exists('billing_delivery_events'):
+        op.execute(text("DROP TABLE billing_delivery_events CASCADE"))
+        print("  - Dropped: billing_delivery_events")
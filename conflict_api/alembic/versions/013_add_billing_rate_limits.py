@@ -0,0 +1,56 @@
+"""add billing rate limits
+
+Revision ID: 013
+Revises: 012
+Create Date: 2025-04-14
+
+This migration adds:
+- billing_rate_limits table: one row per sender (e.g. twilio_sms:<from
+  number>) holding the next free send slot, so every process sharing a
+  sender respects the provider's MPS together instead of N x MPS
+"""
+
+from typing import Sequence, Union
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy import text
+
+
+revision: str = '013'
+down_revision: Union[str, None] = '012'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def table_exists(table_name: str) -> bool:
+    """Check if a table exists."""
+    conn = op.get_bind()
+    result = conn.execute(text(
+        "SELECT EXISTS (SELECT FROM information_schema.tables WHERE table_name = :name)"
+    ), {"name": table_name})
+    return result.scalar()
+
+
+def upgrade() -> None:
+    """Create billing_rate_limits table."""
+
+    # ==========================================================================
+    # CREATE BILLING_RATE_LIMITS TABLE
+    # ==========================================================================
+    if not table_exists('billing_rate_limits'):
+        op.execute(text("""
+            CREATE TABLE billing_rate_limits (
+                nombre VARCHAR(255) PRIMARY KEY,
+                siguiente TIMESTAMPTZ NOT NULL DEFAULT clock_timestamp()
+            )
+        """))
+        print("  + Created: billing_rate_limits")
+    else:
+        print("  - Exists: billing_rate_limits")
+
+
+def downgrade() -> None:
+    """Drop billing_rate_limits table."""
+    if table_exists('billing_rate_limits'):
+        op.execute(text("DROP TABLE billing_rate_limits CASCADE"))
+        print("  - Dropped: billing_rate_limits")
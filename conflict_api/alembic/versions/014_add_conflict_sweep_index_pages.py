@@ -0,0 +1,63 @@
+"""add conflict sweep index pages
+
+Revision ID: 014
+Revises: 013
+Create Date: 2025-04-21
+
+This migration adds:
+- barridos_conflictos.fase / indice_desde_id / indice_hasta_id: the sweep
+  indexes partes and clientes in pages of bounded size instead of the
+  whole firm at once; the checkpoint records the current page
+- unfinished sweeps are reset (matches dropped, progress zeroed) since
+  their old checkpoint does not map onto index pages
+"""
+
+from typing import Sequence, Union
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy import text
+
+
+revision: str = '014'
+down_revision: Union[str, None] = '013'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Add index page checkpoint to barridos_conflictos."""
+    op.execute(text("""
+        ALTER TABLE barridos_conflictos
+        ADD COLUMN IF NOT EXISTS fase VARCHAR(20) NOT NULL DEFAULT 'PARTES',
+        ADD COLUMN IF NOT EXISTS indice_desde_id INTEGER NOT NULL DEFAULT 0,
+        ADD COLUMN IF NOT EXISTS indice_hasta_id INTEGER
+    """))
+    print("  + Columns: barridos_conflictos.fase, indice_desde_id, indice_hasta_id")
+
+    op.execute(text("""
+        DELETE FROM coincidencias_barrido
+        WHERE barrido_id IN (
+            SELECT id FROM barridos_conflictos
+            WHERE estado <> 'COMPLETADO' AND ultimo_cliente_id > 0
+        )
+    """))
+    result = op.get_bind().execute(text("""
+        UPDATE barridos_conflictos
+        SET ultimo_cliente_id = 0,
+            clientes_procesados = 0,
+            pares_evaluados = 0,
+            coincidencias_encontradas = 0
+        WHERE estado <> 'COMPLETADO' AND ultimo_cliente_id > 0
+    """))
+    print(f"  + Reset unfinished sweeps: {result.rowcount}")
+
+
+def downgrade() -> None:
+    """Drop index page checkpoint from barridos_conflictos."""
+    op.execute(text("""
+        ALTER TABLE barridos_conflictos
+        DROP COLUMN IF EXISTS indice_hasta_id,
+        DROP COLUMN IF EXISTS indice_desde_id,
+        DROP COLUMN IF EXISTS fase
+    """))
+    print("  - Dropped: barridos_conflictos.fase, indice_desde_id, indice_hasta_id")
@@ -0,0 +1,164 @@
+"""lock billing aging triggers
+
+Revision ID: 015
+Revises: 014
+Create Date: 2025-04-28
+
+This migration changes the billing_aging_firma maintenance:
+- billing_aging_aplicar_firma: applies a +/-1 invoice delta to a firm's
+  row after taking a shared per-firm advisory lock
+  (hashtext('billing_aging_firma'), firma_id) until the end of the
+  transaction. The daily recompute takes the same lock exclusively before
+  reading invoices, so it never overwrites a delta committed (or in
+  flight) while it runs.
+- billing_aging_aplicar (invoices trigger) resolves the client's firm and
+  delegates to billing_aging_aplicar_firma
+- trigger on clientes: when a client moves to another firm, its pending
+  invoices move from the old firm's row to the new one
+"""
+
+from typing import Sequence, Union
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy import text
+
+
+revision: str = '015'
+down_revision: Union[str, None] = '014'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Lock billing aging deltas per firm and follow client firm changes."""
+
+    # ==========================================================================
+    # PER-FIRM DELTA (SHARED ADVISORY LOCK)
+    # ==========================================================================
+    # El lock se toma antes de leer el snapshot, aunque el bufete aún no
+    # tenga fila: un recálculo concurrente espera a esta transacción y
+    # luego ve la factura.
+    op.execute(text("""
+        CREATE OR REPLACE FUNCTION billing_aging_aplicar_firma(
+            p_firma_id INTEGER, p_amount NUMERIC, p_due_date DATE, p_signo INTEGER
+        ) RETURNS void AS $$
+        DECLARE
+            v_dias INTEGER;
+        BEGIN
+            IF p_firma_id IS NULL THEN
+                RETURN;
+            END IF;
+
+            PERFORM pg_advisory_xact_lock_shared(hashtext('billing_aging_firma'), p_firma_id);
+
+            SELECT calculado_para - p_due_date INTO v_dias
+            FROM billing_aging_firma WHERE firma_id = p_firma_id;
+            IF v_dias IS NULL THEN
+                RETURN;
+            END IF;
+
+            UPDATE billing_aging_firma SET
+                total_invoices = total_invoices + p_signo,
+                total_outstanding = total_outstanding + p_signo * p_amount,
+                bucket_0_30_count = bucket_0_30_count + CASE WHEN v_dias < 30 THEN p_signo ELSE 0 END,
+                bucket_0_30_amount = bucket_0_30_amount + CASE WHEN v_dias < 30 THEN p_signo * p_amount ELSE 0 END,
+                bucket_30_60_count = bucket_30_60_count + CASE WHEN v_dias >= 30 AND v_dias < 60 THEN p_signo ELSE 0 END,
+                bucket_30_60_amount = bucket_30_60_amount + CASE WHEN v_dias >= 30 AND v_dias < 60 THEN p_signo * p_amount ELSE 0 END,
+                bucket_60_plus_count = bucket_60_plus_count + CASE WHEN v_dias >= 60 THEN p_signo ELSE 0 END,
+                bucket_60_plus_amount = bucket_60_plus_amount + CASE WHEN v_dias >= 60 THEN p_signo * p_amount ELSE 0 END,
+                actualizado_en = CURRENT_TIMESTAMP
+            WHERE firma_id = p_firma_id;
+        END;
+        $$ LANGUAGE plpgsql
+    """))
+
+    op.execute(text("""
+        CREATE OR REPLACE FUNCTION billing_aging_aplicar(
+            p_client_id INTEGER, p_amount NUMERIC, p_due_date DATE, p_signo INTEGER
+        ) RETURNS void AS $$
+        BEGIN
+            PERFORM billing_aging_aplicar_firma(
+                (SELECT firma_id FROM clientes WHERE id = p_client_id),
+                p_amount, p_due_date, p_signo
+            );
+        END;
+        $$ LANGUAGE plpgsql
+    """))
+    print("  + Function: billing_aging_aplicar_firma (per-firm advisory lock)")
+
+    # ==========================================================================
+    # CLIENT FIRM CHANGE TRIGGER
+    # ==========================================================================
+    op.execute(text("""
+        CREATE OR REPLACE FUNCTION billing_aging_clientes_trigger() RETURNS trigger AS $$
+        DECLARE
+            r RECORD;
+        BEGIN
+            FOR r IN
+                SELECT amount, due_date FROM invoices
+                WHERE client_id = NEW.id
+                AND status = 'pending'
+                AND esta_activo = true
+            LOOP
+                PERFORM billing_aging_aplicar_firma(OLD.firma_id, r.amount, r.due_date, -1);
+                PERFORM billing_aging_aplicar_firma(NEW.firma_id, r.amount, r.due_date, 1);
+            END LOOP;
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql
+    """))
+
+    op.execute(text("DROP TRIGGER IF EXISTS trg_clientes_billing_aging ON clientes"))
+    op.execute(text("""
+        CREATE TRIGGER trg_clientes_billing_aging
+        AFTER UPDATE OF firma_id ON clientes
+        FOR EACH ROW
+        WHEN (OLD.firma_id IS DISTINCT FROM NEW.firma_id)
+        EXECUTE FUNCTION billing_aging_clientes_trigger()
+    """))
+    print("  + Trigger: trg_clientes_billing_aging")
+
+
+def downgrade() -> None:
+    """Restore the unlocked 005 billing aging functions."""
+    conn = op.get_bind()
+
+    conn.execute(text("DROP TRIGGER IF EXISTS trg_clientes_billing_aging ON clientes"))
+    conn.execute(text("DROP FUNCTION IF EXISTS billing_aging_clientes_trigger()"))
+    print("  - Dropped: trg_clientes_billing_aging")
+
+    conn.execute(text("""
+        CREATE OR REPLACE FUNCTION billing_aging_aplicar(
+            p_client_id INTEGER, p_amount NUMERIC, p_due_date DATE, p_signo INTEGER
+        ) RETURNS void AS $$
+        DECLARE
+            v_firma_id INTEGER;
+            v_dias INTEGER;
+        BEGIN
+            SELECT firma_id INTO v_firma_id FROM clientes WHERE id = p_client_id;
+            IF v_firma_id IS NULL THEN
+                RETURN;
+            END IF;
+
+            SELECT calculado_para - p_due_date INTO v_dias
+            FROM billing_aging_firma WHERE firma_id = v_firma_id;
+            IF v_dias IS NULL THEN
+                RETURN;
+            END IF;
+
+            UPDATE billing_aging_firma SET
+                total_invoices = total_invoices + p_signo,
+                total_outstanding = total_outstanding + p_signo * p_amount,
+                bucket_0_30_count = bucket_0_30_count + CASE WHEN v_dias < 30 THEN p_signo ELSE 0 END,
+                bucket_0_30_amount = bucket_0_30_amount + CASE WHEN v_dias < 30 THEN p_signo * p_amount ELSE 0 END,
+                bucket_30_60_count = bucket_30_60_count + CASE WHEN v_dias >= 30 AND v_dias < 60 THEN p_signo ELSE 0 END,
+                bucket_30_60_amount = bucket_30_60_amount + CASE WHEN v_dias >= 30 AND v_dias < 60 THEN p_signo * p_amount ELSE 0 END,
+                bucket_60_plus_count = bucket_60_plus_count + CASE WHEN v_dias >= 60 THEN p_signo ELSE 0 END,
+                bucket_60_plus_amount = bucket_60_plus_amount + CASE WHEN v_dias >= 60 THEN p_signo * p_amount ELSE 0 END,
+                actualizado_en = CURRENT_TIMESTAMP
+            WHERE firma_id = v_firma_id;
+        END;
+        $$ LANGUAGE plpgsql
+    """))
+    conn.execute(text("DROP FUNCTION IF EXISTS billing_aging_aplicar_firma(INTEGER, NUMERIC, DATE, INTEGER)"))
+    print("  - Dropped: billing_aging_aplicar_firma")
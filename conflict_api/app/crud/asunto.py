@@ -2,10 +2,10 @@
 CRUD para Asunto (Matter).
 """
 
-from typing import List, Optional
-from sqlalchemy.orm import Session, joinedload
+from typing import List, Optional, Tuple
+from sqlalchemy.orm import Session, Query, joinedload
 
-from app.crud.base import CRUDBase
+from app.crud.base import CRUDBase, ORDEN_ID
 from app.models.asunto import Asunto
 from app.models.cliente import Cliente
 from app.schemas.asunto import AsuntoCreate, AsuntoUpdate
@@ -67,6 +67,45 @@ class CRUDAsunto(CRUDBase[Asunto, AsuntoCreate, AsuntoUpdate]):
             estado: Filtrar por estado
             include_inactive: Incluir asuntos inactivos
         """
+        query = self._query_multi_por_firma(db, firm_id, estado, include_inactive)
+        return query.offset(skip).limit(limit).all()
+    
+    def get_multi_por_firma_keyset(
+        self,
+        db: Session,
+        firm_id: int,
+        cursor: Optional[str] = None,
+        limit: int = 100,
+        orden: str = ORDEN_ID,
+        estado: Optional[str] = None,
+        include_inactive: bool = False
+    ) -> Tuple[List[Asunto], Optional[str]]:
+        """
+        Obtiene asuntos del bufete con paginación keyset (cursor).
+        
+        Args:
+            db: Sesión de base de datos
+            firm_id: ID del bufete
+            cursor: Cursor de la página anterior (None = primera página)
+            limit: Límite de registros
+            orden: "id" o "creado_en"
+            estado: Filtrar por estado
+            include_inactive: Incluir asuntos inactivos
+        
+        Returns:
+            (asuntos, next_cursor)
+        """
+        query = self._query_multi_por_firma(db, firm_id, estado, include_inactive)
+        return self.paginar_keyset(query, cursor=cursor, limit=limit, orden=orden)
+    
+    def _query_multi_por_firma(
+        self,
+        db: Session,
+        firm_id: int,
+        estado: Optional[str],
+        include_inactive: bool
+    ) -> Query:
+        """Query base de asuntos del bufete con filtros."""
         query = (
             db.query(Asunto)
             .join(Cliente)
@@ -80,7 +119,7 @@ class CRUDAsunto(CRUDBase[Asunto, AsuntoCreate, AsuntoUpdate]):
         if estado:
             query = query.filter(Asunto.estado == estado)
         
-        return query.offset(skip).limit(limit).all()
+        return query
     
     def get_por_cliente(
         self, 
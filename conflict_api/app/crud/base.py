@@ -2,9 +2,13 @@
 Clase base CRUD con aislamiento multi-tenant.
 """
 
-from typing import Generic, TypeVar, Type, Optional, List, Any
-from sqlalchemy.orm import Session
-from sqlalchemy import and_
+import base64
+import json
+from datetime import datetime
+from typing import Generic, TypeVar, Type, Optional, List, Any, Tuple, Dict, Iterable
+from sqlalchemy.orm import Session, Query
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import and_, tuple_, insert, update, bindparam, select, Select
 from pydantic import BaseModel
 from app.database import Base
 
@@ -12,6 +16,51 @@ ModelType = TypeVar("ModelType", bound=Base)
 CreateSchemaType = TypeVar("CreateSchemaType", bound=BaseModel)
 UpdateSchemaType = TypeVar("UpdateSchemaType", bound=BaseModel)
 
+# Ordenes soportados por la paginación keyset
+ORDEN_ID = "id"
+ORDEN_CREADO_EN = "creado_en"
+ORDENES_KEYSET = (ORDEN_ID, ORDEN_CREADO_EN)
+
+
+class CursorInvalido(ValueError):
+    """El cursor de paginación no es válido o no corresponde al orden pedido."""
+    pass
+
+
+def codificar_cursor(orden: str, valores: List[Any]) -> str:
+    """
+    Codifica la posición de la última fila como cursor opaco (base64 url-safe).
+
+    Args:
+        orden: Orden usado ("id" o "creado_en")
+        valores: Valores de la llave de orden de la última fila
+    """
+    serializados = [v.isoformat() if isinstance(v, datetime) else v for v in valores]
+    data = json.dumps({"o": orden, "k": serializados}, separators=(",", ":"))
+    return base64.urlsafe_b64encode(data.encode()).decode().rstrip("=")
+
+
+def decodificar_cursor(cursor: str, orden: str) -> List[Any]:
+    """
+    Decodifica un cursor generado por codificar_cursor.
+
+    Raises:
+        CursorInvalido: Si el cursor está malformado o es de otro orden
+    """
+    try:
+        relleno = "=" * (-len(cursor) % 4)
+        data = json.loads(base64.urlsafe_b64decode(cursor + relleno))
+        valores = data["k"]
+        if data["o"] != orden:
+            raise CursorInvalido("El cursor no corresponde al orden solicitado")
+        if orden == ORDEN_CREADO_EN:
+            return [datetime.fromisoformat(valores[0]), int(valores[1])]
+        return [int(valores[0])]
+    except CursorInvalido:
+        raise
+    except (ValueError, KeyError, IndexError, TypeError):
+        raise CursorInvalido("Cursor de paginación inválido")
+
 
 class CRUDBase(Generic[ModelType, CreateSchemaType, UpdateSchemaType]):
     """
@@ -74,6 +123,111 @@ class CRUDBase(Generic[ModelType, CreateSchemaType, UpdateSchemaType]):
             limit: Límite de registros
             include_inactive: Incluir registros inactivos
         """
+        query = self._query_multi(db, firm_id=firm_id, include_inactive=include_inactive)
+        return query.offset(skip).limit(limit).all()
+    
+    def get_multi_keyset(
+        self,
+        db: Session,
+        firm_id: Optional[int] = None,
+        cursor: Optional[str] = None,
+        limit: int = 100,
+        orden: str = ORDEN_ID,
+        include_inactive: bool = False
+    ) -> Tuple[List[ModelType], Optional[str]]:
+        """
+        Obtiene múltiples registros con paginación keyset (cursor).
+        
+        A diferencia de offset/limit, el costo no crece con la página.
+        
+        Args:
+            db: Sesión de base de datos
+            firm_id: ID de firma para filtrar (si aplica)
+            cursor: Cursor opaco de la página anterior (None = primera página)
+            limit: Límite de registros
+            orden: "id" o "creado_en" (llave (creado_en, id))
+            include_inactive: Incluir registros inactivos
+        
+        Returns:
+            (registros, next_cursor) - next_cursor es None en la última página
+        """
+        query = self._query_multi(db, firm_id=firm_id, include_inactive=include_inactive)
+        return self.paginar_keyset(query, cursor=cursor, limit=limit, orden=orden)
+    
+    def paginar_keyset(
+        self,
+        query: Query,
+        cursor: Optional[str],
+        limit: int,
+        orden: str = ORDEN_ID
+    ) -> Tuple[List[ModelType], Optional[str]]:
+        """
+        Aplica paginación keyset a una query del modelo.
+        Usado por get_multi_keyset y por las consultas por firma de subclases.
+        
+        Args:
+            query: Query ya filtrada del modelo
+            cursor: Cursor opaco de la página anterior
+            limit: Límite de registros
+            orden: "id" o "creado_en"
+        
+        Raises:
+            CursorInvalido: Si el cursor no es válido
+        """
+        query, columnas = self._aplicar_cursor(query, cursor, orden)
+        
+        # Pedir una fila extra para saber si hay página siguiente
+        items = query.order_by(*columnas).limit(limit + 1).all()
+        
+        return self._cortar_pagina(items, limit, orden, columnas)
+    
+    def _aplicar_cursor(self, query, cursor: Optional[str], orden: str):
+        """
+        Filtra una Query o Select a partir del cursor.
+        
+        Returns:
+            (query filtrada, columnas de la llave de orden)
+        """
+        if orden not in ORDENES_KEYSET:
+            raise CursorInvalido(f"Orden no soportado: {orden}")
+        
+        if orden == ORDEN_CREADO_EN:
+            columnas = (self.model.creado_en, self.model.id)
+        else:
+            columnas = (self.model.id,)
+        
+        if cursor:
+            valores = decodificar_cursor(cursor, orden)
+            if len(columnas) == 1:
+                query = query.filter(columnas[0] > valores[0])
+            else:
+                query = query.filter(tuple_(*columnas) > tuple_(*valores))
+        
+        return query, columnas
+    
+    def _cortar_pagina(
+        self,
+        items: List[ModelType],
+        limit: int,
+        orden: str,
+        columnas: Tuple
+    ) -> Tuple[List[ModelType], Optional[str]]:
+        """Recorta la fila extra y genera el cursor de la página siguiente."""
+        next_cursor = None
+        if limit > 0 and len(items) > limit:
+            items = items[:limit]
+            ultimo = items[-1]
+            next_cursor = codificar_cursor(orden, [getattr(ultimo, c.key) for c in columnas])
+        
+        return items, next_cursor
+    
+    def _query_multi(
+        self,
+        db: Session,
+        firm_id: Optional[int] = None,
+        include_inactive: bool = False
+    ) -> Query:
+        """Query base de get_multi con filtros de firma e inactivos."""
         query = db.query(self.model)
         
         # Filtrar por firma si el modelo tiene firma_id
@@ -84,7 +238,7 @@ class CRUDBase(Generic[ModelType, CreateSchemaType, UpdateSchemaType]):
         if not include_inactive and hasattr(self.model, 'esta_activo'):
             query = query.filter(self.model.esta_activo == True)
         
-        return query.offset(skip).limit(limit).all()
+        return query
     
     def create(
         self, 
@@ -192,4 +346,332 @@ class CRUDBase(Generic[ModelType, CreateSchemaType, UpdateSchemaType]):
             db.commit()
             db.refresh(obj)
         
-        return obj
\ No newline at end of file
+        return obj
+    
+    # ------------------------------------------------------------------
+    # Variantes async (AsyncSession, para handlers async def)
+    # ------------------------------------------------------------------
+    
+    def _select_filtrado(
+        self,
+        firm_id: Optional[int] = None,
+        include_inactive: bool = False
+    ) -> Select:
+        """Select del modelo con los mismos filtros de firma e inactivos que _query_multi."""
+        stmt = select(self.model)
+        
+        if firm_id is not None and hasattr(self.model, 'firma_id'):
+            stmt = stmt.where(self.model.firma_id == firm_id)
+        
+        if not include_inactive and hasattr(self.model, 'esta_activo'):
+            stmt = stmt.where(self.model.esta_activo == True)
+        
+        return stmt
+    
+    async def get_async(
+        self,
+        db: AsyncSession,
+        id: int,
+        firm_id: Optional[int] = None,
+        include_inactive: bool = False
+    ) -> Optional[ModelType]:
+        """Versión async de get."""
+        stmt = self._select_filtrado(firm_id, include_inactive).where(self.model.id == id)
+        return (await db.scalars(stmt.limit(1))).first()
+    
+    async def get_multi_async(
+        self,
+        db: AsyncSession,
+        firm_id: Optional[int] = None,
+        skip: int = 0,
+        limit: int = 100,
+        include_inactive: bool = False
+    ) -> List[ModelType]:
+        """Versión async de get_multi."""
+        stmt = self._select_filtrado(firm_id, include_inactive).offset(skip).limit(limit)
+        return list((await db.scalars(stmt)).all())
+    
+    async def get_multi_keyset_async(
+        self,
+        db: AsyncSession,
+        firm_id: Optional[int] = None,
+        cursor: Optional[str] = None,
+        limit: int = 100,
+        orden: str = ORDEN_ID,
+        include_inactive: bool = False
+    ) -> Tuple[List[ModelType], Optional[str]]:
+        """Versión async de get_multi_keyset."""
+        stmt = self._select_filtrado(firm_id, include_inactive)
+        return await self.paginar_keyset_async(db, stmt, cursor=cursor, limit=limit, orden=orden)
+    
+    async def paginar_keyset_async(
+        self,
+        db: AsyncSession,
+        stmt: Select,
+        cursor: Optional[str],
+        limit: int,
+        orden: str = ORDEN_ID
+    ) -> Tuple[List[ModelType], Optional[str]]:
+        """Versión async de paginar_keyset (recibe un Select en vez de una Query)."""
+        stmt, columnas = self._aplicar_cursor(stmt, cursor, orden)
+        items = list((await db.scalars(stmt.order_by(*columnas).limit(limit + 1))).all())
+        return self._cortar_pagina(items, limit, orden, columnas)
+    
+    async def create_async(
+        self,
+        db: AsyncSession,
+        obj_in: CreateSchemaType,
+        firm_id: Optional[int] = None
+    ) -> ModelType:
+        """Versión async de create."""
+        obj_data = obj_in.model_dump()
+        
+        if firm_id is not None and hasattr(self.model, 'firma_id'):
+            obj_data['firma_id'] = firm_id
+        
+        db_obj = self.model(**obj_data)
+        db.add(db_obj)
+        await db.commit()
+        await db.refresh(db_obj)
+        return db_obj
+    
+    async def update_async(
+        self,
+        db: AsyncSession,
+        db_obj: ModelType,
+        obj_in: UpdateSchemaType
+    ) -> ModelType:
+        """Versión async de update."""
+        obj_data = obj_in.model_dump(exclude_unset=True)
+        
+        for field, value in obj_data.items():
+            setattr(db_obj, field, value)
+        
+        db.add(db_obj)
+        await db.commit()
+        await db.refresh(db_obj)
+        return db_obj
+    
+    async def delete_async(
+        self,
+        db: AsyncSession,
+        id: int,
+        firm_id: Optional[int] = None,
+        hard_delete: bool = False
+    ) -> Optional[ModelType]:
+        """Versión async de delete (soft delete por defecto)."""
+        obj = await self.get_async(db, id=id, firm_id=firm_id, include_inactive=True)
+        
+        if obj is None:
+            return None
+        
+        if hard_delete:
+            await db.delete(obj)
+        elif hasattr(obj, 'esta_activo'):
+            obj.esta_activo = False
+            db.add(obj)
+        
+        await db.commit()
+        return obj
+    
+    async def restore_async(
+        self,
+        db: AsyncSession,
+        id: int,
+        firm_id: Optional[int] = None
+    ) -> Optional[ModelType]:
+        """Versión async de restore."""
+        obj = await self.get_async(db, id=id, firm_id=firm_id, include_inactive=True)
+        
+        if obj is None:
+            return None
+        
+        if hasattr(obj, 'esta_activo'):
+            obj.esta_activo = True
+            db.add(obj)
+            await db.commit()
+            await db.refresh(obj)
+        
+        return obj
+    
+    # ------------------------------------------------------------------
+    # Operaciones en lote (set-based, una sola transacción)
+    # ------------------------------------------------------------------
+    
+    def bulk_create(
+        self,
+        db: Session,
+        objs_in: List[CreateSchemaType],
+        firm_id: Optional[int] = None
+    ) -> List[ModelType]:
+        """
+        Crea múltiples registros con un INSERT multi-fila y RETURNING.
+        
+        Campos en None se omiten para que apliquen los defaults del modelo.
+        
+        Args:
+            db: Sesión de base de datos
+            objs_in: Schemas con datos de creación
+            firm_id: ID de firma para asignar (si aplica)
+        
+        Returns:
+            Registros creados, en el mismo orden de objs_in
+        """
+        if not objs_in:
+            return []
+        
+        filas = []
+        for obj_in in objs_in:
+            obj_data = obj_in.model_dump(exclude_none=True)
+            if firm_id is not None and hasattr(self.model, 'firma_id'):
+                obj_data['firma_id'] = firm_id
+            filas.append(obj_data)
+        
+        try:
+            creados = db.scalars(
+                insert(self.model).returning(self.model, sort_by_parameter_order=True),
+                filas
+            ).all()
+            ids = [obj.id for obj in creados]
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+        
+        return self._cargar_por_ids(db, ids)
+    
+    def bulk_update(
+        self,
+        db: Session,
+        updates: Dict[int, UpdateSchemaType],
+        firm_id: Optional[int] = None,
+        include_inactive: bool = False
+    ) -> List[ModelType]:
+        """
+        Actualiza múltiples registros con UPDATEs parametrizados (executemany).
+        
+        Los registros se agrupan por conjunto de campos modificados; cada grupo
+        es un solo statement con bindparams. Todo corre en una transacción.
+        
+        Args:
+            db: Sesión de base de datos
+            updates: {id: schema de actualización} (sólo campos enviados)
+            firm_id: ID de firma para verificar pertenencia (si aplica)
+            include_inactive: Permitir actualizar registros inactivos
+        
+        Returns:
+            Registros actualizados (ids inexistentes o sin cambios se omiten),
+            en el orden de updates
+        """
+        if not updates:
+            return []
+        
+        ids_validos = self._ids_existentes(
+            db, list(updates.keys()), firm_id=firm_id, include_inactive=include_inactive
+        )
+        
+        tabla = self.model.__table__
+        grupos: Dict[Tuple[str, ...], List[Dict[str, Any]]] = {}
+        actualizados: List[int] = []
+        
+        for id, obj_in in updates.items():
+            if id not in ids_validos:
+                continue
+            obj_data = obj_in.model_dump(exclude_unset=True)
+            if not obj_data:
+                continue
+            campos = tuple(sorted(obj_data))
+            fila = {f"b_{campo}": valor for campo, valor in obj_data.items()}
+            fila["b_id"] = id
+            grupos.setdefault(campos, []).append(fila)
+            actualizados.append(id)
+        
+        if not actualizados:
+            return []
+        
+        try:
+            for campos, filas in grupos.items():
+                stmt = (
+                    update(tabla)
+                    .where(tabla.c.id == bindparam("b_id"))
+                    .values({campo: bindparam(f"b_{campo}") for campo in campos})
+                )
+                db.execute(stmt, filas)
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+        
+        return self._cargar_por_ids(db, actualizados)
+    
+    def bulk_soft_delete(
+        self,
+        db: Session,
+        ids: Iterable[int],
+        firm_id: Optional[int] = None
+    ) -> int:
+        """
+        Marca múltiples registros como inactivos con un solo UPDATE.
+        
+        Args:
+            db: Sesión de base de datos
+            ids: IDs de los registros
+            firm_id: ID de firma para verificar pertenencia (si aplica)
+        
+        Returns:
+            Cantidad de registros desactivados
+        """
+        ids = list(ids)
+        if not ids or not hasattr(self.model, 'esta_activo'):
+            return 0
+        
+        stmt = (
+            update(self.model)
+            .where(self.model.id.in_(ids), self.model.esta_activo == True)
+            .values(esta_activo=False)
+            .execution_options(synchronize_session=False)
+        )
+        
+        if firm_id is not None and hasattr(self.model, 'firma_id'):
+            stmt = stmt.where(self.model.firma_id == firm_id)
+        
+        try:
+            result = db.execute(stmt)
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+        
+        return result.rowcount
+    
+    def _ids_existentes(
+        self,
+        db: Session,
+        ids: List[int],
+        firm_id: Optional[int] = None,
+        include_inactive: bool = False
+    ) -> set:
+        """IDs (de la lista) que existen y pertenecen a la firma, en una consulta."""
+        query = db.query(self.model.id).filter(self.model.id.in_(ids))
+        
+        if firm_id is not None and hasattr(self.model, 'firma_id'):
+            query = query.filter(self.model.firma_id == firm_id)
+        
+        if not include_inactive and hasattr(self.model, 'esta_activo'):
+            query = query.filter(self.model.esta_activo == True)
+        
+        return {row[0] for row in query.all()}
+    
+    def _cargar_por_ids(self, db: Session, ids: List[int]) -> List[ModelType]:
+        """Carga (o refresca) registros por ID en una consulta, conservando el orden."""
+        if not ids:
+            return []
+        
+        objs = (
+            db.query(self.model)
+            .filter(self.model.id.in_(ids))
+            .populate_existing()
+            .all()
+        )
+        por_id = {obj.id: obj for obj in objs}
+        return [por_id[id] for id in ids if id in por_id]
@@ -3,16 +3,26 @@ CRUD para Billing Communication Logs.
 Updated to use string types instead of enums.
 """
 
-from typing import List, Optional
+from typing import Any, Dict, List, Optional
 from datetime import datetime, timedelta
 from sqlalchemy.orm import Session
-from sqlalchemy import desc
+from sqlalchemy import desc, insert, text
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.crud.base import CRUDBase
-from app.models.billing_communication import BillingCommunicationLog, CommunicationType, CommunicationStatus
+from app.models.billing_communication import (
+    BillingCommunicationLog, BillingDeliveryEvent, CommunicationType, CommunicationStatus
+)
 from pydantic import BaseModel
 
 
+# Orden de los estados de entrega: un log solo avanza a un estado mayor
+_STATUS_RANK = (
+    "CASE {col} WHEN 'SENT' THEN 0 WHEN 'DELIVERED' THEN 1 WHEN 'READ' THEN 2 ELSE 3 END"
+)
+
+
 class BillingCommunicationCreate(BaseModel):
     """Schema para crear log de comunicación."""
     invoice_id: int
@@ -129,6 +139,78 @@ class CRUDBillingCommunication(CRUDBase[BillingCommunicationLog, BillingCommunic
         db.refresh(log)
         return log
     
+    def create_logs_bulk(
+        self,
+        db: Session,
+        logs: List[Dict[str, Any]],
+        commit: bool = True
+    ) -> int:
+        """
+        Inserta varios logs en un solo INSERT multi-fila y hace un commit.
+        
+        Cada dict trae las columnas de create_log (invoice_id, type,
+        message_body, days_overdue_when_sent, reminder_sequence, ...).
+        sent_at y status toman valores por defecto si no vienen.
+        Con commit=False el INSERT queda en la transacción del caller.
+        """
+        if not logs:
+            return 0
+        
+        ahora = datetime.utcnow()
+        filas = [
+            {
+                "subject": None,
+                "external_id": None,
+                "status": CommunicationStatus.SENT,
+                "sent_at": ahora,
+                **log
+            }
+            for log in logs
+        ]
+        
+        db.execute(insert(BillingCommunicationLog), filas)
+        if commit:
+            db.commit()
+        return len(filas)
+    
+    def create_danger_zone_logs_bulk(
+        self,
+        db: Session,
+        logs: List[Dict[str, Any]],
+        commit: bool = True
+    ) -> int:
+        """
+        Inserta las marcas de danger zone (reminder_sequence = 4) en un
+        solo INSERT multi-fila. Una factura que ya tiene una marca activa se
+        ignora (ux_billing_comms_danger_zone, ON CONFLICT DO NOTHING).
+        
+        Returns:
+            Número de marcas nuevas
+        """
+        if not logs:
+            return 0
+        
+        ahora = datetime.utcnow()
+        filas = [
+            {
+                "subject": None,
+                "external_id": None,
+                "status": CommunicationStatus.SENT,
+                "sent_at": ahora,
+                **log
+            }
+            for log in logs
+        ]
+        
+        stmt = pg_insert(BillingCommunicationLog).on_conflict_do_nothing(
+            index_elements=["invoice_id"],
+            index_where=text("reminder_sequence = 4 AND esta_activo = true")
+        ).returning(BillingCommunicationLog.id)
+        creadas = len(db.scalars(stmt, filas).all())
+        if commit:
+            db.commit()
+        return creadas
+    
     def update_status(
         self,
         db: Session,
@@ -157,6 +239,122 @@ class CRUDBillingCommunication(CRUDBase[BillingCommunicationLog, BillingCommunic
         db.refresh(log)
         return log
     
+    async def enqueue_delivery_events_async(
+        self,
+        db: AsyncSession,
+        eventos: List[Dict[str, Any]]
+    ) -> int:
+        """
+        Guarda eventos de entrega de un webhook en la bandeja
+        (billing_delivery_events) en un solo INSERT multi-fila y hace
+        commit: el webhook solo responde 2xx con los eventos persistidos.
+        
+        Cada dict trae provider, external_id, status y opcionalmente
+        delivered_at, read_at y error_message.
+        """
+        if not eventos:
+            return 0
+        
+        await db.execute(insert(BillingDeliveryEvent), eventos)
+        await db.commit()
+        return len(eventos)
+    
+    def claim_delivery_events(
+        self,
+        db: Session,
+        limit: int,
+        expira_antes_de: datetime
+    ) -> List[Dict[str, Any]]:
+        """
+        Saca de la bandeja hasta `limit` eventos aplicables, los más
+        antiguos primero (DELETE ... RETURNING): los que ya tienen log con
+        su external_id, y los recibidos antes de `expira_antes_de` (sin
+        log a esa altura no lo tendrán: se descartan). Un evento que llega
+        antes que su log (el outbox escribe los logs al cerrar el lote) se
+        queda en la bandeja hasta que el log exista.
+        
+        FOR UPDATE SKIP LOCKED permite varios procesos en paralelo. No hace
+        commit: el caller aplica los eventos en la misma transacción, y un
+        rollback los devuelve a la bandeja.
+        
+        Returns:
+            Eventos ordenados por id; con_log = False si se descartan
+        """
+        result = db.execute(text("""
+            DELETE FROM billing_delivery_events d
+            USING (
+                SELECT e.id, EXISTS (
+                    SELECT 1 FROM billing_communication_logs l
+                    WHERE l.external_id = e.external_id
+                    AND l.esta_activo = true
+                ) AS con_log
+                FROM billing_delivery_events e
+                WHERE e.recibido_en < :expira_antes_de
+                OR EXISTS (
+                    SELECT 1 FROM billing_communication_logs l
+                    WHERE l.external_id = e.external_id
+                    AND l.esta_activo = true
+                )
+                ORDER BY e.id
+                LIMIT :limit
+                FOR UPDATE OF e SKIP LOCKED
+            ) AS c
+            WHERE d.id = c.id
+            RETURNING d.id, d.external_id, d.status, d.delivered_at, d.read_at, d.error_message, c.con_log
+        """), {"limit": limit, "expira_antes_de": expira_antes_de})
+        
+        return sorted((dict(row._mapping) for row in result), key=lambda evento: evento["id"])
+    
+    def apply_delivery_events(
+        self,
+        db: Session,
+        eventos: List[Dict[str, Any]],
+        commit: bool = True
+    ) -> int:
+        """
+        Aplica un lote de eventos de entrega (webhooks de SendGrid / Twilio)
+        en un solo UPDATE, por external_id (ix_billing_comms_external_id).
+        
+        Cada dict trae external_id, status y opcionalmente delivered_at,
+        read_at y error_message; un external_id por lote. El estado solo
+        avanza (SENT < DELIVERED < READ < FAILED/BOUNCED): un evento que
+        llega fuera de orden no retrocede el log.
+        Con commit=False el UPDATE queda en la transacción del caller.
+        
+        Returns:
+            Número de logs actualizados
+        """
+        if not eventos:
+            return 0
+        
+        result = db.execute(text(f"""
+            UPDATE billing_communication_logs l
+            SET status = e.status,
+                delivered_at = COALESCE(l.delivered_at, e.delivered_at),
+                read_at = COALESCE(l.read_at, e.read_at),
+                error_message = COALESCE(e.error_message, l.error_message),
+                actualizado_en = CURRENT_TIMESTAMP
+            FROM unnest(
+                CAST(:external_ids AS VARCHAR[]),
+                CAST(:statuses AS VARCHAR[]),
+                CAST(:delivered_ats AS TIMESTAMP[]),
+                CAST(:read_ats AS TIMESTAMP[]),
+                CAST(:error_messages AS TEXT[])
+            ) AS e(external_id, status, delivered_at, read_at, error_message)
+            WHERE l.external_id = e.external_id
+            AND l.esta_activo = true
+            AND {_STATUS_RANK.format(col="e.status")} > {_STATUS_RANK.format(col="l.status")}
+        """), {
+            "external_ids": [e["external_id"] for e in eventos],
+            "statuses": [e["status"] for e in eventos],
+            "delivered_ats": [e.get("delivered_at") for e in eventos],
+            "read_ats": [e.get("read_at") for e in eventos],
+            "error_messages": [e.get("error_message") for e in eventos]
+        })
+        if commit:
+            db.commit()
+        return result.rowcount
+    
     def get_failed_communications(
         self,
         db: Session,
@@ -0,0 +1,126 @@
+"""
+CRUD para el outbox de envíos de cobro (billing_outbox).
+"""
+
+from typing import Any, Dict, List
+from datetime import datetime, timedelta
+from sqlalchemy.orm import Session
+from sqlalchemy import text, update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+
+from app.crud.billing_communication import crud_billing_communication
+from app.models.billing_communication import BillingOutbox, OutboxStatus
+
+
+class CRUDBillingOutbox:
+    """
+    Operaciones del outbox: encolar intenciones, reclamarlas (workers
+    concurrentes) y registrar el resultado de los envíos.
+    """
+    
+    def enqueue_bulk(
+        self,
+        db: Session,
+        intents: List[Dict[str, Any]],
+        commit: bool = True
+    ) -> int:
+        """
+        Encola varias intenciones en un solo INSERT multi-fila.
+        
+        Cada dict trae invoice_id, channel, reminder_level, days_overdue y
+        payload. (invoice_id, reminder_level, channel) es la llave de
+        idempotencia (ux_billing_outbox_idempotency): una intención que ya
+        existe se ignora (ON CONFLICT DO NOTHING), así que una corrida
+        duplicada cuesta un INSERT y nunca un segundo envío.
+        Con commit=False el INSERT queda en la transacción del caller.
+        
+        Returns:
+            Número de intenciones nuevas encoladas
+        """
+        if not intents:
+            return 0
+        
+        ahora = datetime.utcnow()
+        filas = [
+            {
+                "status": OutboxStatus.PENDING,
+                "attempts": 0,
+                "next_attempt_at": ahora,
+                **intent
+            }
+            for intent in intents
+        ]
+        
+        stmt = pg_insert(BillingOutbox).on_conflict_do_nothing(
+            index_elements=["invoice_id", "reminder_level", "channel"]
+        ).returning(BillingOutbox.id)
+        encoladas = len(db.scalars(stmt, filas).all())
+        if commit:
+            db.commit()
+        return encoladas
+    
+    def claim(
+        self,
+        db: Session,
+        limit: int,
+        lease_seconds: int
+    ) -> List[Dict[str, Any]]:
+        """
+        Reclama hasta `limit` envíos listos (PENDING con next_attempt_at
+        vencido, o PROCESSING cuyo lease expiró porque el worker murió).
+        
+        FOR UPDATE SKIP LOCKED permite varios workers en paralelo sin que
+        dos reclamen la misma fila. La fila queda PROCESSING con un lease
+        hasta locked_until y se confirma de inmediato: el envío ocurre
+        fuera de la transacción.
+        """
+        ahora = datetime.utcnow()
+        result = db.execute(text("""
+            UPDATE billing_outbox o
+            SET status = :processing,
+                attempts = o.attempts + 1,
+                locked_until = :lease_until,
+                actualizado_en = :ahora
+            WHERE o.id IN (
+                SELECT id FROM billing_outbox
+                WHERE (status = :pending AND next_attempt_at <= :ahora)
+                OR (status = :processing AND locked_until < :ahora)
+                ORDER BY next_attempt_at, id
+                LIMIT :limit
+                FOR UPDATE SKIP LOCKED
+            )
+            RETURNING o.id, o.invoice_id, o.channel, o.reminder_level,
+                      o.days_overdue, o.payload, o.attempts
+        """), {
+            "pending": OutboxStatus.PENDING,
+            "processing": OutboxStatus.PROCESSING,
+            "ahora": ahora,
+            "lease_until": ahora + timedelta(seconds=lease_seconds),
+            "limit": limit
+        })
+        
+        filas = [dict(row._mapping) for row in result]
+        db.commit()
+        return filas
+    
+    def finalizar(
+        self,
+        db: Session,
+        actualizaciones: List[Dict[str, Any]],
+        logs: List[Dict[str, Any]]
+    ) -> None:
+        """
+        Registra el resultado de un lote reclamado en una sola transacción:
+        estado de cada fila del outbox (UPDATE por id, executemany) y los
+        logs de comunicación de los envíos terminados.
+        """
+        if actualizaciones:
+            db.execute(update(BillingOutbox), [
+                {"locked_until": None, "actualizado_en": datetime.utcnow(), **fila}
+                for fila in actualizaciones
+            ])
+        crud_billing_communication.create_logs_bulk(db, logs, commit=False)
+        db.commit()
+
+
+crud_billing_outbox = CRUDBillingOutbox()
@@ -2,10 +2,10 @@
 CRUD para Parte Relacionada (Related Party).
 """
 
-from typing import List, Optional
-from sqlalchemy.orm import Session, joinedload
+from typing import List, Optional, Tuple
+from sqlalchemy.orm import Session, Query, joinedload
 
-from app.crud.base import CRUDBase
+from app.crud.base import CRUDBase, ORDEN_ID
 from app.models.parte_relacionada import ParteRelacionada
 from app.models.asunto import Asunto
 from app.models.cliente import Cliente
@@ -69,6 +69,45 @@ class CRUDParteRelacionada(CRUDBase[ParteRelacionada, ParteRelacionadaCreate, Pa
             tipo_relacion: Filtrar por tipo de relación
             include_inactive: Incluir partes inactivas
         """
+        query = self._query_multi_por_firma(db, firm_id, tipo_relacion, include_inactive)
+        return query.offset(skip).limit(limit).all()
+    
+    def get_multi_por_firma_keyset(
+        self,
+        db: Session,
+        firm_id: int,
+        cursor: Optional[str] = None,
+        limit: int = 100,
+        orden: str = ORDEN_ID,
+        tipo_relacion: Optional[str] = None,
+        include_inactive: bool = False
+    ) -> Tuple[List[ParteRelacionada], Optional[str]]:
+        """
+        Obtiene partes relacionadas del bufete con paginación keyset (cursor).
+        
+        Args:
+            db: Sesión de base de datos
+            firm_id: ID del bufete
+            cursor: Cursor de la página anterior (None = primera página)
+            limit: Límite de registros
+            orden: "id" o "creado_en"
+            tipo_relacion: Filtrar por tipo de relación
+            include_inactive: Incluir partes inactivas
+        
+        Returns:
+            (partes, next_cursor)
+        """
+        query = self._query_multi_por_firma(db, firm_id, tipo_relacion, include_inactive)
+        return self.paginar_keyset(query, cursor=cursor, limit=limit, orden=orden)
+    
+    def _query_multi_por_firma(
+        self,
+        db: Session,
+        firm_id: int,
+        tipo_relacion: Optional[str],
+        include_inactive: bool
+    ) -> Query:
+        """Query base de partes relacionadas del bufete con filtros."""
         query = (
             db.query(ParteRelacionada)
             .join(Asunto)
@@ -85,7 +124,7 @@ class CRUDParteRelacionada(CRUDBase[ParteRelacionada, ParteRelacionadaCreate, Pa
         if tipo_relacion:
             query = query.filter(ParteRelacionada.tipo_relacion == tipo_relacion)
         
-        return query.offset(skip).limit(limit).all()
+        return query
     
     def get_por_asunto(
         self, 
@@ -2,21 +2,108 @@
 Configuración de la base de datos SQLAlchemy.
 """
 
-from sqlalchemy import create_engine
+import threading
+import time
+from contextvars import ContextVar
+from typing import Annotated, Any, Dict, List, Optional
+
+from fastapi import Header, Request
+from sqlalchemy import create_engine, event, text
+from sqlalchemy.engine import Engine, make_url
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.orm import Session, sessionmaker
+from starlette.concurrency import run_in_threadpool
 from app.config import get_settings
+from app.db_instrumentation import (
+    instrumentar_engine, InstrumentedQueuePool, InstrumentedAsyncQueuePool
+)
+from app.metrics import registry
 
 settings = get_settings()
 
+
+# Drivers async equivalentes a los drivers sync
+_DRIVERS_ASYNC = {
+    "postgresql": "postgresql+asyncpg",
+    "sqlite": "sqlite+aiosqlite",
+}
+
+
+def _pool_kwargs() -> Dict[str, Any]:
+    """Opciones de pool comunes a engines sync y async (Settings DB_POOL_*)."""
+    return {
+        "pool_size": settings.db_pool_size,
+        "max_overflow": settings.db_max_overflow,
+        "pool_timeout": settings.db_pool_timeout,
+        "pool_recycle": settings.db_pool_recycle,
+        "pool_use_lifo": settings.db_pool_use_lifo,
+        "pool_pre_ping": settings.db_pool_pre_ping == "pessimistic",
+        "echo": settings.debug,  # Log de SQL queries en modo debug
+    }
+
+
+def _engine_kwargs(url: str) -> Dict[str, Any]:
+    """
+    Opciones de create_engine a partir de Settings (pool y tuning de
+    sentencias). Las opciones de psycopg2 solo aplican a ese driver.
+    """
+    kwargs = _pool_kwargs()
+    kwargs["poolclass"] = InstrumentedQueuePool  # Mide espera de checkout para /metrics
+
+    url_obj = make_url(url)
+    if url_obj.get_backend_name() == "postgresql" and url_obj.get_driver_name() == "psycopg2":
+        kwargs["executemany_mode"] = settings.db_executemany_mode
+        kwargs["executemany_batch_page_size"] = settings.db_executemany_page_size
+        kwargs["insertmanyvalues_page_size"] = settings.db_executemany_page_size
+
+        if settings.db_statement_timeout_ms > 0:
+            kwargs["connect_args"] = {
+                "options": f"-c statement_timeout={settings.db_statement_timeout_ms}"
+            }
+
+    return kwargs
+
+
+def crear_engine(url: str, nombre: str = "primary") -> Engine:
+    """Crea un engine con la configuración de pool e instrumentación."""
+    nuevo = create_engine(url, **_engine_kwargs(url))
+    instrumentar_engine(nuevo, nombre)  # Conteo de queries / tiempo SQL / eventos del pool
+    return nuevo
+
+
+def url_async(url: str) -> str:
+    """
+    Convierte una URL sync (postgresql://, postgresql+psycopg2://, sqlite://)
+    a su driver async (asyncpg / aiosqlite).
+    """
+    url_obj = make_url(url)
+    driver = _DRIVERS_ASYNC.get(url_obj.get_backend_name())
+    if driver is None:
+        raise ValueError(f"No hay driver async configurado para {url_obj.get_backend_name()}")
+    return url_obj.set(drivername=driver).render_as_string(hide_password=False)
+
+
+def crear_async_engine(url: str, nombre: str = "async") -> AsyncEngine:
+    """Crea un AsyncEngine con la misma configuración de pool e instrumentación."""
+    kwargs = _pool_kwargs()
+    kwargs["poolclass"] = InstrumentedAsyncQueuePool
+
+    url_obj = make_url(url)
+    if url_obj.get_driver_name() == "asyncpg":
+        kwargs["insertmanyvalues_page_size"] = settings.db_executemany_page_size
+        if settings.db_statement_timeout_ms > 0:
+            kwargs["connect_args"] = {
+                "server_settings": {"statement_timeout": str(settings.db_statement_timeout_ms)}
+            }
+
+    nuevo = create_async_engine(url, **kwargs)
+    instrumentar_engine(nuevo, nombre)
+    return nuevo
+
+
 # Motor de base de datos
-engine = create_engine(
-    settings.database_url,
-    pool_pre_ping=True,  # Verifica conexiones antes de usarlas
-    pool_size=5,  # Conexiones en el pool
-    max_overflow=10,  # Conexiones adicionales permitidas
-    echo=settings.debug  # Log de SQL queries en modo debug
-)
+engine = crear_engine(settings.database_url)
 
 # Factory de sesiones
 SessionLocal = sessionmaker(
@@ -25,6 +112,15 @@ SessionLocal = sessionmaker(
     bind=engine
 )
 
+# Motor y sesiones async (handlers async def). Mismo primario, pool propio.
+async_engine = crear_async_engine(settings.database_async_url or url_async(settings.database_url))
+
+AsyncSessionLocal = async_sessionmaker(
+    async_engine,
+    autoflush=False,
+    expire_on_commit=False  # Evita lazy loads implícitos tras commit (no permitidos en async)
+)
+
 # Clase base para modelos ORM
 Base = declarative_base()
 
@@ -44,3 +140,209 @@ def get_db():
         yield db
     finally:
         db.close()
+
+
+async def get_async_db():
+    """
+    Generador de sesiones async para handlers async def.
+
+    Uso:
+        @app.get("/items")
+        async def read_items(db: AsyncSession = Depends(get_async_db)):
+            ...
+    """
+    async with AsyncSessionLocal() as db:
+        yield db
+
+
+# ----------------------------------------------------------------------
+# Réplicas de lectura
+# ----------------------------------------------------------------------
+
+DB_READ_ROUTING = registry.counter(
+    "db_read_routing_total", "Sesiones de lectura por destino (réplica o primario)", ["target", "reason"]
+)
+DB_REPLICA_HEALTHY = registry.gauge("db_replica_healthy", "1 si la réplica está sana", ["replica"])
+
+
+class _Replica:
+    """Engine + sessionmaker de una réplica, con health check periódico."""
+
+    def __init__(self, nombre: str, url: str):
+        self.nombre = nombre
+        self.engine = crear_engine(url, nombre)
+        self.session_factory = sessionmaker(autocommit=False, autoflush=False, bind=self.engine)
+        self.async_engine = crear_async_engine(url_async(url), f"{nombre}_async")
+        self.async_session_factory = async_sessionmaker(
+            self.async_engine, autoflush=False, expire_on_commit=False
+        )
+        self.sana = True
+        self._ultimo_chequeo = 0.0
+        self._lock = threading.Lock()
+
+    def esta_sana(self) -> bool:
+        """Estado de salud; re-chequea si pasó el intervalo configurado."""
+        if time.monotonic() - self._ultimo_chequeo < settings.db_replica_health_check_seconds:
+            return self.sana
+
+        # Un solo thread chequea; los demás usan el último estado conocido
+        if not self._lock.acquire(blocking=False):
+            return self.sana
+        try:
+            self.sana = self._chequear()
+            self._ultimo_chequeo = time.monotonic()
+            DB_REPLICA_HEALTHY.set(1 if self.sana else 0, replica=self.nombre)
+        finally:
+            self._lock.release()
+        return self.sana
+
+    def _chequear(self) -> bool:
+        try:
+            with self.engine.connect() as conn:
+                if self.engine.dialect.name != "postgresql" or settings.db_replica_max_lag_seconds <= 0:
+                    conn.execute(text("SELECT 1"))
+                    return True
+
+                # NULL si no es réplica o aún no reprodujo transacciones
+                lag = conn.execute(text(
+                    "SELECT EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp())"
+                )).scalar()
+                if lag is not None and lag > settings.db_replica_max_lag_seconds:
+                    print(f"⚠️  Read replica {self.nombre} lagging {lag:.0f}s - routing reads to primary")
+                    return False
+                return True
+        except Exception as e:
+            print(f"⚠️  Read replica {self.nombre} health check failed: {e}")
+            return False
+
+
+class ReplicaRouter:
+    """
+    Enruta sesiones de solo lectura a réplicas (round-robin entre las sanas).
+
+    Lee del primario cuando:
+    - no hay réplicas configuradas o ninguna está sana
+    - el bufete escribió hace menos de db_read_after_write_seconds
+      (read-after-write; el registro de escrituras es por proceso)
+    """
+
+    def __init__(self, urls: List[str]):
+        self.replicas = [_Replica(f"replica{i + 1}", url) for i, url in enumerate(urls)]
+        self._siguiente = 0
+        self._lock = threading.Lock()
+        self._ultima_escritura: Dict[int, float] = {}
+
+    def registrar_escritura(self, firm_id: int):
+        """Marca que el bufete acaba de escribir en el primario."""
+        self._ultima_escritura[firm_id] = time.monotonic()
+
+    def _escritura_reciente(self, firm_id: Optional[int]) -> bool:
+        if firm_id is None or settings.db_read_after_write_seconds <= 0:
+            return False
+        ultima = self._ultima_escritura.get(firm_id)
+        return ultima is not None and time.monotonic() - ultima < settings.db_read_after_write_seconds
+
+    def _seleccionar_replica(self) -> Optional[_Replica]:
+        with self._lock:
+            inicio = self._siguiente
+            self._siguiente = (self._siguiente + 1) % len(self.replicas)
+
+        for i in range(len(self.replicas)):
+            replica = self.replicas[(inicio + i) % len(self.replicas)]
+            if replica.esta_sana():
+                return replica
+        return None
+
+    def replica_lectura(self, firm_id: Optional[int] = None) -> Optional[_Replica]:
+        """Réplica para la lectura, o None si debe ir al primario."""
+        if not self.replicas:
+            return None
+
+        if self._escritura_reciente(firm_id):
+            DB_READ_ROUTING.inc(target="primary", reason="read_after_write")
+            return None
+
+        replica = self._seleccionar_replica()
+        if replica is None:
+            DB_READ_ROUTING.inc(target="primary", reason="no_healthy_replica")
+            return None
+
+        DB_READ_ROUTING.inc(target=replica.nombre, reason="replica")
+        return replica
+
+    def session_lectura(self, firm_id: Optional[int] = None) -> Session:
+        """Sesión para lecturas: réplica si es posible, primario si no."""
+        replica = self.replica_lectura(firm_id)
+        return replica.session_factory() if replica else SessionLocal()
+
+    async def async_session_lectura(self, firm_id: Optional[int] = None) -> AsyncSession:
+        """Como session_lectura, para handlers async (health check fuera del event loop)."""
+        if not self.replicas:
+            return AsyncSessionLocal()
+        replica = await run_in_threadpool(self.replica_lectura, firm_id)
+        return replica.async_session_factory() if replica else AsyncSessionLocal()
+
+
+replica_router = ReplicaRouter(settings.database_replica_urls_list)
+
+
+def get_read_db(x_firm_id: Annotated[int | None, Header()] = None):
+    """
+    Como get_db, pero para endpoints de solo lectura: la sesión puede
+    apuntar a una réplica. No usar para escrituras.
+
+    Uso:
+        @app.get("/items")
+        def read_items(db: Session = Depends(get_read_db)):
+            ...
+    """
+    db = replica_router.session_lectura(x_firm_id)
+    try:
+        yield db
+    finally:
+        db.close()
+
+
+async def get_async_read_db(x_firm_id: Annotated[int | None, Header()] = None):
+    """Como get_read_db, para handlers async def."""
+    db = await replica_router.async_session_lectura(x_firm_id)
+    try:
+        yield db
+    finally:
+        await db.close()
+
+
+# Commits del primario durante el request en curso (read-after-write)
+_commits_request: ContextVar[Optional[dict]] = ContextVar("commits_request", default=None)
+
+
+# Escucha en Session para cubrir también las sesiones async (AsyncSession
+# delega en una Session sync); las réplicas nunca hacen commit.
+@event.listens_for(Session, "after_commit")
+def _marcar_commit(session):
+    marca = _commits_request.get()
+    if marca is not None:
+        marca["commit"] = True
+
+
+async def read_after_write_middleware(request: Request, call_next):
+    """
+    Si el request hizo commit en el primario, registra la escritura del
+    bufete (header X-Firm-ID) para que sus lecturas siguientes no vayan a
+    una réplica atrasada.
+    """
+    if not replica_router.replicas:
+        return await call_next(request)
+
+    marca = {"commit": False}
+    token = _commits_request.set(marca)
+    try:
+        response = await call_next(request)
+    finally:
+        _commits_request.reset(token)
+
+    firm_id = request.headers.get("x-firm-id", "")
+    if marca["commit"] and firm_id.isdigit():
+        replica_router.registrar_escritura(int(firm_id))
+
+    return response
@@ -0,0 +1,247 @@
+"""
+Instrumentación de base de datos por request.
+
+Hooks before/after_cursor_execute de SQLAlchemy acumulan, para el request
+en curso (ContextVar), el número de queries, el tiempo total de SQL y
+cuántas veces se repite cada sentencia normalizada (fingerprint). Si una
+misma sentencia se repite más de `db_n_plus_one_threshold` veces en un
+request se registra como posible N+1.
+
+Los resultados se exponen:
+- como headers X-DB-* en modo debug
+- en el registro de métricas (app.metrics)
+
+También mide el pool de conexiones: tiempo de espera al obtener una
+conexión (InstrumentedQueuePool) y tamaño / conexiones en uso.
+"""
+
+import re
+import time
+from collections import Counter as _Contador
+from contextvars import ContextVar
+from typing import List, Optional, Tuple, Union
+
+from fastapi import Request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlalchemy.ext.asyncio import AsyncEngine
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+
+from app.config import get_settings
+from app.metrics import registry
+
+settings = get_settings()
+
+# Métricas de base de datos por ruta
+DB_QUERIES_PER_REQUEST = registry.histogram(
+    "db_queries_per_request", "Queries SQL ejecutadas por request", ["route"],
+    buckets=(1, 2, 5, 10, 20, 50, 100, 200, 500)
+)
+DB_SQL_SECONDS_PER_REQUEST = registry.histogram(
+    "db_sql_seconds_per_request", "Tiempo total de SQL por request (segundos)", ["route"]
+)
+DB_N_PLUS_ONE_TOTAL = registry.counter(
+    "db_n_plus_one_total", "Requests con una sentencia repetida sobre el umbral N+1", ["route"]
+)
+
+# Métricas del pool de conexiones
+DB_POOL_CHECKOUT_WAIT = registry.histogram(
+    "db_pool_checkout_wait_seconds", "Espera para obtener una conexión del pool (segundos)", ["pool"],
+    buckets=(0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 30.0)
+)
+DB_POOL_SIZE = registry.gauge("db_pool_size", "Tamaño configurado del pool", ["pool"])
+DB_POOL_CHECKED_OUT = registry.gauge("db_pool_checked_out", "Conexiones en uso", ["pool"])
+DB_POOL_OVERFLOW = registry.gauge("db_pool_overflow", "Conexiones de overflow abiertas", ["pool"])
+DB_POOL_EVENTS = registry.counter(
+    "db_pool_events_total", "Eventos del pool (connect, checkout, checkin, invalidate, ...)", ["pool", "event"]
+)
+
+# Eventos del pool que se cuentan en DB_POOL_EVENTS
+_EVENTOS_POOL = ("connect", "checkout", "checkin", "invalidate", "soft_invalidate", "close")
+
+# Normalización de sentencias para el fingerprint
+_RE_PARAMS = re.compile(r"%\(\w+\)s|%s|\?|(?<!:):\w+")
+_RE_LISTAS = re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)")
+_RE_STRINGS = re.compile(r"'(?:[^']|'')*'")
+_RE_NUMEROS = re.compile(r"\b\d+(?:\.\d+)?\b")
+_RE_ESPACIOS = re.compile(r"\s+")
+
+
+def fingerprint(statement: str) -> str:
+    """
+    Normaliza una sentencia SQL: parámetros, literales y listas IN se
+    reemplazan por '?' para agrupar ejecuciones de la misma consulta.
+    """
+    sql = _RE_STRINGS.sub("?", statement)
+    sql = _RE_PARAMS.sub("?", sql)
+    sql = _RE_NUMEROS.sub("?", sql)
+    sql = _RE_LISTAS.sub("(?)", sql)
+    return _RE_ESPACIOS.sub(" ", sql).strip()
+
+
+class EstadisticasRequest:
+    """Acumulador de queries de un request."""
+
+    __slots__ = ("queries", "sql_seconds", "fingerprints")
+
+    def __init__(self):
+        self.queries = 0
+        self.sql_seconds = 0.0
+        self.fingerprints: _Contador = _Contador()
+
+    def registrar(self, statement: str, duracion: float):
+        self.queries += 1
+        self.sql_seconds += duracion
+        self.fingerprints[fingerprint(statement)] += 1
+
+    def repetidas(self, umbral: int) -> List[Tuple[str, int]]:
+        """Sentencias ejecutadas más de `umbral` veces, de mayor a menor."""
+        return [(sql, n) for sql, n in self.fingerprints.most_common() if n > umbral]
+
+    def max_repeticiones(self) -> int:
+        return max(self.fingerprints.values(), default=0)
+
+
+_estadisticas: ContextVar[Optional[EstadisticasRequest]] = ContextVar("db_estadisticas", default=None)
+
+
+def estadisticas_actuales() -> Optional[EstadisticasRequest]:
+    """Estadísticas del request en curso (None fuera de un request)."""
+    return _estadisticas.get()
+
+
+# ----------------------------------------------------------------------
+# Hooks de SQLAlchemy
+# ----------------------------------------------------------------------
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if _estadisticas.get() is not None:
+        conn.info.setdefault("_query_inicio", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    stats = _estadisticas.get()
+    if stats is None:
+        return
+    inicios = conn.info.get("_query_inicio")
+    if not inicios:
+        return
+    stats.registrar(statement, time.perf_counter() - inicios.pop())
+
+
+def instrumentar_engine(engine: Union[Engine, AsyncEngine], nombre: str = "primary"):
+    """
+    Registra los hooks de conteo/tiempo de SQL en un engine (sync o async)
+    y publica el estado y los eventos de su pool con label pool=<nombre>.
+    """
+    if isinstance(engine, AsyncEngine):
+        engine = engine.sync_engine
+
+    if isinstance(engine.pool, _MedicionCheckout):
+        engine.pool.nombre = nombre
+        registry.register_collector(lambda: _publicar_estado_pool(engine.pool, nombre))
+
+    for evento in _EVENTOS_POOL:
+        event.listen(engine, evento, _contador_evento_pool(nombre, evento))
+
+    if not settings.db_instrumentation_enabled:
+        return
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+
+
+# ----------------------------------------------------------------------
+# Pool de conexiones
+# ----------------------------------------------------------------------
+
+class _MedicionCheckout:
+    """
+    Mixin de pool que mide cuánto espera cada checkout (incluye abrir una
+    conexión nueva cuando hay overflow disponible).
+    """
+
+    nombre = "primary"
+
+    def _do_get(self):
+        inicio = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            DB_POOL_CHECKOUT_WAIT.observe(time.perf_counter() - inicio, pool=self.nombre)
+
+    def recreate(self):
+        # dispose()/recreate() conserva el label del pool
+        nuevo = super().recreate()
+        nuevo.nombre = self.nombre
+        return nuevo
+
+
+class InstrumentedQueuePool(_MedicionCheckout, QueuePool):
+    """QueuePool con medición de espera de checkout."""
+    pass
+
+
+class InstrumentedAsyncQueuePool(_MedicionCheckout, AsyncAdaptedQueuePool):
+    """Pool del engine async con medición de espera de checkout."""
+    pass
+
+
+def _contador_evento_pool(nombre: str, evento: str):
+    """Listener de un evento del pool que incrementa DB_POOL_EVENTS."""
+    def _listener(*args):
+        DB_POOL_EVENTS.inc(pool=nombre, event=evento)
+    return _listener
+
+
+def _publicar_estado_pool(pool: QueuePool, nombre: str):
+    DB_POOL_SIZE.set(pool.size(), pool=nombre)
+    DB_POOL_CHECKED_OUT.set(pool.checkedout(), pool=nombre)
+    DB_POOL_OVERFLOW.set(max(pool.overflow(), 0), pool=nombre)
+
+
+# ----------------------------------------------------------------------
+# Middleware
+# ----------------------------------------------------------------------
+
+def nombre_ruta(request: Request) -> str:
+    """Plantilla de la ruta (p. ej. /api/v1/clientes/{cliente_id}) para labels de métricas."""
+    route = request.scope.get("route")
+    return getattr(route, "path", None) or "unmatched"
+
+
+async def db_instrumentation_middleware(request: Request, call_next):
+    """
+    Middleware HTTP: abre un acumulador por request y al terminar publica
+    métricas, advierte de posibles N+1 y (en debug) agrega headers X-DB-*.
+    """
+    if not settings.db_instrumentation_enabled:
+        return await call_next(request)
+
+    stats = EstadisticasRequest()
+    token = _estadisticas.set(stats)
+    try:
+        response = await call_next(request)
+    finally:
+        _estadisticas.reset(token)
+
+    ruta = nombre_ruta(request)
+    DB_QUERIES_PER_REQUEST.observe(stats.queries, route=ruta)
+    DB_SQL_SECONDS_PER_REQUEST.observe(stats.sql_seconds, route=ruta)
+
+    repetidas = stats.repetidas(settings.db_n_plus_one_threshold)
+    if repetidas:
+        DB_N_PLUS_ONE_TOTAL.inc(route=ruta)
+        sql, veces = repetidas[0]
+        print(
+            f"⚠️  Possible N+1 on {request.method} {ruta}: "
+            f"{veces}x {sql[:200]} ({stats.queries} queries total)"
+        )
+
+    if settings.debug:
+        response.headers["X-DB-Query-Count"] = str(stats.queries)
+        response.headers["X-DB-Time-Ms"] = f"{stats.sql_seconds * 1000:.1f}"
+        response.headers["X-DB-Max-Repeated"] = str(stats.max_repeticiones())
+        if repetidas:
+            response.headers["X-DB-N-Plus-One"] = str(len(repetidas))
+
+    return response
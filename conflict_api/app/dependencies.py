@@ -3,7 +3,7 @@ Dependencias compartidas para FastAPI.
 """
 
 from fastapi import Header, HTTPException, status
-from typing import Annotated
+from typing import Annotated, Literal
 
 
 def get_firm_id(
@@ -39,3 +39,10 @@ def get_firm_id(
         )
 
     return x_firm_id
+
+
+# Header con el cursor de la página siguiente (paginación keyset)
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+# Órdenes válidos para paginación keyset en endpoints de listado
+OrdenKeyset = Literal["id", "creado_en"]
@@ -0,0 +1,40 @@
+"""
+Métricas HTTP: latencia por ruta y requests en vuelo.
+"""
+
+import time
+
+from fastapi import Request
+
+from app.db_instrumentation import nombre_ruta
+from app.metrics import registry
+
+HTTP_REQUEST_DURATION = registry.histogram(
+    "http_request_duration_seconds", "Latencia de requests HTTP (segundos)",
+    ["method", "route", "status"]
+)
+HTTP_REQUESTS_IN_FLIGHT = registry.gauge(
+    "http_requests_in_flight", "Requests HTTP en proceso"
+)
+
+
+async def http_metrics_middleware(request: Request, call_next):
+    """
+    Middleware HTTP: mide la latencia hasta que la respuesta está lista
+    (en StreamingResponse no incluye el envío del cuerpo).
+    """
+    HTTP_REQUESTS_IN_FLIGHT.inc()
+    inicio = time.perf_counter()
+    status_code = 500
+    try:
+        response = await call_next(request)
+        status_code = response.status_code
+        return response
+    finally:
+        HTTP_REQUESTS_IN_FLIGHT.dec()
+        HTTP_REQUEST_DURATION.observe(
+            time.perf_counter() - inicio,
+            method=request.method,
+            route=nombre_ruta(request),
+            status=str(status_code)
+        )
@@ -5,6 +5,7 @@ PLUS: Sistema automatizado de facturación y cobros.
 """
 
 from fastapi import FastAPI
+from fastapi.responses import Response
 from fastapi.middleware.cors import CORSMiddleware
 from contextlib import asynccontextmanager
 
@@ -12,10 +13,15 @@ from fastapi.staticfiles import StaticFiles
 import os
 
 from app.config import get_settings
+from app.database import read_after_write_middleware, async_engine
+from app.db_instrumentation import db_instrumentation_middleware
+from app.http_metrics import http_metrics_middleware
+from app.metrics import registry, CONTENT_TYPE_LATEST
 from app.routers import firmas, clientes, asuntos, partes_relacionadas, conflictos, billing
-from app.routers import firm_settings, uploads
+from app.routers import firm_settings, uploads, importaciones, exportaciones
 # from app.routers import calls  # Phase 2: AI Call Agent (disabled for now)
 from app.services.billing_communication.billing_scheduler import billing_scheduler
+from app.services.billing_communication.delivery_events import delivery_events
 
 settings = get_settings()
 
@@ -33,11 +39,19 @@ async def lifespan(app: FastAPI):
     billing_scheduler.start()
     print("Billing Reminder Scheduler started")
     
+    delivery_events.start()
+    
     yield
     
     # Shutdown: Detener scheduler
     billing_scheduler.stop()
     print("Billing Reminder Scheduler stopped")
+    
+    # Aplicar los eventos de entrega que queden en la bandeja
+    delivery_events.stop()
+    
+    # Cerrar conexiones del engine async
+    await async_engine.dispose()
     print("="*60 + "\n")
 
 
@@ -59,8 +73,21 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=[
+        "X-Next-Cursor",  # Cursor de paginación keyset
+        "X-DB-Query-Count", "X-DB-Time-Ms", "X-DB-Max-Repeated", "X-DB-N-Plus-One",  # Debug
+    ],
 )
 
+# Conteo de queries, tiempo SQL y detección de N+1 por request
+app.middleware("http")(db_instrumentation_middleware)
+
+# Read-after-write: tras un commit del bufete, sus lecturas van al primario
+app.middleware("http")(read_after_write_middleware)
+
+# Latencia por ruta y requests en vuelo (registrado al final = más externo)
+app.middleware("http")(http_metrics_middleware)
+
 # Registrar routers existentes
 app.include_router(
     firmas.router,
@@ -92,6 +119,18 @@ app.include_router(
     tags=["Verificación de Conflictos"]
 )
 
+app.include_router(
+    importaciones.router,
+    prefix=f"/api/{settings.api_version}",
+    tags=["Importaciones"]
+)
+
+app.include_router(
+    exportaciones.router,
+    prefix=f"/api/{settings.api_version}",
+    tags=["Exportaciones"]
+)
+
 # AI CALL AGENT - Phase 2
 # app.include_router(
 #     calls.router,
@@ -150,4 +189,10 @@ async def health_check():
         "status": "healthy",
         "service": "professional-hubs-api",
         "billing_scheduler": "running" if billing_scheduler.is_running else "stopped"
-    }
\ No newline at end of file
+    }
+
+
+@app.get("/metrics", include_in_schema=False)
+def metrics():
+    """Métricas del proceso en formato de texto Prometheus."""
+    return Response(content=registry.render(), media_type=CONTENT_TYPE_LATEST)
@@ -0,0 +1,216 @@
+"""
+Registro de métricas en proceso (formato de texto Prometheus).
+
+Sin dependencias externas: contadores, gauges e histogramas con labels,
+seguros entre threads. Cada worker de gunicorn tiene su propio registro.
+
+Uso:
+    from app.metrics import registry
+
+    requests = registry.counter("http_requests_total", "Requests", ["route"])
+    requests.inc(route="/api/v1/clientes")
+"""
+
+import threading
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+# Buckets por defecto (segundos), similares a los de prometheus_client
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+LabelValues = Tuple[str, ...]
+
+
+def _escape(valor: str) -> str:
+    """Escapa un valor de label según el formato de texto Prometheus."""
+    return valor.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(nombres: Sequence[str], valores: Sequence[str], extra: str = "") -> str:
+    pares = [f'{n}="{_escape(v)}"' for n, v in zip(nombres, valores)]
+    if extra:
+        pares.append(extra)
+    return "{" + ",".join(pares) + "}" if pares else ""
+
+
+def _format_value(valor: float) -> str:
+    if valor == float("inf"):
+        return "+Inf"
+    if float(valor).is_integer():
+        return str(int(valor))
+    return repr(float(valor))
+
+
+class _Metric:
+    """Base: nombre, ayuda, labels y lock."""
+
+    tipo = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames: Tuple[str, ...] = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, str]) -> LabelValues:
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name}: labels esperados {self.labelnames}, recibidos {tuple(labels)}")
+        return tuple(str(labels[n]) for n in self.labelnames)
+
+    def render(self) -> List[str]:
+        lineas = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.tipo}"]
+        lineas.extend(self._samples())
+        return lineas
+
+    def _samples(self) -> List[str]:
+        raise NotImplementedError
+
+
+class Counter(_Metric):
+    """Contador monotónico."""
+
+    tipo = "counter"
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._values: Dict[LabelValues, float] = {}
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def get(self, **labels) -> float:
+        return self._values.get(self._key(labels), 0)
+
+    def _samples(self) -> List[str]:
+        with self._lock:
+            items = list(self._values.items())
+        return [f"{self.name}{_format_labels(self.labelnames, k)} {_format_value(v)}" for k, v in items]
+
+
+class Gauge(Counter):
+    """Valor que sube y baja (en vuelo, tamaño de pool, etc.)."""
+
+    tipo = "gauge"
+
+    def dec(self, amount: float = 1, **labels):
+        self.inc(-amount, **labels)
+
+    def set(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+
+class Histogram(_Metric):
+    """Histograma con buckets acumulativos, _sum y _count."""
+
+    tipo = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets: Tuple[float, ...] = tuple(sorted(buckets)) + (float("inf"),)
+        # key -> [conteos por bucket (no acumulados), suma, total]
+        self._values: Dict[LabelValues, list] = {}
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            datos = self._values.get(key)
+            if datos is None:
+                datos = [[0] * len(self.buckets), 0.0, 0]
+                self._values[key] = datos
+            for i, limite in enumerate(self.buckets):
+                if value <= limite:
+                    datos[0][i] += 1
+                    break
+            datos[1] += value
+            datos[2] += 1
+
+    def get_count(self, **labels) -> int:
+        datos = self._values.get(self._key(labels))
+        return datos[2] if datos else 0
+
+    def _samples(self) -> List[str]:
+        with self._lock:
+            items = [(k, (list(v[0]), v[1], v[2])) for k, v in self._values.items()]
+
+        lineas = []
+        for key, (conteos, suma, total) in items:
+            acumulado = 0
+            for limite, conteo in zip(self.buckets, conteos):
+                acumulado += conteo
+                le = f'le="{_format_value(limite)}"'
+                lineas.append(f"{self.name}_bucket{_format_labels(self.labelnames, key, le)} {acumulado}")
+            etiquetas = _format_labels(self.labelnames, key)
+            lineas.append(f"{self.name}_sum{etiquetas} {_format_value(suma)}")
+            lineas.append(f"{self.name}_count{etiquetas} {total}")
+        return lineas
+
+
+class MetricsRegistry:
+    """
+    Registro de métricas del proceso.
+    counter()/gauge()/histogram() retornan la métrica existente si ya se
+    registró con ese nombre, así los módulos pueden declararlas al importarse.
+    Los collectors se ejecutan justo antes de render() para actualizar
+    gauges que se leen bajo demanda (p. ej. estado del pool de conexiones).
+    """
+
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+        self._collectors: List[Callable[[], None]] = []
+        self._lock = threading.Lock()
+
+    def _get_or_create(self, cls, name: str, *args, **kwargs):
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = cls(name, *args, **kwargs)
+                self._metrics[name] = metric
+            elif type(metric) is not cls:
+                raise ValueError(f"Métrica {name} ya registrada como {metric.tipo}")
+            return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Iterable[str] = ()) -> Counter:
+        return self._get_or_create(Counter, name, documentation, labelnames)
+
+    def gauge(self, name: str, documentation: str, labelnames: Iterable[str] = ()) -> Gauge:
+        return self._get_or_create(Gauge, name, documentation, labelnames)
+
+    def histogram(self, name: str, documentation: str, labelnames: Iterable[str] = (),
+                  buckets: Optional[Sequence[float]] = None) -> Histogram:
+        return self._get_or_create(
+            Histogram, name, documentation, labelnames, buckets=buckets or DEFAULT_BUCKETS
+        )
+
+    def register_collector(self, collector: Callable[[], None]):
+        """Registra una función que actualiza gauges antes de cada render()."""
+        with self._lock:
+            self._collectors.append(collector)
+
+    def render(self) -> str:
+        """Todas las métricas en formato de texto Prometheus (0.0.4)."""
+        with self._lock:
+            collectors = list(self._collectors)
+        for collector in collectors:
+            try:
+                collector()
+            except Exception as e:
+                print(f"⚠️  Metrics collector failed: {e}")
+
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lineas: List[str] = []
+        for metric in metrics:
+            lineas.extend(metric.render())
+        return "\n".join(lineas) + "\n"
+
+
+# Content-Type del formato de texto Prometheus
+CONTENT_TYPE_LATEST = "text/plain; version=0.0.4"  # Starlette agrega "; charset=utf-8"
+
+
+# Singleton instance
+registry = MetricsRegistry()
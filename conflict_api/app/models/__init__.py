@@ -11,6 +11,9 @@ from app.models.estudios import Estudios
 from app.models.areas_practica import AreasPractica
 from app.models.ubicacion import Ubicacion
 from app.models.planes import Planes
+from app.models.ventana_cobro import VentanaCobro
+from app.models.barrido_conflictos import BarridoConflictos, CoincidenciaBarrido
+from app.models.invoice import Invoice
 
 __all__ = [
     "Firma",
@@ -22,4 +25,8 @@ __all__ = [
     "AreasPractica",
     "Ubicacion",
     "Planes",
+    "VentanaCobro",
+    "BarridoConflictos",
+    "CoincidenciaBarrido",
+    "Invoice",
 ]
@@ -63,6 +63,7 @@ class Asunto(Base):
     __table_args__ = (
         Index('ix_asuntos_cliente_estado', 'cliente_id', 'estado'),
         Index('ix_asuntos_fecha_apertura', 'fecha_apertura'),
+        Index('ix_asuntos_creado_id', 'creado_en', 'id'),
     )
     
     def __repr__(self):
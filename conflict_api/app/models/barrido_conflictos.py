@@ -0,0 +1,151 @@
+"""
+Modelos de Barrido de Conflictos (Firm-wide Conflict Sweep).
+Registra ejecuciones del barrido periódico y las coincidencias encontradas.
+Uses String columns instead of PostgreSQL ENUMs for deployment reliability.
+"""
+
+from datetime import datetime
+from sqlalchemy import Column, Integer, String, DateTime, Boolean, Float, Text, ForeignKey, Index
+from sqlalchemy.orm import relationship
+from app.database import Base
+
+
+# Python class for validation (not stored in DB as enum)
+class EstadoBarrido:
+    """Estados posibles de una ejecución de barrido."""
+    PENDIENTE = "PENDIENTE"
+    EN_PROGRESO = "EN_PROGRESO"
+    COMPLETADO = "COMPLETADO"
+    FALLIDO = "FALLIDO"
+
+    @classmethod
+    def values(cls):
+        return [cls.PENDIENTE, cls.EN_PROGRESO, cls.COMPLETADO, cls.FALLIDO]
+
+
+class FaseBarrido:
+    """Índice que se recorre por páginas: primero partes, luego clientes."""
+    PARTES = "PARTES"  # Cliente x parte relacionada
+    CLIENTES = "CLIENTES"  # Cliente x cliente (duplicados)
+
+    @classmethod
+    def values(cls):
+        return [cls.PARTES, cls.CLIENTES]
+
+
+class TipoCoincidenciaBarrido:
+    """Tipos de coincidencia detectados por el barrido."""
+    CLIENTE_PARTE = "CLIENTE_PARTE"  # Cliente aparece como parte en otro asunto
+    CLIENTE_DUPLICADO = "CLIENTE_DUPLICADO"  # Dos clientes con nombre similar
+
+    @classmethod
+    def values(cls):
+        return [cls.CLIENTE_PARTE, cls.CLIENTE_DUPLICADO]
+
+
+class BarridoConflictos(Base):
+    """
+    Ejecución del barrido de conflictos para un bufete.
+    Guarda el checkpoint (página del índice y último cliente procesado
+    contra ella) para poder reanudar.
+    """
+
+    __tablename__ = "barridos_conflictos"
+
+    id = Column(Integer, primary_key=True, index=True)
+    firma_id = Column(
+        Integer,
+        ForeignKey("firmas.id", ondelete="CASCADE"),
+        nullable=False,
+        index=True,
+        comment="ID del bufete (multi-tenant)"
+    )
+
+    estado = Column(
+        String(20),
+        default=EstadoBarrido.PENDIENTE,
+        nullable=False,
+        comment="Estado: PENDIENTE, EN_PROGRESO, COMPLETADO, FALLIDO"
+    )
+    umbral = Column(Integer, nullable=False, comment="Similitud mínima usada (0-100)")
+
+    # Checkpoint para reanudar
+    fase = Column(
+        String(20),
+        default=FaseBarrido.PARTES,
+        nullable=False,
+        comment="Índice en curso: PARTES, CLIENTES"
+    )
+    indice_desde_id = Column(Integer, nullable=False, default=0, comment="Página del índice: objetivos con id > este")
+    indice_hasta_id = Column(Integer, nullable=True, comment="Página del índice: objetivos con id <= este (NULL = sin fijar)")
+    ultimo_cliente_id = Column(Integer, nullable=False, default=0, comment="Último cliente procesado contra la página (checkpoint)")
+
+    # Progreso
+    clientes_procesados = Column(Integer, nullable=False, default=0)
+    pares_evaluados = Column(Integer, nullable=False, default=0, comment="Pares candidatos tras blocking")
+    coincidencias_encontradas = Column(Integer, nullable=False, default=0)
+
+    iniciado_en = Column(DateTime, nullable=True)
+    finalizado_en = Column(DateTime, nullable=True)
+    error = Column(Text, nullable=True, comment="Mensaje de error si falló")
+
+    # Auditoría
+    esta_activo = Column(Boolean, default=True, nullable=False, comment="Soft delete flag")
+    creado_en = Column(DateTime, default=datetime.utcnow, nullable=False)
+    actualizado_en = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
+
+    # Relaciones
+    coincidencias = relationship("CoincidenciaBarrido", back_populates="barrido", lazy="dynamic")
+
+    __table_args__ = (
+        Index('ix_barridos_firma_estado', 'firma_id', 'estado'),
+    )
+
+    def __repr__(self):
+        return f"<BarridoConflictos(id={self.id}, firma_id={self.firma_id}, estado={self.estado})>"
+
+
+class CoincidenciaBarrido(Base):
+    """
+    Coincidencia encontrada por el barrido (fila del reporte).
+    """
+
+    __tablename__ = "coincidencias_barrido"
+
+    id = Column(Integer, primary_key=True, index=True)
+    barrido_id = Column(
+        Integer,
+        ForeignKey("barridos_conflictos.id", ondelete="CASCADE"),
+        nullable=False,
+        index=True,
+        comment="ID de la ejecución del barrido"
+    )
+    firma_id = Column(Integer, nullable=False, comment="ID del bufete (desnormalizado para filtrar)")
+
+    tipo_coincidencia = Column(String(30), nullable=False, comment="CLIENTE_PARTE o CLIENTE_DUPLICADO")
+
+    cliente_id = Column(Integer, nullable=False, comment="Cliente evaluado")
+    cliente_nombre = Column(String(500), nullable=False)
+
+    # Contraparte: una parte relacionada o un segundo cliente
+    parte_id = Column(Integer, nullable=True, comment="Parte relacionada coincidente")
+    asunto_id = Column(Integer, nullable=True, comment="Asunto de la parte coincidente")
+    otro_cliente_id = Column(Integer, nullable=True, comment="Cliente coincidente (duplicados)")
+    contraparte_nombre = Column(String(500), nullable=False)
+    tipo_relacion = Column(String(30), nullable=True)
+
+    similitud_score = Column(Float, nullable=False)
+    nivel_confianza = Column(String(10), nullable=False, comment="alta o media")
+
+    creado_en = Column(DateTime, default=datetime.utcnow, nullable=False)
+
+    # Relaciones
+    barrido = relationship("BarridoConflictos", back_populates="coincidencias")
+
+    __table_args__ = (
+        Index('ix_coincidencias_barrido_score', 'barrido_id', 'similitud_score'),
+        Index('ix_coincidencias_barrido_cliente', 'barrido_id', 'cliente_id'),
+    )
+
+    def __repr__(self):
+        return f"<CoincidenciaBarrido(id={self.id}, cliente_id={self.cliente_id}, score={self.similitud_score})>"
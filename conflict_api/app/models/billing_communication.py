@@ -1,11 +1,15 @@
 """
 Modelo de Billing Communication Logs.
-Rastrea todas las comunicaciones de cobro enviadas a clientes.
+Rastrea todas las comunicaciones de cobro enviadas a clientes, el outbox
+de envíos pendientes (billing_outbox), las corridas manuales del
+scheduler (billing_scheduler_jobs) y la bandeja de eventos de entrega
+de los webhooks (billing_delivery_events).
 Uses String columns instead of PostgreSQL ENUMs for deployment reliability.
 """
 
 from datetime import datetime
-from sqlalchemy import Column, Integer, String, DateTime, Boolean, Text, ForeignKey, Index
+from sqlalchemy import Column, Integer, String, DateTime, Boolean, Text, ForeignKey, Index, text
+from sqlalchemy.dialects.postgresql import JSONB
 from sqlalchemy.orm import relationship
 from app.database import Base
 
@@ -36,6 +40,30 @@ class CommunicationStatus:
         return [cls.SENT, cls.DELIVERED, cls.FAILED, cls.BOUNCED, cls.READ]
 
 
+class OutboxStatus:
+    """Estado de un envío en el outbox."""
+    PENDING = "PENDING"  # Esperando envío (o reintento en next_attempt_at)
+    PROCESSING = "PROCESSING"  # Reclamado por un worker hasta locked_until
+    SENT = "SENT"
+    FAILED = "FAILED"  # Agotó los reintentos
+    
+    @classmethod
+    def values(cls):
+        return [cls.PENDING, cls.PROCESSING, cls.SENT, cls.FAILED]
+
+
+class SchedulerJobStatus:
+    """Estado de una corrida manual del scheduler."""
+    PENDING = "PENDING"
+    RUNNING = "RUNNING"
+    COMPLETED = "COMPLETED"  # Planificación terminada (los envíos siguen en el outbox)
+    FAILED = "FAILED"
+    
+    @classmethod
+    def values(cls):
+        return [cls.PENDING, cls.RUNNING, cls.COMPLETED, cls.FAILED]
+
+
 class BillingCommunicationLog(Base):
     """
     Registro de todas las comunicaciones de cobro.
@@ -91,7 +119,145 @@ class BillingCommunicationLog(Base):
         Index('ix_billing_comms_invoice_date', 'invoice_id', 'sent_at'),
         Index('ix_billing_comms_status', 'status'),
         Index('ix_billing_comms_type_date', 'type', 'sent_at'),
+        # Eventos de entrega de los webhooks (SendGrid / Twilio) por external_id
+        Index('ix_billing_comms_external_id', 'external_id', postgresql_where=text("external_id IS NOT NULL")),
+        # Idempotencia: una sola marca de danger zone activa por factura
+        Index(
+            'ux_billing_comms_danger_zone', 'invoice_id', unique=True,
+            postgresql_where=text("reminder_sequence = 4 AND esta_activo = true")
+        ),
     )
     
     def __repr__(self):
-        return f"<BillingCommunicationLog(id={self.id}, invoice_id={self.invoice_id}, type={self.type}, sent_at='{self.sent_at}')>"
\ No newline at end of file
+        return f"<BillingCommunicationLog(id={self.id}, invoice_id={self.invoice_id}, type={self.type}, sent_at='{self.sent_at}')>"
+
+
+class BillingOutbox(Base):
+    """
+    Intención de envío de un recordatorio (outbox transaccional).
+    El scheduler la escribe en la misma transacción que el resto de su
+    planificación; los workers la reclaman (FOR UPDATE SKIP LOCKED), envían
+    y registran el resultado en billing_communication_logs.
+    """
+    
+    __tablename__ = "billing_outbox"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    invoice_id = Column(
+        Integer,
+        ForeignKey("invoices.id", ondelete="CASCADE"),
+        nullable=False,
+        index=True,
+        comment="ID de la factura"
+    )
+    
+    channel = Column(String(20), nullable=False, comment="Canal: EMAIL, SMS")
+    reminder_level = Column(Integer, nullable=False, comment="Nivel de recordatorio (1, 2, 3)")
+    days_overdue = Column(Integer, nullable=False, comment="Días de atraso al planificar")
+    payload = Column(JSONB, nullable=False, comment="Datos del envío (destinatario, factura, bufete)")
+    
+    status = Column(
+        String(20),
+        default=OutboxStatus.PENDING,
+        nullable=False,
+        comment="Estado: PENDING, PROCESSING, SENT, FAILED"
+    )
+    attempts = Column(Integer, default=0, nullable=False, comment="Intentos de envío realizados")
+    next_attempt_at = Column(DateTime, default=datetime.utcnow, nullable=False, comment="Próximo intento (backoff)")
+    locked_until = Column(DateTime, nullable=True, comment="Fin del lease del worker que lo reclamó")
+    job_id = Column(
+        Integer,
+        ForeignKey("billing_scheduler_jobs.id", ondelete="SET NULL"),
+        nullable=True,
+        index=True,
+        comment="Corrida manual que lo encoló (NULL = corrida diaria)"
+    )
+    last_error = Column(Text, nullable=True, comment="Último error del proveedor")
+    external_id = Column(String(255), nullable=True, comment="ID de Twilio/SendGrid")
+    
+    # Auditoría
+    creado_en = Column(DateTime, default=datetime.utcnow, nullable=False)
+    actualizado_en = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
+    
+    __table_args__ = (
+        Index('ix_billing_outbox_status_next', 'status', 'next_attempt_at'),
+        # Idempotencia: un solo envío por factura, nivel y canal
+        Index('ux_billing_outbox_idempotency', 'invoice_id', 'reminder_level', 'channel', unique=True),
+    )
+    
+    def __repr__(self):
+        return f"<BillingOutbox(id={self.id}, invoice_id={self.invoice_id}, channel={self.channel}, status={self.status})>"
+
+
+class BillingSchedulerJob(Base):
+    """
+    Corrida manual del scheduler para un bufete (POST /billing/scheduler/trigger).
+    Corre en segundo plano; guarda el progreso de la planificación y sus
+    envíos quedan vinculados en billing_outbox.job_id.
+    """
+    
+    __tablename__ = "billing_scheduler_jobs"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    firma_id = Column(
+        Integer,
+        ForeignKey("firmas.id", ondelete="CASCADE"),
+        nullable=False,
+        index=True,
+        comment="ID del bufete (multi-tenant)"
+    )
+    
+    status = Column(
+        String(20),
+        default=SchedulerJobStatus.PENDING,
+        nullable=False,
+        comment="Estado: PENDING, RUNNING, COMPLETED, FAILED"
+    )
+    
+    # Progreso
+    invoices_scanned = Column(Integer, default=0, nullable=False, comment="Facturas que requerían acción")
+    invoices_processed = Column(Integer, default=0, nullable=False, comment="Facturas ya planificadas")
+    sends_queued = Column(Integer, default=0, nullable=False, comment="Envíos encolados en el outbox")
+    danger_zone_marked = Column(Integer, default=0, nullable=False, comment="Facturas marcadas danger zone")
+    
+    started_at = Column(DateTime, nullable=True)
+    finished_at = Column(DateTime, nullable=True)
+    error = Column(Text, nullable=True, comment="Mensaje de error si falló")
+    
+    # Auditoría
+    esta_activo = Column(Boolean, default=True, nullable=False, comment="Soft delete flag")
+    creado_en = Column(DateTime, default=datetime.utcnow, nullable=False)
+    actualizado_en = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
+    
+    __table_args__ = (
+        # Un solo job abierto (pendiente o en curso) por bufete
+        Index(
+            'ux_billing_scheduler_jobs_open', 'firma_id', unique=True,
+            postgresql_where=text("status IN ('PENDING', 'RUNNING') AND esta_activo = true")
+        ),
+    )
+    
+    def __repr__(self):
+        return f"<BillingSchedulerJob(id={self.id}, firma_id={self.firma_id}, status={self.status})>"
+
+
+class BillingDeliveryEvent(Base):
+    """
+    Bandeja de eventos de entrega recibidos por webhook (SendGrid / Twilio).
+    El webhook inserta el evento antes de responder; delivery_events los
+    aplica en lotes a billing_communication_logs y los borra.
+    """
+    
+    __tablename__ = "billing_delivery_events"
+    
+    id = Column(Integer, primary_key=True)
+    provider = Column(String(20), nullable=False, comment="sendgrid / twilio")
+    external_id = Column(String(255), nullable=False, comment="log_reference (SendGrid) o MessageSid (Twilio)")
+    status = Column(String(20), nullable=False, comment="Estado del log: DELIVERED, READ, FAILED, BOUNCED")
+    delivered_at = Column(DateTime, nullable=True)
+    read_at = Column(DateTime, nullable=True)
+    error_message = Column(Text, nullable=True)
+    recibido_en = Column(DateTime, default=datetime.utcnow, nullable=False)
+    
+    def __repr__(self):
+        return f"<BillingDeliveryEvent(id={self.id}, external_id={self.external_id}, status={self.status})>"
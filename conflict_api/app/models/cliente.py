@@ -58,6 +58,8 @@ class Cliente(Base):
         Index('ix_clientes_nombre_empresa', 'nombre_empresa'),
         Index('ix_clientes_firma_activo', 'firma_id', 'esta_activo'),
         Index('ix_clientes_email', 'email'),
+        Index('ix_clientes_firma_activo_id', 'firma_id', 'esta_activo', 'id'),
+        Index('ix_clientes_firma_activo_creado', 'firma_id', 'esta_activo', 'creado_en', 'id'),
     )
 
     @property
@@ -38,6 +38,7 @@ class Firma(Base):
     areas_practica = relationship("AreasPractica", back_populates="firma", uselist=False)
     ubicacion = relationship("Ubicacion", back_populates="firma", uselist=False)
     planes = relationship("Planes", back_populates="firma", uselist=False)
+    ventana_cobro = relationship("VentanaCobro", back_populates="firma", uselist=False)
 
     def __repr__(self):
         return f"<Firma(id={self.id}, nombre='{self.nombre}')>"
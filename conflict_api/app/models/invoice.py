@@ -0,0 +1,46 @@
+"""
+Modelo de Facturas (invoices).
+Tabla creada por la migración 001; las consultas de facturación usan SQL
+directo, el modelo registra la tabla en la metadata (FK de
+billing_communication_logs) y permite inserts/updates ORM.
+"""
+
+from datetime import datetime
+from sqlalchemy import Column, Integer, String, DateTime, Boolean, Date, Numeric, ForeignKey
+from app.database import Base
+
+
+class InvoiceStatus:
+    """Estados de factura."""
+    PENDING = "pending"
+    PAID = "paid"
+
+
+class Invoice(Base):
+    """
+    Factura de un cliente.
+    Multi-tenant a través del cliente (clientes.firma_id).
+    """
+
+    __tablename__ = "invoices"
+
+    id = Column(Integer, primary_key=True, index=True)
+    client_id = Column(
+        Integer,
+        ForeignKey("clientes.id", ondelete="CASCADE"),
+        nullable=False,
+        index=True,
+        comment="ID del cliente"
+    )
+    invoice_number = Column(String(50), nullable=False, unique=True, comment="Número de factura")
+    amount = Column(Numeric(10, 2), nullable=False, comment="Monto adeudado")
+    due_date = Column(Date, nullable=False, index=True, comment="Fecha de vencimiento")
+    status = Column(String(20), default=InvoiceStatus.PENDING, nullable=False, index=True, comment="pending, paid")
+
+    # Audit fields
+    esta_activo = Column(Boolean, default=True, nullable=False, comment="Soft delete flag")
+    creado_en = Column(DateTime, default=datetime.utcnow, nullable=False)
+    actualizado_en = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
+
+    def __repr__(self):
+        return f"<Invoice(id={self.id}, invoice_number='{self.invoice_number}', status='{self.status}')>"
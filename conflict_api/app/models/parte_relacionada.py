@@ -66,6 +66,7 @@ class ParteRelacionada(Base):
     __table_args__ = (
         Index('ix_partes_nombre', 'nombre'),
         Index('ix_partes_asunto_activo', 'asunto_id', 'esta_activo'),
+        Index('ix_partes_creado_id', 'creado_en', 'id'),
     )
     
     def __repr__(self):
@@ -0,0 +1,48 @@
+"""
+Modelo de Ventana de Cobro (Billing Send Window) - Linked to Firm.
+Stores when the firm's automated billing reminders may be sent.
+"""
+
+from datetime import datetime
+from sqlalchemy import Column, Integer, String, DateTime, Boolean, Time, ForeignKey
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.orm import relationship
+from app.database import Base
+
+
+class VentanaCobro(Base):
+    """
+    Billing send window linked to the firm.
+    Reminders are only dispatched between hora_inicio and hora_fin (local
+    time in zona_horaria), on dias_semana, excluding feriados.
+    """
+
+    __tablename__ = "ventanas_cobro"
+
+    id = Column(Integer, primary_key=True, index=True)
+    firma_id = Column(
+        Integer,
+        ForeignKey("firmas.id", ondelete="CASCADE"),
+        nullable=False,
+        unique=True,
+        index=True,
+        comment="ID del bufete (one record per firm)"
+    )
+
+    # Window
+    zona_horaria = Column(String(64), nullable=False, default="America/Puerto_Rico", comment="IANA timezone")
+    hora_inicio = Column(Time, nullable=False, comment="Local start time of the send window")
+    hora_fin = Column(Time, nullable=False, comment="Local end time of the send window")
+    dias_semana = Column(JSONB, nullable=False, default=list, comment="Allowed weekdays (0=Monday ... 6=Sunday)")
+    feriados = Column(JSONB, nullable=False, default=list, comment="Holidays as ISO dates (YYYY-MM-DD)")
+
+    # Audit fields
+    esta_activo = Column(Boolean, default=True, nullable=False, comment="Soft delete flag")
+    creado_en = Column(DateTime, default=datetime.utcnow, nullable=False)
+    actualizado_en = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
+
+    # Relationships
+    firma = relationship("Firma", back_populates="ventana_cobro")
+
+    def __repr__(self):
+        return f"<VentanaCobro(id={self.id}, firma_id={self.firma_id}, {self.hora_inicio}-{self.hora_fin} {self.zona_horaria})>"
@@ -4,12 +4,13 @@ Multi-tenant: Todos los endpoints filtran por firma_id del header.
 """
 
 from typing import List, Optional, Literal
-from fastapi import APIRouter, Depends, HTTPException, status, Query
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Response
 from sqlalchemy.orm import Session
 
-from app.database import get_db
-from app.dependencies import get_firm_id
+from app.database import get_db, get_read_db
+from app.dependencies import get_firm_id, NEXT_CURSOR_HEADER, OrdenKeyset
 from app.crud import crud_asunto
+from app.crud.base import CursorInvalido
 from app.schemas.asunto import AsuntoCreate, AsuntoUpdate, AsuntoResponse
 
 # Valid estado values for query parameter validation
@@ -47,15 +48,33 @@ def crear_asunto(
     summary="Listar asuntos del bufete"
 )
 def listar_asuntos(
+    response: Response,
     skip: int = 0,
-    limit: int = 100,
+    limit: int = Query(100, ge=1),
+    cursor: Optional[str] = Query(None, description="Cursor del header X-Next-Cursor de la página anterior"),
+    orden: OrdenKeyset = Query("id", description="Llave de paginación: id o creado_en"),
     estado: Optional[str] = Query(None, description="Filtrar por estado (ACTIVO, CERRADO, PENDIENTE, ARCHIVADO)"),
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
     firm_id: int = Depends(get_firm_id)
 ):
-    return crud_asunto.get_multi_por_firma(
-        db=db, firm_id=firm_id, skip=skip, limit=limit, estado=estado
-    )
+    if skip:
+        return crud_asunto.get_multi_por_firma(
+            db=db, firm_id=firm_id, skip=skip, limit=limit, estado=estado
+        )
+    
+    try:
+        asuntos, next_cursor = crud_asunto.get_multi_por_firma_keyset(
+            db=db, firm_id=firm_id, cursor=cursor, limit=limit, orden=orden, estado=estado
+        )
+    except CursorInvalido as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+    
+    if next_cursor:
+        response.headers[NEXT_CURSOR_HEADER] = next_cursor
+    return asuntos
 
 
 @router.get(
@@ -148,7 +167,7 @@ def restaurar_asunto(
 )
 def listar_asuntos_cliente(
     cliente_id: int,
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
     firm_id: int = Depends(get_firm_id)
 ):
     if not crud_asunto.verificar_pertenencia_firma(db, cliente_id, firm_id):
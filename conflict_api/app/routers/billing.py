@@ -3,20 +3,30 @@ Endpoints para gestión de facturación y recordatorios.
 Updated to use string types instead of PostgreSQL enums.
 """
 
-from app.models.billing_communication import CommunicationType, CommunicationStatus
-from typing import List, Optional
-from datetime import date, timedelta
-from fastapi import APIRouter, Depends, HTTPException, status, Query
+from app.models.billing_communication import (
+    BillingOutbox, BillingSchedulerJob, CommunicationType, CommunicationStatus, OutboxStatus
+)
+import json
+from typing import List, Literal, Optional
+from urllib.parse import parse_qsl
+from datetime import date, datetime, timedelta
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Request, status, Query
 from fastapi.responses import Response
 from sqlalchemy.orm import Session
-from sqlalchemy import text
-from pydantic import BaseModel
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import func, text
+from pydantic import BaseModel, Field
 
-from app.database import get_db
+from app.config import get_settings
+from app.database import get_db, get_async_db, get_async_read_db
 from app.dependencies import get_firm_id
 from app.crud.billing_communication import crud_billing_communication
 from app.services.billing_communication.ai_resignation_service import ai_resignation_service
 from app.services.billing_communication.billing_scheduler import billing_scheduler
+from app.services.billing_communication.billing_aggregates import billing_aggregates
+from app.services.billing_communication.delivery_events import delivery_events
+
+settings = get_settings()
 
 
 router = APIRouter(
@@ -71,6 +81,28 @@ class ResignationLetterResponse(BaseModel):
     error: Optional[str] = None
 
 
+class SchedulerJobResponse(BaseModel):
+    """Estado de una corrida manual del scheduler para el bufete."""
+    id: int
+    firma_id: int
+    status: str = Field(..., description="PENDING, RUNNING, COMPLETED, FAILED")
+    invoices_scanned: int = Field(..., description="Facturas que requerían acción")
+    invoices_processed: int = Field(..., description="Facturas ya planificadas")
+    sends_queued: int
+    danger_zone_marked: int
+    sends_pending: int = Field(0, description="Envíos del job aún en el outbox (programados o en reintento)")
+    sends_sent: int = 0
+    sends_failed: int = 0
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+    duration_seconds: Optional[float] = None
+    error: Optional[str] = None
+    creado_en: datetime
+
+    class Config:
+        from_attributes = True
+
+
 # ============================================================================
 # ENDPOINTS - DASHBOARD & STATS
 # ============================================================================
@@ -80,8 +112,8 @@ class ResignationLetterResponse(BaseModel):
     response_model=DashboardStats,
     summary="Obtener estadísticas del dashboard"
 )
-def get_dashboard_stats(
-    db: Session = Depends(get_db),
+async def get_dashboard_stats(
+    db: AsyncSession = Depends(get_async_read_db),
     firm_id: int = Depends(get_firm_id)
 ):
     """
@@ -90,16 +122,30 @@ def get_dashboard_stats(
     - **total_outstanding**: Total de dinero pendiente
     - **overdue_30_plus**: Cantidad de facturas vencidas 30+ días
     - **danger_zone_count**: Facturas en zona de peligro (60+ días)
+    
+    Lee la fila precalculada del bufete (billing_aging_firma); si aún no
+    existe o es de otro día, calcula en vivo sobre invoices.
     """
+    agregados = await billing_aggregates.obtener_async(db, firm_id)
+    if agregados is not None:
+        return DashboardStats(
+            total_outstanding=float(agregados.total_outstanding),
+            overdue_30_plus=agregados.bucket_30_60_count + agregados.bucket_60_plus_count,
+            overdue_30_plus_amount=float(agregados.bucket_30_60_amount + agregados.bucket_60_plus_amount),
+            danger_zone_count=agregados.bucket_60_plus_count,
+            danger_zone_amount=float(agregados.bucket_60_plus_amount),
+            total_invoices=agregados.total_invoices
+        )
+    
     # Query SQL para estadísticas
     query = text("""
         SELECT 
             COUNT(*) as total_invoices,
             COALESCE(SUM(amount), 0) as total_outstanding,
-            COALESCE(SUM(CASE WHEN CURRENT_DATE - due_date >= 30 THEN 1 ELSE 0 END), 0) as overdue_30_plus,
-            COALESCE(SUM(CASE WHEN CURRENT_DATE - due_date >= 30 THEN amount ELSE 0 END), 0) as overdue_30_plus_amount,
-            COALESCE(SUM(CASE WHEN CURRENT_DATE - due_date >= 60 THEN 1 ELSE 0 END), 0) as danger_zone_count,
-            COALESCE(SUM(CASE WHEN CURRENT_DATE - due_date >= 60 THEN amount ELSE 0 END), 0) as danger_zone_amount
+            COALESCE(SUM(CASE WHEN due_date <= CURRENT_DATE - 30 THEN 1 ELSE 0 END), 0) as overdue_30_plus,
+            COALESCE(SUM(CASE WHEN due_date <= CURRENT_DATE - 30 THEN amount ELSE 0 END), 0) as overdue_30_plus_amount,
+            COALESCE(SUM(CASE WHEN due_date <= CURRENT_DATE - 60 THEN 1 ELSE 0 END), 0) as danger_zone_count,
+            COALESCE(SUM(CASE WHEN due_date <= CURRENT_DATE - 60 THEN amount ELSE 0 END), 0) as danger_zone_amount
         FROM invoices i
         JOIN clientes c ON i.client_id = c.id
         WHERE i.status = 'pending'
@@ -107,7 +153,7 @@ def get_dashboard_stats(
         AND i.esta_activo = true
     """)
     
-    result = db.execute(query, {"firm_id": firm_id}).fetchone()
+    result = (await db.execute(query, {"firm_id": firm_id})).fetchone()
     
     return DashboardStats(
         total_outstanding=float(result[1]) if result[1] else 0.0,
@@ -119,15 +165,120 @@ def get_dashboard_stats(
     )
 
 
+# Orden del listado de facturas vencidas (whitelist -> ORDER BY)
+OrdenFacturasType = Literal["days_overdue", "amount", "last_communication"]
+
+_ORDEN_FACTURAS = {
+    "days_overdue": "v.due_date ASC, v.id",  # Más atrasadas primero
+    "amount": "v.amount DESC, v.id",
+    # Sin contacto primero, luego las contactadas hace más tiempo
+    "last_communication": "com.last_communication_date ASC NULLS FIRST, v.id",
+}
+
+
+def consulta_facturas_vencidas(orden: str = "days_overdue", con_max_days: bool = False):
+    """
+    SQL del listado de facturas vencidas (también lo usa scripts/explain_billing.py).
+    
+    Una sola query: el agregado de billing_communication_logs se limita a
+    las facturas filtradas, y orden/paginación se resuelven en SQL. Los
+    filtros de días son rangos sobre due_date (no CURRENT_DATE - due_date)
+    para poder usar ix_invoices_pending_client_due.
+    
+    Parámetros: firm_id, min_days, skip, limit (y max_days si con_max_days).
+    """
+    filtro_max = "AND i.due_date >= CURRENT_DATE - CAST(:max_days AS INTEGER)" if con_max_days else ""
+    
+    return text(f"""
+        WITH vencidas AS (
+            SELECT 
+                i.id,
+                i.invoice_number,
+                c.nombre || ' ' || COALESCE(c.apellido, '') as client_name,
+                c.email,
+                c.telefono,
+                i.amount,
+                i.due_date,
+                CURRENT_DATE - i.due_date as days_overdue,
+                i.status
+            FROM invoices i
+            JOIN clientes c ON i.client_id = c.id
+            WHERE i.status = 'pending'
+            AND c.firma_id = :firm_id
+            AND i.esta_activo = true
+            AND i.due_date <= CURRENT_DATE - CAST(:min_days AS INTEGER)
+            {filtro_max}
+        ),
+        comunicaciones AS (
+            SELECT 
+                l.invoice_id,
+                MAX(l.sent_at) as last_communication_date,
+                COUNT(*) as communication_count
+            FROM billing_communication_logs l
+            WHERE l.esta_activo = true
+            AND l.invoice_id IN (SELECT id FROM vencidas)
+            GROUP BY l.invoice_id
+        )
+        SELECT 
+            v.*,
+            com.last_communication_date,
+            COALESCE(com.communication_count, 0) as communication_count
+        FROM vencidas v
+        LEFT JOIN comunicaciones com ON com.invoice_id = v.id
+        ORDER BY {_ORDEN_FACTURAS[orden]}
+        LIMIT :limit OFFSET :skip
+    """)
+
+
+async def _listar_facturas_vencidas(
+    db: AsyncSession,
+    firm_id: int,
+    min_days: int = 0,
+    max_days: Optional[int] = None,
+    skip: int = 0,
+    limit: int = 100,
+    orden: str = "days_overdue"
+) -> List[InvoiceSummary]:
+    """Facturas vencidas con su última comunicación y conteo de comunicaciones."""
+    params = {"firm_id": firm_id, "min_days": min_days, "skip": skip, "limit": limit}
+    if max_days:
+        params["max_days"] = max_days
+    
+    query = consulta_facturas_vencidas(orden, con_max_days=bool(max_days))
+    results = (await db.execute(query, params)).fetchall()
+    
+    return [
+        InvoiceSummary(
+            id=row.id,
+            invoice_number=row.invoice_number,
+            client_name=row.client_name or "",
+            client_email=row.email,
+            client_phone=row.telefono,
+            amount=float(row.amount),
+            due_date=row.due_date,
+            days_overdue=int(row.days_overdue),
+            status=row.status,
+            last_communication_date=(
+                row.last_communication_date.isoformat() if row.last_communication_date else None
+            ),
+            communication_count=int(row.communication_count)
+        )
+        for row in results
+    ]
+
+
 @router.get(
     "/invoices/overdue",
     response_model=List[InvoiceSummary],
     summary="Listar facturas vencidas"
 )
-def list_overdue_invoices(
+async def list_overdue_invoices(
     min_days: int = Query(0, description="Mínimo de días de atraso"),
     max_days: Optional[int] = Query(None, description="Máximo de días de atraso"),
-    db: Session = Depends(get_db),
+    skip: int = Query(0, ge=0),
+    limit: int = Query(100, ge=1, le=500),
+    orden: OrdenFacturasType = Query("days_overdue", description="days_overdue, amount o last_communication"),
+    db: AsyncSession = Depends(get_async_read_db),
     firm_id: int = Depends(get_firm_id)
 ):
     """
@@ -135,58 +286,12 @@ def list_overdue_invoices(
     
     - **min_days**: Filtrar por mínimo de días de atraso (ej: 30 para ver solo 30+ días)
     - **max_days**: Filtrar por máximo de días (ej: 59 para excluir danger zone)
+    - **skip** / **limit**: Paginación
+    - **orden**: Más atrasadas primero (default), mayor monto, o menos contactadas recientemente
     """
-    # Construir query con filtros
-    query_str = """
-        SELECT 
-            i.id,
-            i.invoice_number,
-            c.nombre || ' ' || COALESCE(c.apellido, '') as client_name,
-            c.email,
-            c.telefono,
-            i.amount,
-            i.due_date,
-            CURRENT_DATE - i.due_date as days_overdue,
-            i.status
-        FROM invoices i
-        JOIN clientes c ON i.client_id = c.id
-        WHERE i.status = 'pending'
-        AND c.firma_id = :firm_id
-        AND i.esta_activo = true
-        AND CURRENT_DATE - i.due_date >= :min_days
-    """
-    
-    params = {"firm_id": firm_id, "min_days": min_days}
-    
-    if max_days:
-        query_str += " AND CURRENT_DATE - i.due_date <= :max_days"
-        params["max_days"] = max_days
-    
-    query_str += " ORDER BY days_overdue DESC"
-    
-    results = db.execute(text(query_str), params).fetchall()
-    
-    invoices = []
-    for row in results:
-        # Obtener última comunicación
-        last_comm = crud_billing_communication.get_last_communication(db, row[0])
-        comm_count = crud_billing_communication.get_communication_count(db, row[0])
-        
-        invoices.append(InvoiceSummary(
-            id=row[0],
-            invoice_number=row[1],
-            client_name=row[2] or "",
-            client_email=row[3],
-            client_phone=row[4],
-            amount=float(row[5]),
-            due_date=row[6],
-            days_overdue=int(row[7]),
-            status=row[8],
-            last_communication_date=last_comm.sent_at.isoformat() if last_comm else None,
-            communication_count=comm_count
-        ))
-    
-    return invoices
+    return await _listar_facturas_vencidas(
+        db, firm_id, min_days=min_days, max_days=max_days, skip=skip, limit=limit, orden=orden
+    )
 
 
 @router.get(
@@ -194,15 +299,20 @@ def list_overdue_invoices(
     response_model=List[InvoiceSummary],
     summary="Listar facturas en zona de peligro"
 )
-def list_danger_zone_invoices(
-    db: Session = Depends(get_db),
+async def list_danger_zone_invoices(
+    skip: int = Query(0, ge=0),
+    limit: int = Query(100, ge=1, le=500),
+    orden: OrdenFacturasType = Query("days_overdue", description="days_overdue, amount o last_communication"),
+    db: AsyncSession = Depends(get_async_read_db),
     firm_id: int = Depends(get_firm_id)
 ):
     """
     Lista facturas en zona de peligro (60+ días vencidas).
     Estas requieren acción manual (posible carta de renuncia).
     """
-    return list_overdue_invoices(min_days=60, db=db, firm_id=firm_id)
+    return await _listar_facturas_vencidas(
+        db, firm_id, min_days=60, skip=skip, limit=limit, orden=orden
+    )
 
 
 # ============================================================================
@@ -382,26 +492,73 @@ def download_resignation_letter_pdf(
 
 @router.post(
     "/scheduler/trigger",
+    response_model=SchedulerJobResponse,
+    status_code=status.HTTP_202_ACCEPTED,
     summary="Trigger manual del scheduler"
 )
 def manual_trigger_scheduler(
+    background_tasks: BackgroundTasks,
+    db: Session = Depends(get_db),
     firm_id: int = Depends(get_firm_id)
 ):
     """
-    Ejecuta manualmente el proceso de recordatorios.
-    Útil para testing o ejecución fuera de horario programado.
+    Encola una corrida de recordatorios solo para las facturas del bufete
+    y retorna el job de inmediato. Si ya hay una pendiente o en curso, se
+    retorna esa. Consultar progreso con GET /billing/scheduler/jobs/{job_id}.
     """
-    try:
-        billing_scheduler.manual_trigger()
-        return {
-            "success": True,
-            "message": "Scheduler triggered successfully"
-        }
-    except Exception as e:
+    job, creado = billing_scheduler.crear_job(db, firm_id)
+    if creado:
+        background_tasks.add_task(billing_scheduler.ejecutar_job, job.id)
+    return _job_response(db, job)
+
+
+@router.get(
+    "/scheduler/jobs/{job_id}",
+    response_model=SchedulerJobResponse,
+    summary="Estado de una corrida manual del scheduler"
+)
+def get_scheduler_job(
+    job_id: int,
+    db: Session = Depends(get_db),
+    firm_id: int = Depends(get_firm_id)
+):
+    """
+    Progreso de la planificación, duración y error del job, más el
+    resultado de sus envíos en el outbox (enviados, fallidos, pendientes).
+    """
+    job = db.query(BillingSchedulerJob).filter(
+        BillingSchedulerJob.id == job_id,
+        BillingSchedulerJob.firma_id == firm_id,
+        BillingSchedulerJob.esta_activo == True
+    ).first()
+
+    if job is None:
         raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail=f"Failed to trigger scheduler: {str(e)}"
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Job no encontrado"
         )
+    return _job_response(db, job)
+
+
+def _job_response(db: Session, job: BillingSchedulerJob) -> SchedulerJobResponse:
+    """Job + conteo de sus envíos por estado del outbox."""
+    conteos = dict(
+        db.query(BillingOutbox.status, func.count(BillingOutbox.id))
+        .filter(BillingOutbox.job_id == job.id)
+        .group_by(BillingOutbox.status)
+        .all()
+    )
+
+    duration = None
+    if job.started_at is not None:
+        duration = ((job.finished_at or datetime.utcnow()) - job.started_at).total_seconds()
+
+    response = SchedulerJobResponse.model_validate(job)
+    response.sends_pending = conteos.get(OutboxStatus.PENDING, 0) + conteos.get(OutboxStatus.PROCESSING, 0)
+    response.sends_sent = conteos.get(OutboxStatus.SENT, 0)
+    response.sends_failed = conteos.get(OutboxStatus.FAILED, 0)
+    response.duration_seconds = duration
+    return response
 
 
 @router.get(
@@ -414,4 +571,85 @@ def get_scheduler_status():
         "is_running": billing_scheduler.is_running,
         "reminder_days": billing_scheduler.reminder_days,
         "danger_zone_threshold": billing_scheduler.danger_zone_days
-    }
\ No newline at end of file
+    }
+
+
+# ============================================================================
+# ENDPOINTS - DELIVERY WEBHOOKS
+# ============================================================================
+# Llamados por los proveedores (sin firm_id): se autentican con la firma
+# del request. Solo guardan los eventos en la bandeja antes de responder;
+# delivery_events los aplica en lotes.
+
+@router.post(
+    "/webhooks/sendgrid",
+    status_code=status.HTTP_202_ACCEPTED,
+    summary="Eventos de entrega de SendGrid (Event Webhook)"
+)
+async def sendgrid_events_webhook(
+    request: Request,
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Recibe un lote de eventos firmado (Signed Event Webhook) y guarda
+    delivered / open / click / bounce / dropped por log_reference.
+    """
+    body = await request.body()
+    if not delivery_events.verificar_sendgrid(
+        body,
+        request.headers.get("X-Twilio-Email-Event-Webhook-Signature"),
+        request.headers.get("X-Twilio-Email-Event-Webhook-Timestamp")
+    ):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Invalid webhook signature"
+        )
+
+    try:
+        payload = json.loads(body)
+    except ValueError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid JSON payload"
+        )
+    if not isinstance(payload, list):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Expected a list of events"
+        )
+
+    eventos = delivery_events.desde_sendgrid(payload)
+    return {"queued": await delivery_events.encolar(db, eventos)}
+
+
+@router.post(
+    "/webhooks/twilio",
+    status_code=status.HTTP_202_ACCEPTED,
+    summary="Status callback de Twilio"
+)
+async def twilio_status_webhook(
+    request: Request,
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Recibe el status callback de un SMS (form-encoded) y guarda
+    delivered / read / undelivered / failed por MessageSid.
+    """
+    body = await request.body()
+    params = dict(parse_qsl(body.decode("utf-8"), keep_blank_values=True))
+
+    # Twilio firma la URL pública que llamó (detrás de un proxy difiere de request.url)
+    url = str(request.url)
+    if settings.billing_webhook_base_url:
+        url = settings.billing_webhook_base_url.rstrip("/") + request.url.path
+        if request.url.query:
+            url += f"?{request.url.query}"
+
+    if not delivery_events.verificar_twilio(url, params, request.headers.get("X-Twilio-Signature")):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Invalid webhook signature"
+        )
+
+    eventos = delivery_events.desde_twilio(params)
+    return {"queued": await delivery_events.encolar(db, eventos)}
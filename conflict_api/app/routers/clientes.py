@@ -4,13 +4,15 @@ Multi-tenant: Todos los endpoints filtran por firma_id del header.
 Updated with bulk_update endpoint for Professional Hubs.
 """
 
-from typing import List
-from fastapi import APIRouter, Depends, HTTPException, status
+from typing import List, Optional
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Response
 from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.database import get_db
-from app.dependencies import get_firm_id
+from app.database import get_db, get_read_db, get_async_read_db
+from app.dependencies import get_firm_id, NEXT_CURSOR_HEADER, OrdenKeyset
 from app.crud import crud_cliente
+from app.crud.base import CursorInvalido
 from app.schemas.cliente import (
     ClienteCreate, ClienteUpdate, ClienteResponse,
     ClienteBulkUpdateRequest
@@ -54,19 +56,41 @@ def crear_cliente(
     summary="Listar clientes del bufete",
     description="Obtiene lista de clientes activos del bufete con paginación."
 )
-def listar_clientes(
+async def listar_clientes(
+    response: Response,
     skip: int = 0,
-    limit: int = 100,
-    db: Session = Depends(get_db),
+    limit: int = Query(100, ge=1),
+    cursor: Optional[str] = Query(None, description="Cursor del header X-Next-Cursor de la página anterior"),
+    orden: OrdenKeyset = Query("id", description="Llave de paginación: id o creado_en"),
+    db: AsyncSession = Depends(get_async_read_db),
     firm_id: int = Depends(get_firm_id)
 ):
     """
     Lista todos los clientes activos del bufete.
     
-    - **skip**: Número de registros a saltar
+    - **cursor**: Cursor de la página anterior (paginación keyset, recomendada)
+    - **orden**: Orden de la paginación keyset (id o creado_en)
+    - **skip**: Número de registros a saltar (paginación offset, legado)
     - **limit**: Límite de registros a retornar
+    
+    Si hay más resultados, el header X-Next-Cursor trae el cursor siguiente.
     """
-    return crud_cliente.get_multi(db=db, firm_id=firm_id, skip=skip, limit=limit)
+    if skip:
+        return await crud_cliente.get_multi_async(db=db, firm_id=firm_id, skip=skip, limit=limit)
+    
+    try:
+        clientes, next_cursor = await crud_cliente.get_multi_keyset_async(
+            db=db, firm_id=firm_id, cursor=cursor, limit=limit, orden=orden
+        )
+    except CursorInvalido as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+    
+    if next_cursor:
+        response.headers[NEXT_CURSOR_HEADER] = next_cursor
+    return clientes
 
 
 @router.get(
@@ -180,7 +204,7 @@ def buscar_clientes(
     nombre: str = None,
     apellido: str = None,
     nombre_empresa: str = None,
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
     firm_id: int = Depends(get_firm_id)
 ):
     """
@@ -219,21 +243,17 @@ def bulk_update_clientes(
     """
     Bulk update multiple clients at once.
     Used by "Guardar Cambios" button in the UI.
+    Runs as set-based UPDATEs in a single transaction (see CRUDBase.bulk_update).
     """
-    updated_clients = []
+    updates = {}
 
     for item in bulk_update.updates:
-        cliente = crud_cliente.get(db=db, id=item.id, firm_id=firm_id)
-        if cliente is None:
-            continue  # Skip non-existent clients
-
         # Build update data from non-None fields
         update_data = item.model_dump(exclude={'id'}, exclude_unset=True)
         update_data = {k: v for k, v in update_data.items() if v is not None}
 
         if update_data:
-            update_schema = ClienteUpdate(**update_data)
-            updated = crud_cliente.update(db=db, db_obj=cliente, obj_in=update_schema)
-            updated_clients.append(updated)
+            updates[item.id] = ClienteUpdate(**update_data)
 
-    return updated_clients
\ No newline at end of file
+    # Non-existent clients (or from another firm) are skipped
+    return crud_cliente.bulk_update(db=db, updates=updates, firm_id=firm_id)
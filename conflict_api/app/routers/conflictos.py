@@ -3,13 +3,20 @@ Endpoints para Verificación de Conflictos de Interés.
 Incluye búsqueda exacta y difusa con niveles de confianza.
 """
 
-from fastapi import APIRouter, Depends, HTTPException, status
+from typing import List, Optional
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, status, Query
 from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.database import get_db
+from app.database import get_db, get_async_read_db
 from app.dependencies import get_firm_id
-from app.schemas.conflicto import BusquedaConflicto, ResultadoConflicto
+from app.models.barrido_conflictos import BarridoConflictos, CoincidenciaBarrido
+from app.schemas.conflicto import (
+    BusquedaConflicto, ResultadoConflicto,
+    BarridoConflictosResponse, CoincidenciaBarridoResponse
+)
 from app.services.conflict_checker import conflict_checker
+from app.services.barrido_conflictos import conflict_sweeper
 from app.config import get_settings
 
 router = APIRouter(
@@ -53,9 +60,9 @@ router = APIRouter(
     Si se proporciona segundo_apellido, se requiere que coincida para obtener match exacto.
     """
 )
-def verificar_conflictos(
+async def verificar_conflictos(
     busqueda: BusquedaConflicto,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_read_db),
     firm_id: int = Depends(get_firm_id)
 ):
     """
@@ -79,7 +86,7 @@ def verificar_conflictos(
         )
     
     # Realizar búsqueda de conflictos
-    resultado = conflict_checker.verificar_conflictos(
+    resultado = await conflict_checker.verificar_conflictos_async(
         db=db,
         firm_id=firm_id,
         busqueda=busqueda
@@ -107,4 +114,95 @@ def estado_servicio():
             "umbral_confianza_alta": settings.fuzzy_high_confidence
         },
         "descripcion": "Sistema de verificación de conflictos para bufetes de abogados de Puerto Rico"
-    }
\ No newline at end of file
+    }
+
+
+@router.post(
+    "/barridos",
+    response_model=BarridoConflictosResponse,
+    status_code=status.HTTP_202_ACCEPTED,
+    summary="Iniciar barrido de conflictos del bufete",
+    description="""
+    Compara todos los clientes del bufete contra todas las partes relacionadas
+    (y contra otros clientes para detectar duplicados) y guarda un reporte.
+
+    Si existe un barrido inconcluso (pendiente, en progreso o fallido), se
+    reanuda desde su último checkpoint en lugar de crear uno nuevo.
+    """
+)
+def iniciar_barrido(
+    background_tasks: BackgroundTasks,
+    db: Session = Depends(get_db),
+    firm_id: int = Depends(get_firm_id)
+):
+    """
+    Inicia (o reanuda) el barrido en segundo plano.
+    Consultar progreso con GET /conflictos/barridos/{barrido_id}.
+    """
+    barrido = conflict_sweeper.crear_o_reanudar(db, firm_id)
+    background_tasks.add_task(conflict_sweeper.ejecutar_en_sesion_nueva, barrido.id)
+    return barrido
+
+
+def _obtener_barrido(db: Session, barrido_id: int, firm_id: int) -> BarridoConflictos:
+    """Obtiene un barrido verificando pertenencia al bufete."""
+    barrido = db.query(BarridoConflictos).filter(
+        BarridoConflictos.id == barrido_id,
+        BarridoConflictos.firma_id == firm_id,
+        BarridoConflictos.esta_activo == True
+    ).first()
+
+    if barrido is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Barrido no encontrado"
+        )
+    return barrido
+
+
+@router.get(
+    "/barridos/{barrido_id}",
+    response_model=BarridoConflictosResponse,
+    summary="Estado de un barrido de conflictos"
+)
+def obtener_barrido(
+    barrido_id: int,
+    db: Session = Depends(get_db),
+    firm_id: int = Depends(get_firm_id)
+):
+    return _obtener_barrido(db, barrido_id, firm_id)
+
+
+@router.get(
+    "/barridos/{barrido_id}/coincidencias",
+    response_model=List[CoincidenciaBarridoResponse],
+    summary="Reporte de coincidencias de un barrido"
+)
+def listar_coincidencias_barrido(
+    barrido_id: int,
+    skip: int = 0,
+    limit: int = 100,
+    min_score: Optional[float] = Query(None, description="Similitud mínima a incluir"),
+    tipo_coincidencia: Optional[str] = Query(None, description="CLIENTE_PARTE o CLIENTE_DUPLICADO"),
+    db: Session = Depends(get_db),
+    firm_id: int = Depends(get_firm_id)
+):
+    """
+    Lista las coincidencias del barrido ordenadas por similitud (mayor a menor).
+    """
+    _obtener_barrido(db, barrido_id, firm_id)
+
+    query = db.query(CoincidenciaBarrido).filter(CoincidenciaBarrido.barrido_id == barrido_id)
+
+    if min_score is not None:
+        query = query.filter(CoincidenciaBarrido.similitud_score >= min_score)
+
+    if tipo_coincidencia:
+        query = query.filter(CoincidenciaBarrido.tipo_coincidencia == tipo_coincidencia)
+
+    return (
+        query.order_by(CoincidenciaBarrido.similitud_score.desc(), CoincidenciaBarrido.id)
+        .offset(skip)
+        .limit(limit)
+        .all()
+    )
@@ -0,0 +1,52 @@
+"""
+Endpoints para Exportación masiva de datos del bufete (CSV/NDJSON en streaming).
+"""
+
+from datetime import date
+
+from fastapi import APIRouter, Depends, Query
+from fastapi.responses import StreamingResponse
+
+from app.dependencies import get_firm_id
+from app.schemas.exportacion import EntidadExportacionType, FormatoExportacionType
+from app.services.exportacion import firm_exporter, MEDIA_TYPES
+
+router = APIRouter(
+    prefix="/exportaciones",
+    tags=["Exportaciones"],
+)
+
+
+@router.get(
+    "/{entidad}",
+    summary="Exportar datos del bufete",
+    description="""
+    Exporta todos los registros del bufete en streaming, sin paginación.
+
+    - **entidad**: clientes, asuntos, partes-relacionadas o comunicaciones
+      (logs de comunicación de cobro)
+    - **formato**: csv (con encabezado) o ndjson (un objeto JSON por línea)
+
+    La respuesta se envía por bloques a medida que se lee de la base de datos,
+    por lo que el tamaño del export no afecta la memoria del servidor.
+    """,
+    response_class=StreamingResponse,
+    responses={200: {"content": {MEDIA_TYPES["csv"]: {}, MEDIA_TYPES["ndjson"]: {}}}}
+)
+def exportar(
+    entidad: EntidadExportacionType,
+    formato: FormatoExportacionType = Query("csv", description="csv o ndjson"),
+    incluir_inactivos: bool = Query(False, description="Incluir registros eliminados (soft delete)"),
+    firm_id: int = Depends(get_firm_id)
+):
+    """
+    Retorna un StreamingResponse; la sesión de base de datos la abre y
+    cierra el propio generador del export.
+    """
+    nombre_archivo = f"{entidad}_firma{firm_id}_{date.today().isoformat()}.{formato}"
+
+    return StreamingResponse(
+        firm_exporter.exportar(firm_id, entidad, formato, incluir_inactivos),
+        media_type=MEDIA_TYPES[formato],
+        headers={"Content-Disposition": f'attachment; filename="{nombre_archivo}"'}
+    )
@@ -1,5 +1,6 @@
 """
-Endpoints for Firm Settings (Profile, Studies, Practice Areas, Location, Plans).
+Endpoints for Firm Settings (Profile, Studies, Practice Areas, Location, Plans,
+Billing Send Window).
 All endpoints use upsert behavior for single-firm MVP (firm_id=1).
 """
 
@@ -13,11 +14,13 @@ from app.models.estudios import Estudios
 from app.models.areas_practica import AreasPractica
 from app.models.ubicacion import Ubicacion
 from app.models.planes import Planes
+from app.models.ventana_cobro import VentanaCobro
 from app.schemas.perfil import PerfilUpdate, PerfilResponse
 from app.schemas.estudios import EstudiosUpdate, EstudiosResponse
 from app.schemas.areas_practica import AreasPracticaUpdate, AreasPracticaResponse
 from app.schemas.ubicacion import UbicacionUpdate, UbicacionResponse
 from app.schemas.planes import PlanesUpdate, PlanesResponse, PlanSelectionResponse
+from app.schemas.ventana_cobro import VentanaCobroUpdate, VentanaCobroResponse
 
 # Default firm ID for MVP
 DEFAULT_FIRM_ID = 1
@@ -269,3 +272,53 @@ def actualizar_planes(
         message="Plan seleccionado. Integracion de pagos proximamente.",
         plan=planes
     )
+
+
+# ===========================================================================
+# VENTANA DE COBRO (Billing Send Window)
+# ===========================================================================
+
+@router.get(
+    "/ventana-cobro/{firma_id}",
+    response_model=Optional[VentanaCobroResponse],
+    summary="Obtener ventana de envío de cobros",
+    description="Obtiene la ventana de envío de recordatorios. Returns null if not created yet (defaults apply)."
+)
+def obtener_ventana_cobro(
+    firma_id: int = DEFAULT_FIRM_ID,
+    db: Session = Depends(get_db)
+):
+    """Get billing send window for firm. Returns None if not exists."""
+    ventana = db.query(VentanaCobro).filter(VentanaCobro.firma_id == firma_id).first()
+    return ventana
+
+
+@router.put(
+    "/ventana-cobro/{firma_id}",
+    response_model=VentanaCobroResponse,
+    summary="Actualizar/Crear ventana de envío de cobros (upsert)",
+    description="Reemplaza la ventana de envío existente o la crea si no existe."
+)
+def actualizar_ventana_cobro(
+    ventana_in: VentanaCobroUpdate,
+    firma_id: int = DEFAULT_FIRM_ID,
+    db: Session = Depends(get_db)
+):
+    """Upsert billing send window: Update if exists, create if not."""
+    ventana = db.query(VentanaCobro).filter(VentanaCobro.firma_id == firma_id).first()
+
+    # Reemplazo completo: los campos omitidos toman su valor por defecto
+    # (hora_inicio / hora_fin se validan juntos)
+    ventana_data = ventana_in.model_dump()
+    ventana_data["feriados"] = [feriado.isoformat() for feriado in ventana_in.feriados]
+
+    if ventana is None:
+        ventana = VentanaCobro(firma_id=firma_id, **ventana_data)
+        db.add(ventana)
+    else:
+        for field, value in ventana_data.items():
+            setattr(ventana, field, value)
+
+    db.commit()
+    db.refresh(ventana)
+    return ventana
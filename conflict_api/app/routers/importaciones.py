@@ -0,0 +1,78 @@
+"""
+Endpoints para Importación masiva de clientes, asuntos y partes relacionadas
+desde archivos CSV o XLSX.
+"""
+
+import csv
+
+from fastapi import APIRouter, BackgroundTasks, Depends, File, HTTPException, Query, UploadFile, status
+from sqlalchemy.orm import Session
+
+from app.database import get_db
+from app.dependencies import get_firm_id
+from app.schemas.importacion import EntidadImportacionType, ResultadoImportacion
+from app.services.importacion import bulk_importer, FormatoImportacionInvalido
+from app.services.barrido_conflictos import conflict_sweeper
+
+router = APIRouter(
+    prefix="/importaciones",
+    tags=["Importaciones"],
+    responses={400: {"description": "Archivo inválido"}}
+)
+
+
+@router.post(
+    "/{entidad}",
+    response_model=ResultadoImportacion,
+    summary="Importar registros desde CSV/XLSX",
+    description="""
+    Importa registros por lotes desde un archivo CSV (UTF-8) o XLSX (primera hoja).
+    La primera fila debe contener los nombres de las columnas.
+
+    - **clientes**: columnas de ClienteCreate (nombre, apellido, email, telefono, direccion, ...)
+    - **asuntos**: columnas de AsuntoCreate; el cliente se indica con
+      `cliente_id` o `cliente_email`
+    - **partes-relacionadas**: columnas de ParteRelacionadaCreate; el asunto se
+      indica con `asunto_id` o con `cliente_email` + `nombre_asunto`
+
+    Las filas inválidas se reportan con su número de fila y no detienen la
+    importación. Si el archivo deja de poder leerse a mitad (encoding, CSV
+    mal formado) la importación se detiene en esa fila y el resultado marca
+    `lectura_interrumpida`: las filas anteriores quedan importadas. Al terminar se inicia un barrido de conflictos del bufete
+    en segundo plano.
+    """
+)
+def importar(
+    entidad: EntidadImportacionType,
+    background_tasks: BackgroundTasks,
+    archivo: UploadFile = File(..., description="Archivo .csv o .xlsx"),
+    delimitador: str = Query(",", min_length=1, max_length=1, description="Delimitador CSV"),
+    db: Session = Depends(get_db),
+    firm_id: int = Depends(get_firm_id)
+):
+    """
+    Importa el archivo fila por fila (el archivo ya está en disco temporal,
+    no se carga completo en memoria).
+    """
+    try:
+        filas = bulk_importer.leer_filas(archivo.file, archivo.filename, delimitador)
+        resultado = bulk_importer.importar(db, firm_id, entidad, filas)
+    except FormatoImportacionInvalido as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    except UnicodeDecodeError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="El archivo CSV debe estar codificado en UTF-8"
+        )
+    except csv.Error as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Archivo CSV inválido: {e}"
+        )
+
+    if resultado.filas_importadas:
+        barrido = conflict_sweeper.crear_o_reanudar(db, firm_id, nuevo=True)
+        background_tasks.add_task(conflict_sweeper.ejecutar_en_sesion_nueva, barrido.id)
+        resultado.barrido_id = barrido.id
+
+    return resultado
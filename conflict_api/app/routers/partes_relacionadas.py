@@ -4,12 +4,13 @@ Multi-tenant: Todos los endpoints filtran por firma_id del header.
 """
 
 from typing import List, Optional
-from fastapi import APIRouter, Depends, HTTPException, status, Query
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Response
 from sqlalchemy.orm import Session
 
-from app.database import get_db
-from app.dependencies import get_firm_id
+from app.database import get_db, get_read_db
+from app.dependencies import get_firm_id, NEXT_CURSOR_HEADER, OrdenKeyset
 from app.crud import crud_parte_relacionada
+from app.crud.base import CursorInvalido
 from app.schemas.parte_relacionada import (
     ParteRelacionadaCreate,
     ParteRelacionadaUpdate,
@@ -54,15 +55,34 @@ def crear_parte_relacionada(
     summary="Listar partes relacionadas del bufete"
 )
 def listar_partes_relacionadas(
+    response: Response,
     skip: int = 0,
-    limit: int = 100,
+    limit: int = Query(100, ge=1),
+    cursor: Optional[str] = Query(None, description="Cursor del header X-Next-Cursor de la pagina anterior"),
+    orden: OrdenKeyset = Query("id", description="Llave de paginacion: id o creado_en"),
     tipo_relacion: Optional[str] = Query(None, description="Filtrar por tipo de relacion"),
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
     firm_id: int = Depends(get_firm_id)
 ):
-    return crud_parte_relacionada.get_multi_por_firma(
-        db=db, firm_id=firm_id, skip=skip, limit=limit, tipo_relacion=tipo_relacion
-    )
+    if skip:
+        return crud_parte_relacionada.get_multi_por_firma(
+            db=db, firm_id=firm_id, skip=skip, limit=limit, tipo_relacion=tipo_relacion
+        )
+    
+    try:
+        partes, next_cursor = crud_parte_relacionada.get_multi_por_firma_keyset(
+            db=db, firm_id=firm_id, cursor=cursor, limit=limit, orden=orden,
+            tipo_relacion=tipo_relacion
+        )
+    except CursorInvalido as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+    
+    if next_cursor:
+        response.headers[NEXT_CURSOR_HEADER] = next_cursor
+    return partes
 
 
 @router.get(
@@ -157,7 +177,7 @@ def restaurar_parte_relacionada(
 )
 def listar_partes_por_asunto(
     asunto_id: int,
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
     firm_id: int = Depends(get_firm_id)
 ):
     if not crud_parte_relacionada.verificar_pertenencia_firma(db, asunto_id, firm_id):
@@ -15,6 +15,7 @@ from app.schemas.estudios import EstudiosCreate, EstudiosUpdate, EstudiosRespons
 from app.schemas.areas_practica import AreasPracticaCreate, AreasPracticaUpdate, AreasPracticaResponse
 from app.schemas.ubicacion import UbicacionCreate, UbicacionUpdate, UbicacionResponse
 from app.schemas.planes import PlanesCreate, PlanesUpdate, PlanesResponse, PlanSelectionResponse
+from app.schemas.ventana_cobro import VentanaCobroCreate, VentanaCobroUpdate, VentanaCobroResponse
 
 __all__ = [
     "FirmaCreate", "FirmaUpdate", "FirmaResponse",
@@ -28,4 +29,5 @@ __all__ = [
     "AreasPracticaCreate", "AreasPracticaUpdate", "AreasPracticaResponse",
     "UbicacionCreate", "UbicacionUpdate", "UbicacionResponse",
     "PlanesCreate", "PlanesUpdate", "PlanesResponse", "PlanSelectionResponse",
+    "VentanaCobroCreate", "VentanaCobroUpdate", "VentanaCobroResponse",
 ]
@@ -3,6 +3,7 @@ Schemas para búsqueda de Conflictos de Interés.
 Updated to use string instead of PostgreSQL ENUM.
 """
 
+from datetime import datetime
 from typing import List, Optional
 from pydantic import BaseModel, Field
 
@@ -79,4 +80,41 @@ class ResultadoConflicto(BaseModel):
                 ],
                 "mensaje": "Se encontraron 2 posibles conflictos de interés"
             }
-        }
\ No newline at end of file
+        }
+
+class BarridoConflictosResponse(BaseModel):
+    """Estado de una ejecución del barrido de conflictos del bufete."""
+    id: int
+    firma_id: int
+    estado: str = Field(..., description="PENDIENTE, EN_PROGRESO, COMPLETADO, FALLIDO")
+    umbral: int = Field(..., description="Similitud mínima usada (0-100)")
+    fase: str = Field(..., description="Índice en curso: PARTES, CLIENTES")
+    ultimo_cliente_id: int = Field(..., description="Checkpoint: último cliente procesado contra la página del índice")
+    clientes_procesados: int
+    pares_evaluados: int = Field(..., description="Pares candidatos evaluados tras blocking")
+    coincidencias_encontradas: int
+    iniciado_en: Optional[datetime] = None
+    finalizado_en: Optional[datetime] = None
+    error: Optional[str] = None
+    creado_en: datetime
+
+    class Config:
+        from_attributes = True
+
+
+class CoincidenciaBarridoResponse(BaseModel):
+    """Fila del reporte del barrido de conflictos."""
+    id: int
+    tipo_coincidencia: str = Field(..., description="CLIENTE_PARTE o CLIENTE_DUPLICADO")
+    cliente_id: int
+    cliente_nombre: str
+    parte_id: Optional[int] = None
+    asunto_id: Optional[int] = None
+    otro_cliente_id: Optional[int] = None
+    contraparte_nombre: str
+    tipo_relacion: Optional[str] = None
+    similitud_score: float = Field(..., ge=0.0, le=100.0)
+    nivel_confianza: str
+
+    class Config:
+        from_attributes = True
@@ -0,0 +1,12 @@
+"""
+Schemas para Exportación masiva de datos del bufete.
+"""
+
+from typing import Literal
+
+
+# Entidades que se pueden exportar
+EntidadExportacionType = Literal["clientes", "asuntos", "partes-relacionadas", "comunicaciones"]
+
+# Formatos de salida
+FormatoExportacionType = Literal["csv", "ndjson"]
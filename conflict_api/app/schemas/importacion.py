@@ -0,0 +1,31 @@
+"""
+Schemas para Importación masiva (CSV/XLSX).
+"""
+
+from typing import List, Literal, Optional
+from pydantic import BaseModel, Field
+
+
+# Entidades que se pueden importar
+EntidadImportacionType = Literal["clientes", "asuntos", "partes-relacionadas"]
+
+
+class ErrorFilaImportacion(BaseModel):
+    """Error de validación o carga de una fila del archivo."""
+    fila: int = Field(..., description="Número de fila en el archivo (1 = encabezado)")
+    errores: List[str] = Field(..., description="Mensajes de error de la fila")
+
+
+class ResultadoImportacion(BaseModel):
+    """Resultado de una importación masiva."""
+    entidad: EntidadImportacionType
+    filas_procesadas: int = Field(..., description="Filas de datos leídas del archivo")
+    filas_importadas: int = Field(..., description="Filas insertadas en la base de datos")
+    filas_con_error: int = Field(..., description="Filas rechazadas")
+    errores: List[ErrorFilaImportacion] = Field(default_factory=list)
+    errores_truncados: bool = Field(False, description="True si se omitieron errores por el límite configurado")
+    lectura_interrumpida: bool = Field(
+        False,
+        description="True si el archivo dejó de poder leerse en una fila (ver errores); las filas anteriores se importaron"
+    )
+    barrido_id: Optional[int] = Field(None, description="Barrido de conflictos iniciado al finalizar")
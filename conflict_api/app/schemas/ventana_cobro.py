@@ -0,0 +1,63 @@
+"""
+Schemas para Ventana de Cobro (Billing Send Window).
+"""
+
+from datetime import date, datetime, time
+from typing import List
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+from pydantic import BaseModel, Field, ConfigDict, field_validator, model_validator
+
+
+class VentanaCobroBase(BaseModel):
+    """Campos base de Ventana de Cobro."""
+    zona_horaria: str = Field("America/Puerto_Rico", max_length=64, description="Zona horaria IANA")
+    hora_inicio: time = Field(time(9, 0), description="Hora local de inicio de envíos")
+    hora_fin: time = Field(time(17, 0), description="Hora local de fin de envíos")
+    dias_semana: List[int] = Field(
+        default_factory=lambda: [0, 1, 2, 3, 4, 5, 6],
+        description="Dias permitidos (0=lunes ... 6=domingo)"
+    )
+    feriados: List[date] = Field(default_factory=list, description="Feriados sin envíos")
+
+    @field_validator("zona_horaria")
+    @classmethod
+    def validar_zona_horaria(cls, v: str) -> str:
+        try:
+            ZoneInfo(v)
+        except (ZoneInfoNotFoundError, ValueError):
+            raise ValueError(f"Zona horaria desconocida: {v}")
+        return v
+
+    @field_validator("dias_semana")
+    @classmethod
+    def validar_dias_semana(cls, v: List[int]) -> List[int]:
+        if not v or any(dia < 0 or dia > 6 for dia in v):
+            raise ValueError("dias_semana debe tener al menos un dia entre 0 (lunes) y 6 (domingo)")
+        return sorted(set(v))
+
+    @model_validator(mode="after")
+    def validar_horas(self):
+        if self.hora_fin <= self.hora_inicio:
+            raise ValueError("hora_fin debe ser posterior a hora_inicio")
+        return self
+
+
+class VentanaCobroCreate(VentanaCobroBase):
+    """Schema para crear ventana de cobro."""
+    pass
+
+
+class VentanaCobroUpdate(VentanaCobroBase):
+    """Schema para actualizar ventana de cobro."""
+    pass
+
+
+class VentanaCobroResponse(VentanaCobroBase):
+    """Schema de respuesta de Ventana de Cobro."""
+    id: int
+    firma_id: int
+    esta_activo: bool
+    creado_en: datetime
+    actualizado_en: datetime
+
+    model_config = ConfigDict(from_attributes=True)
@@ -0,0 +1,653 @@
+"""
+Barrido de conflictos a nivel de bufete (firm-wide conflict sweep).
+
+Compara TODOS los clientes del bufete contra TODAS las partes relacionadas
+(y contra los demás clientes, para detectar duplicados) sin el costo O(n²)
+de evaluar cada par con token_sort_ratio:
+
+- Blocking: cada nombre se indexa por prefijos de token y un código fonético
+  simplificado para español; sólo se evalúan pares que comparten alguna clave.
+- Índice por páginas: las partes (y luego los clientes, para duplicados)
+  se indexan en páginas de hasta conflict_sweep_index_page_size por id, así
+  que la memoria no crece con el tamaño del bufete.
+- Scoring por chunks: contra cada página, los clientes se procesan en
+  bloques ordenados por id; cada bloque se evalúa, se guarda en el reporte
+  y deja un checkpoint (página + último cliente).
+- Techo de memoria: si el proceso supera el límite configurado, el tamaño
+  del chunk se reduce a la mitad antes de continuar.
+- Un solo ejecutor: el barrido se reclama en la base de datos (UPDATE
+  condicional de estado), así que dos procesos no lo corren a la vez.
+- Un barrido nuevo (p. ej. tras una importación) reemplaza a los
+  inconclusos del bufete: quedan inactivos y el que esté corriendo se
+  detiene en su próximo checkpoint.
+"""
+
+import gc
+import os
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Set, Tuple
+
+from fuzzywuzzy import fuzz, utils
+from sqlalchemy import and_, func, insert, or_, update
+from sqlalchemy.orm import Session
+from unidecode import unidecode
+
+from app.config import get_settings
+from app.database import SessionLocal
+from app.models.asunto import Asunto
+from app.models.cliente import Cliente
+from app.models.parte_relacionada import ParteRelacionada
+from app.models.barrido_conflictos import (
+    BarridoConflictos, CoincidenciaBarrido, EstadoBarrido, FaseBarrido, TipoCoincidenciaBarrido
+)
+
+settings = get_settings()
+
+# Tokens demasiado comunes para servir como clave de bloque
+_PALABRAS_VACIAS = {
+    "de", "del", "la", "las", "los", "el", "y", "e", "en",
+    "inc", "corp", "corporacion", "llc", "psc", "co", "cia", "sa", "srl",
+}
+
+# Reglas fonéticas aplicadas en orden (el orden importa: "ce" antes de "c")
+_REEMPLAZOS_FONETICOS = (
+    ("ll", "y"), ("qu", "k"), ("ch", "x"),
+    ("ce", "se"), ("ci", "si"), ("ge", "je"), ("gi", "ji"),
+    ("v", "b"), ("z", "s"), ("c", "k"), ("w", "u"), ("h", ""),
+)
+
+# Tamaño mínimo de chunk al reducir por memoria
+_CHUNK_MINIMO = 50
+
+
+class BarridoReemplazado(Exception):
+    """Un barrido más reciente del bufete desactivó al que está corriendo."""
+    pass
+
+
+class _IndiceObjetivos:
+    """
+    Índice invertido de nombres contra los que se compara cada cliente.
+    Guarda sólo tuplas ligeras (no objetos ORM) para acotar memoria.
+    """
+
+    def __init__(self):
+        self.nombres_procesados: List[str] = []
+        self.metadatos: List[Tuple] = []
+        self.bloques: Dict[str, List[int]] = {}
+
+    def agregar(self, nombre_procesado: str, claves: Set[str], metadatos: Tuple):
+        idx = len(self.nombres_procesados)
+        self.nombres_procesados.append(nombre_procesado)
+        self.metadatos.append(metadatos)
+        for clave in claves:
+            self.bloques.setdefault(clave, []).append(idx)
+
+    def candidatos(self, claves: Set[str]) -> Set[int]:
+        resultado: Set[int] = set()
+        for clave in claves:
+            resultado.update(self.bloques.get(clave, ()))
+        return resultado
+
+
+class ConflictSweeper:
+    """
+    Servicio de barrido de conflictos para todo el bufete.
+
+    Características:
+    - Cliente x parte relacionada (cliente aparece como parte en otro asunto)
+    - Cliente x cliente (posibles duplicados)
+    - Reanudable desde el último checkpoint (página del índice + ultimo_cliente_id)
+    - Resultados persistidos en coincidencias_barrido
+    """
+
+    def __init__(self):
+        self.fuzzy_threshold = settings.fuzzy_threshold
+        self.high_confidence_threshold = settings.fuzzy_high_confidence
+        self.chunk_size = settings.conflict_sweep_chunk_size
+        self.max_memory_mb = settings.conflict_sweep_max_memory_mb
+        self.index_page_size = settings.conflict_sweep_index_page_size
+
+    # ------------------------------------------------------------------
+    # API pública
+    # ------------------------------------------------------------------
+
+    def crear_o_reanudar(self, db: Session, firm_id: int, nuevo: bool = False) -> BarridoConflictos:
+        """
+        Retorna el barrido inconcluso más reciente del bufete o crea uno nuevo.
+
+        Con nuevo=True (p. ej. tras una importación) el barrido debe ver los
+        datos actuales desde el principio: se reutiliza uno PENDIENTE que
+        aún no empezó, o se crea uno. Los demás inconclusos del bufete
+        quedan reemplazados (inactivos, FALLIDO); si alguno está corriendo
+        se detiene en su próximo checkpoint, así que nunca corren dos
+        barridos completos del mismo bufete a la vez.
+
+        Args:
+            db: Sesión de base de datos
+            firm_id: ID del bufete
+            nuevo: Barrido desde cero que reemplaza a los inconclusos
+
+        Returns:
+            BarridoConflictos listo para ejecutar
+        """
+        inconclusos = db.query(BarridoConflictos).filter(
+            BarridoConflictos.firma_id == firm_id,
+            BarridoConflictos.esta_activo == True,
+            BarridoConflictos.estado != EstadoBarrido.COMPLETADO
+        )
+
+        if nuevo:
+            barrido = (
+                inconclusos
+                .filter(
+                    BarridoConflictos.estado == EstadoBarrido.PENDIENTE,
+                    BarridoConflictos.iniciado_en.is_(None)
+                )
+                .order_by(BarridoConflictos.id.desc())
+                .first()
+            )
+        else:
+            barrido = inconclusos.order_by(BarridoConflictos.id.desc()).first()
+
+        if barrido is None:
+            barrido = BarridoConflictos(
+                firma_id=firm_id,
+                estado=EstadoBarrido.PENDIENTE,
+                umbral=self.fuzzy_threshold,
+                ultimo_cliente_id=0
+            )
+            db.add(barrido)
+            db.flush()
+
+        if nuevo:
+            reemplazados = inconclusos.filter(BarridoConflictos.id != barrido.id).update(
+                {
+                    BarridoConflictos.esta_activo: False,
+                    BarridoConflictos.estado: EstadoBarrido.FALLIDO,
+                    BarridoConflictos.error: f"Reemplazado por el barrido {barrido.id}",
+                    BarridoConflictos.actualizado_en: datetime.utcnow()
+                },
+                synchronize_session=False
+            )
+            if reemplazados:
+                print(f"Conflict sweep {barrido.id} supersedes {reemplazados} unfinished sweeps of firm {firm_id}")
+
+        db.commit()
+        db.refresh(barrido)
+        return barrido
+
+    def ejecutar_en_sesion_nueva(self, barrido_id: int):
+        """
+        Ejecuta un barrido con su propia sesión.
+        Usado desde BackgroundTasks y desde el CLI.
+        """
+        db = SessionLocal()
+        try:
+            self.ejecutar_barrido(db, barrido_id)
+        finally:
+            db.close()
+
+    def ejecutar_barrido(self, db: Session, barrido_id: int) -> Optional[BarridoConflictos]:
+        """
+        Ejecuta (o reanuda) un barrido hasta completarlo.
+
+        Args:
+            db: Sesión de base de datos
+            barrido_id: ID del barrido
+
+        Returns:
+            BarridoConflictos actualizado (inactivo si fue reemplazado), o
+            None si no existe o si otro proceso lo está ejecutando
+        """
+        if not self._reclamar(db, barrido_id):
+            barrido = db.query(BarridoConflictos).filter(BarridoConflictos.id == barrido_id).first()
+            if barrido is None or barrido.estado == EstadoBarrido.COMPLETADO or not barrido.esta_activo:
+                return barrido
+            print(f"Conflict sweep {barrido_id} already running - skipped")
+            return None
+
+        barrido = (
+            db.query(BarridoConflictos)
+            .filter(BarridoConflictos.id == barrido_id)
+            .populate_existing()
+            .first()
+        )
+
+        try:
+            self._procesar(db, barrido)
+        except BarridoReemplazado:
+            print(f"Conflict sweep {barrido.id} superseded by a newer sweep - stopped")
+            return barrido
+        except Exception as e:
+            db.rollback()
+            barrido.estado = EstadoBarrido.FALLIDO
+            barrido.error = str(e)
+            db.commit()
+            print(
+                f"Conflict sweep {barrido.id} failed at {barrido.fase} page "
+                f"id>{barrido.indice_desde_id}, cliente_id>{barrido.ultimo_cliente_id}: {e}"
+            )
+            return barrido
+
+        barrido.estado = EstadoBarrido.COMPLETADO
+        barrido.finalizado_en = datetime.utcnow()
+        db.commit()
+        db.refresh(barrido)
+        return barrido
+
+    def _reclamar(self, db: Session, barrido_id: int) -> bool:
+        """
+        Pasa el barrido a EN_PROGRESO solo si nadie lo está ejecutando
+        (PENDIENTE / FALLIDO, o EN_PROGRESO sin checkpoint en
+        conflict_sweep_stale_seconds: su proceso murió). El UPDATE
+        condicional decide entre procesos: solo uno ve rowcount 1.
+        """
+        ahora = datetime.utcnow()
+        limite = ahora - timedelta(seconds=settings.conflict_sweep_stale_seconds)
+        reclamado = db.execute(
+            update(BarridoConflictos)
+            .where(
+                BarridoConflictos.id == barrido_id,
+                BarridoConflictos.esta_activo == True,
+                or_(
+                    BarridoConflictos.estado.in_([EstadoBarrido.PENDIENTE, EstadoBarrido.FALLIDO]),
+                    and_(
+                        BarridoConflictos.estado == EstadoBarrido.EN_PROGRESO,
+                        BarridoConflictos.actualizado_en < limite
+                    )
+                )
+            )
+            .values(
+                estado=EstadoBarrido.EN_PROGRESO,
+                error=None,
+                iniciado_en=func.coalesce(BarridoConflictos.iniciado_en, ahora),
+                actualizado_en=ahora
+            )
+            .execution_options(synchronize_session=False)
+        ).rowcount
+        db.commit()
+        return reclamado == 1
+
+    # ------------------------------------------------------------------
+    # Proceso por chunks
+    # ------------------------------------------------------------------
+
+    def _procesar(self, db: Session, barrido: BarridoConflictos):
+        """
+        Recorre el índice por páginas (partes, luego clientes) y, contra
+        cada página, los clientes por chunks con checkpoint.
+        """
+        while True:
+            if barrido.indice_hasta_id is None:
+                hasta = self._fin_pagina(db, barrido)
+                if hasta is None:
+                    if barrido.fase == FaseBarrido.CLIENTES:
+                        return
+                    barrido.fase = FaseBarrido.CLIENTES
+                    barrido.indice_desde_id = 0
+                    db.commit()
+                    continue
+                barrido.indice_hasta_id = hasta
+                barrido.ultimo_cliente_id = 0
+                db.commit()
+
+            self._procesar_pagina(db, barrido)
+
+            barrido.indice_desde_id = barrido.indice_hasta_id
+            barrido.indice_hasta_id = None
+            barrido.ultimo_cliente_id = 0
+            db.commit()
+            self._verificar_vigente(db, barrido)
+
+    def _procesar_pagina(self, db: Session, barrido: BarridoConflictos):
+        """Evalúa todos los clientes contra la página actual del índice."""
+        firm_id = barrido.firma_id
+        umbral = barrido.umbral
+        desde, hasta = barrido.indice_desde_id, barrido.indice_hasta_id
+
+        if barrido.fase == FaseBarrido.PARTES:
+            indice_partes = self._indexar_partes(db, firm_id, desde, hasta)
+            indice_clientes = _IndiceObjetivos()
+        else:
+            indice_partes = _IndiceObjetivos()
+            indice_clientes = self._indexar_clientes(db, firm_id, desde, hasta)
+        print(
+            f"Conflict sweep {barrido.id}: {barrido.fase} page id {desde + 1}-{hasta}, "
+            f"{len(indice_partes.metadatos) + len(indice_clientes.metadatos)} nombres indexados"
+        )
+
+        filtros = [
+            Cliente.firma_id == firm_id,
+            Cliente.esta_activo == True
+        ]
+        # Duplicados: solo un cliente con id menor a alguno de la página
+        # puede formar par (otro.id > cliente.id). La primera página de
+        # clientes recorre a todos y es la que cuenta clientes_procesados.
+        contar = barrido.fase == FaseBarrido.CLIENTES and desde == 0
+        if barrido.fase == FaseBarrido.CLIENTES and not contar:
+            filtros.append(Cliente.id < hasta)
+
+        chunk_size = self.chunk_size
+
+        while True:
+            clientes = (
+                db.query(
+                    Cliente.id, Cliente.nombre, Cliente.apellido,
+                    Cliente.segundo_apellido, Cliente.nombre_empresa
+                )
+                .filter(*filtros, Cliente.id > barrido.ultimo_cliente_id)
+                .order_by(Cliente.id)
+                .limit(chunk_size)
+                .all()
+            )
+
+            if not clientes:
+                break
+
+            filas, pares = self._evaluar_chunk(
+                barrido, clientes, indice_partes, indice_clientes, umbral
+            )
+
+            # Resultados + checkpoint en la misma transacción
+            if filas:
+                db.execute(insert(CoincidenciaBarrido), filas)
+            barrido.ultimo_cliente_id = clientes[-1].id
+            if contar:
+                barrido.clientes_procesados += len(clientes)
+            barrido.pares_evaluados += pares
+            barrido.coincidencias_encontradas += len(filas)
+            db.commit()
+            self._verificar_vigente(db, barrido)
+
+            del filas
+            if self._memoria_actual_mb() > self.max_memory_mb and chunk_size > _CHUNK_MINIMO:
+                chunk_size = max(_CHUNK_MINIMO, chunk_size // 2)
+                gc.collect()
+                print(f"Conflict sweep {barrido.id}: memory ceiling reached, chunk size -> {chunk_size}")
+
+        del indice_partes, indice_clientes
+        gc.collect()
+
+    def _verificar_vigente(self, db: Session, barrido: BarridoConflictos):
+        """Tras cada checkpoint: se detiene si un barrido nuevo lo reemplazó."""
+        db.refresh(barrido, ["esta_activo"])
+        if not barrido.esta_activo:
+            raise BarridoReemplazado()
+
+    def _fin_pagina(self, db: Session, barrido: BarridoConflictos) -> Optional[int]:
+        """
+        Último id de la siguiente página del índice (hasta
+        index_page_size objetivos con id > indice_desde_id), o None si no
+        quedan objetivos en la fase. Se guarda en el checkpoint para que
+        la página sea la misma al reanudar.
+        """
+        if barrido.fase == FaseBarrido.PARTES:
+            ids = (
+                db.query(ParteRelacionada.id)
+                .join(Asunto, ParteRelacionada.asunto_id == Asunto.id)
+                .join(Cliente, Asunto.cliente_id == Cliente.id)
+                .filter(
+                    Cliente.firma_id == barrido.firma_id,
+                    ParteRelacionada.esta_activo == True,
+                    Asunto.esta_activo == True,
+                    Cliente.esta_activo == True,
+                    ParteRelacionada.id > barrido.indice_desde_id
+                )
+                .order_by(ParteRelacionada.id)
+            )
+        else:
+            ids = (
+                db.query(Cliente.id)
+                .filter(
+                    Cliente.firma_id == barrido.firma_id,
+                    Cliente.esta_activo == True,
+                    Cliente.id > barrido.indice_desde_id
+                )
+                .order_by(Cliente.id)
+            )
+
+        pagina = ids.limit(max(1, self.index_page_size)).subquery()
+        return db.query(func.max(pagina.c.id)).scalar()
+
+    def _evaluar_chunk(
+        self,
+        barrido: BarridoConflictos,
+        clientes: List,
+        indice_partes: _IndiceObjetivos,
+        indice_clientes: _IndiceObjetivos,
+        umbral: int
+    ) -> Tuple[List[Dict], int]:
+        """
+        Evalúa un chunk de clientes contra ambos índices.
+
+        Returns:
+            (filas para coincidencias_barrido, pares candidatos evaluados)
+        """
+        filas: List[Dict] = []
+        pares = 0
+
+        for cliente in clientes:
+            variantes = self._variantes_cliente(cliente)
+            if not variantes:
+                continue
+
+            claves: Set[str] = set()
+            for nombre_procesado in variantes:
+                claves |= self._claves_bloqueo(nombre_procesado)
+
+            nombre_cliente = self._nombre_completo(cliente)
+
+            # Cliente x parte relacionada
+            for idx in indice_partes.candidatos(claves):
+                parte_id, parte_nombre, tipo_relacion, asunto_id, cliente_asunto_id = indice_partes.metadatos[idx]
+                if cliente_asunto_id == cliente.id:
+                    continue  # Parte del propio asunto del cliente
+                pares += 1
+                score = self._mejor_score(variantes, indice_partes.nombres_procesados[idx], umbral)
+                if score >= umbral:
+                    filas.append({
+                        "barrido_id": barrido.id,
+                        "firma_id": barrido.firma_id,
+                        "tipo_coincidencia": TipoCoincidenciaBarrido.CLIENTE_PARTE,
+                        "cliente_id": cliente.id,
+                        "cliente_nombre": nombre_cliente,
+                        "parte_id": parte_id,
+                        "asunto_id": asunto_id,
+                        "otro_cliente_id": None,
+                        "contraparte_nombre": parte_nombre,
+                        "tipo_relacion": tipo_relacion,
+                        "similitud_score": score,
+                        "nivel_confianza": self._determinar_nivel_confianza(score),
+                        "creado_en": datetime.utcnow(),
+                    })
+
+            # Cliente x cliente (cada par una sola vez: otro.id > cliente.id)
+            for idx in indice_clientes.candidatos(claves):
+                otro_id, otro_nombre = indice_clientes.metadatos[idx]
+                if otro_id <= cliente.id:
+                    continue
+                pares += 1
+                score = self._mejor_score(variantes, indice_clientes.nombres_procesados[idx], umbral)
+                if score >= umbral:
+                    filas.append({
+                        "barrido_id": barrido.id,
+                        "firma_id": barrido.firma_id,
+                        "tipo_coincidencia": TipoCoincidenciaBarrido.CLIENTE_DUPLICADO,
+                        "cliente_id": cliente.id,
+                        "cliente_nombre": nombre_cliente,
+                        "parte_id": None,
+                        "asunto_id": None,
+                        "otro_cliente_id": otro_id,
+                        "contraparte_nombre": otro_nombre,
+                        "tipo_relacion": None,
+                        "similitud_score": score,
+                        "nivel_confianza": self._determinar_nivel_confianza(score),
+                        "creado_en": datetime.utcnow(),
+                    })
+
+        return filas, pares
+
+    # ------------------------------------------------------------------
+    # Índices
+    # ------------------------------------------------------------------
+
+    def _indexar_partes(self, db: Session, firm_id: int, desde: int, hasta: int) -> _IndiceObjetivos:
+        """Indexa una página (desde < id <= hasta) de las partes relacionadas activas del bufete."""
+        indice = _IndiceObjetivos()
+
+        query = (
+            db.query(
+                ParteRelacionada.id, ParteRelacionada.nombre, ParteRelacionada.tipo_relacion,
+                Asunto.id, Asunto.cliente_id
+            )
+            .join(Asunto, ParteRelacionada.asunto_id == Asunto.id)
+            .join(Cliente, Asunto.cliente_id == Cliente.id)
+            .filter(
+                Cliente.firma_id == firm_id,
+                ParteRelacionada.esta_activo == True,
+                Asunto.esta_activo == True,
+                Cliente.esta_activo == True,
+                ParteRelacionada.id > desde,
+                ParteRelacionada.id <= hasta
+            )
+            .yield_per(self.chunk_size)
+        )
+
+        for parte_id, nombre, tipo_relacion, asunto_id, cliente_id in query:
+            procesado = self._preparar_nombre(nombre)
+            if not procesado:
+                continue
+            indice.agregar(
+                procesado,
+                self._claves_bloqueo(procesado),
+                (parte_id, nombre, tipo_relacion, asunto_id, cliente_id)
+            )
+
+        return indice
+
+    def _indexar_clientes(self, db: Session, firm_id: int, desde: int, hasta: int) -> _IndiceObjetivos:
+        """Indexa una página (desde < id <= hasta) de los clientes activos del bufete para detectar duplicados."""
+        indice = _IndiceObjetivos()
+
+        query = (
+            db.query(
+                Cliente.id, Cliente.nombre, Cliente.apellido,
+                Cliente.segundo_apellido, Cliente.nombre_empresa
+            )
+            .filter(
+                Cliente.firma_id == firm_id,
+                Cliente.esta_activo == True,
+                Cliente.id > desde,
+                Cliente.id <= hasta
+            )
+            .yield_per(self.chunk_size)
+        )
+
+        for cliente in query:
+            nombre = self._nombre_completo(cliente)
+            for procesado in self._variantes_cliente(cliente):
+                indice.agregar(
+                    procesado,
+                    self._claves_bloqueo(procesado),
+                    (cliente.id, nombre)
+                )
+
+        return indice
+
+    # ------------------------------------------------------------------
+    # Normalización, blocking y scoring
+    # ------------------------------------------------------------------
+
+    def _preparar_nombre(self, texto: Optional[str]) -> str:
+        """
+        Normaliza y ordena tokens una sola vez por nombre.
+
+        fuzz.ratio sobre dos nombres preparados así equivale a
+        ConflictChecker._calcular_similitud (token_sort_ratio sobre texto
+        sin acentos), pero sin repetir el preprocesamiento en cada par.
+        """
+        if not texto:
+            return ""
+        procesado = utils.full_process(unidecode(texto.lower()), force_ascii=True)
+        return " ".join(sorted(procesado.split()))
+
+    def _variantes_cliente(self, cliente) -> List[str]:
+        """Nombre de persona y nombre de empresa del cliente, ya preparados."""
+        variantes = []
+        persona = " ".join(
+            p for p in [cliente.nombre, cliente.apellido, cliente.segundo_apellido] if p
+        )
+        for texto in (persona, cliente.nombre_empresa):
+            procesado = self._preparar_nombre(texto)
+            if procesado and procesado not in variantes:
+                variantes.append(procesado)
+        return variantes
+
+    def _nombre_completo(self, cliente) -> str:
+        """Equivalente a Cliente.nombre_completo para filas de columnas."""
+        if cliente.nombre_empresa:
+            return cliente.nombre_empresa
+        return " ".join(
+            p for p in [cliente.nombre, cliente.apellido, cliente.segundo_apellido] if p
+        )
+
+    def _codigo_fonetico(self, token: str) -> str:
+        """Código fonético simplificado para español (4 caracteres máx)."""
+        for origen, destino in _REEMPLAZOS_FONETICOS:
+            token = token.replace(origen, destino)
+        if not token:
+            return ""
+
+        codigo = token[0]
+        for ch in token[1:]:
+            if ch in "aeiouy" or ch == codigo[-1]:
+                continue
+            codigo += ch
+        return codigo[:4]
+
+    def _claves_bloqueo(self, nombre_procesado: str) -> Set[str]:
+        """Claves de bloque: prefijo de 3 letras y código fonético por token."""
+        claves = set()
+        for token in nombre_procesado.split():
+            if len(token) < 2 or token in _PALABRAS_VACIAS:
+                continue
+            claves.add("p:" + token[:3])
+            codigo = self._codigo_fonetico(token)
+            if codigo:
+                claves.add("f:" + codigo)
+        return claves
+
+    def _mejor_score(self, variantes: List[str], objetivo: str, umbral: int) -> float:
+        """
+        Máxima similitud entre las variantes del cliente y el objetivo.
+        Descarta sin calcular cuando la diferencia de largo hace imposible
+        alcanzar el umbral (ratio <= 2*min/(len1+len2)).
+        """
+        mejor = 0.0
+        largo_objetivo = len(objetivo)
+        for variante in variantes:
+            largo = len(variante)
+            if 200 * min(largo, largo_objetivo) < umbral * (largo + largo_objetivo):
+                continue
+            score = float(fuzz.ratio(variante, objetivo))
+            if score > mejor:
+                mejor = score
+        return mejor
+
+    def _determinar_nivel_confianza(self, score: float) -> str:
+        """'alta' para >= umbral de confianza alta, 'media' en otro caso."""
+        return "alta" if score >= self.high_confidence_threshold else "media"
+
+    def _memoria_actual_mb(self) -> float:
+        """RSS actual del proceso en MB (0 si no se puede medir)."""
+        try:
+            with open("/proc/self/statm") as f:
+                paginas = int(f.read().split()[1])
+            return paginas * os.sysconf("SC_PAGE_SIZE") / (1024 * 1024)
+        except (OSError, ValueError, IndexError):
+            return 0.0
+
+
+# Instancia singleton del servicio
+conflict_sweeper = ConflictSweeper()
@@ -8,6 +8,11 @@ from typing import List, Optional, Dict
 from datetime import datetime
 from openai import OpenAI
 
+from app.config import get_settings
+from app.services.provider_backends import openai_kwargs
+
+settings = get_settings()
+
 
 class AIResignationService:
     """
@@ -20,6 +25,11 @@ class AIResignationService:
         self._client = None
         self.api_key = os.getenv("OPENAI_API_KEY")
         self.model = "gpt-4o-mini"  # Cost-effective model
+        
+        # Backend local (sink / mock): no requiere credenciales reales
+        self.backend = settings.llm_backend
+        if self.backend != "real":
+            self.api_key = self.api_key or self.backend
     
     @property
     def client(self):
@@ -30,7 +40,7 @@ class AIResignationService:
                 return None
             
             try:
-                self._client = OpenAI(api_key=self.api_key)
+                self._client = OpenAI(api_key=self.api_key, **openai_kwargs(self.backend))
             except Exception as e:
                 print(f"⚠️  Failed to initialize OpenAI client: {e}")
                 return None
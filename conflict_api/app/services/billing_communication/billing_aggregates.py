@@ -0,0 +1,117 @@
+"""
+Agregados precalculados del dashboard de facturación.
+
+Una fila por bufete en billing_aging_firma con el total pendiente y los
+buckets de antigüedad (0-30, 30-60, 60+ días). Los triggers de invoices
+y clientes (migraciones 005 y 015) la mantienen al día con cada cambio;
+como los buckets dependen de la fecha, el scheduler la recalcula completa
+cada día.
+
+El recálculo y los triggers se coordinan con un advisory lock por bufete
+(AGING_LOCK_CLAVE, firma_id): cada trigger lo toma compartido hasta el fin
+de su transacción y el recálculo lo toma exclusivo antes de leer las
+facturas, así que ve todos los cambios ya aplicados como deltas y ningún
+delta queda pisado por el upsert.
+"""
+
+from typing import Optional
+
+from sqlalchemy import text
+from sqlalchemy.engine import Row
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+
+# Espacio de claves del advisory lock (hashtext(AGING_LOCK_CLAVE), firma_id),
+# el mismo que toma billing_aging_aplicar_firma en el trigger
+AGING_LOCK_CLAVE = "billing_aging_firma"
+
+_SQL_BLOQUEAR = text("SELECT pg_advisory_xact_lock(hashtext(:clave), :firm_id)")
+
+# Recalcula (upsert) los agregados de un bufete
+_SQL_RECALCULAR = text("""
+    INSERT INTO billing_aging_firma (
+        firma_id, calculado_para, total_invoices, total_outstanding,
+        bucket_0_30_count, bucket_0_30_amount,
+        bucket_30_60_count, bucket_30_60_amount,
+        bucket_60_plus_count, bucket_60_plus_amount,
+        actualizado_en
+    )
+    SELECT
+        f.id,
+        CURRENT_DATE,
+        COUNT(i.id),
+        COALESCE(SUM(i.amount), 0),
+        COUNT(i.id) FILTER (WHERE CURRENT_DATE - i.due_date < 30),
+        COALESCE(SUM(i.amount) FILTER (WHERE CURRENT_DATE - i.due_date < 30), 0),
+        COUNT(i.id) FILTER (WHERE CURRENT_DATE - i.due_date >= 30 AND CURRENT_DATE - i.due_date < 60),
+        COALESCE(SUM(i.amount) FILTER (WHERE CURRENT_DATE - i.due_date >= 30 AND CURRENT_DATE - i.due_date < 60), 0),
+        COUNT(i.id) FILTER (WHERE CURRENT_DATE - i.due_date >= 60),
+        COALESCE(SUM(i.amount) FILTER (WHERE CURRENT_DATE - i.due_date >= 60), 0),
+        CURRENT_TIMESTAMP
+    FROM firmas f
+    LEFT JOIN clientes c ON c.firma_id = f.id
+    LEFT JOIN invoices i ON i.client_id = c.id
+        AND i.status = 'pending'
+        AND i.esta_activo = true
+    WHERE f.id = :firm_id
+    GROUP BY f.id
+    ON CONFLICT (firma_id) DO UPDATE SET
+        calculado_para = EXCLUDED.calculado_para,
+        total_invoices = EXCLUDED.total_invoices,
+        total_outstanding = EXCLUDED.total_outstanding,
+        bucket_0_30_count = EXCLUDED.bucket_0_30_count,
+        bucket_0_30_amount = EXCLUDED.bucket_0_30_amount,
+        bucket_30_60_count = EXCLUDED.bucket_30_60_count,
+        bucket_30_60_amount = EXCLUDED.bucket_30_60_amount,
+        bucket_60_plus_count = EXCLUDED.bucket_60_plus_count,
+        bucket_60_plus_amount = EXCLUDED.bucket_60_plus_amount,
+        actualizado_en = EXCLUDED.actualizado_en
+""")
+
+
+class BillingAggregates:
+    """
+    Lectura y recálculo de billing_aging_firma.
+    """
+
+    def recalcular(self, db: Session, firm_id: Optional[int] = None) -> int:
+        """
+        Recalcula los agregados (todos los bufetes, o solo firm_id) con la
+        fecha de hoy. Retorna el número de bufetes actualizados.
+
+        Un bufete por transacción: toma su advisory lock exclusivo (espera
+        a las transacciones de facturas en curso y bloquea las nuevas
+        hasta el commit) y recién entonces lee las facturas. Con un solo
+        lock a la vez no hay deadlocks contra los triggers.
+        """
+        if firm_id is not None:
+            firmas = [firm_id]
+        else:
+            firmas = db.execute(text("SELECT id FROM firmas ORDER BY id")).scalars().all()
+
+        actualizados = 0
+        for firma_id in firmas:
+            db.execute(_SQL_BLOQUEAR, {"clave": AGING_LOCK_CLAVE, "firm_id": firma_id})
+            actualizados += db.execute(_SQL_RECALCULAR, {"firm_id": firma_id}).rowcount
+            db.commit()
+        return actualizados
+
+    async def obtener_async(self, db: AsyncSession, firm_id: int) -> Optional[Row]:
+        """
+        Fila precalculada del bufete, o None si no existe o es de otro día
+        (buckets desactualizados hasta el próximo recálculo).
+        """
+        # CURRENT_DATE del servidor, la misma fecha que usa el recálculo
+        return (await db.execute(
+            text("""
+                SELECT * FROM billing_aging_firma
+                WHERE firma_id = :firm_id
+                AND calculado_para = CURRENT_DATE
+            """),
+            {"firm_id": firm_id}
+        )).fetchone()
+
+
+# Singleton instance
+billing_aggregates = BillingAggregates()
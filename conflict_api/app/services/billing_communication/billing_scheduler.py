@@ -1,20 +1,42 @@
 """
 Scheduler automático para recordatorios de facturación.
 Escanea facturas vencidas y envía recordatorios según reglas de negocio.
+También ejecuta, en segundo plano, las corridas manuales de un bufete
+(billing_scheduler_jobs) que se disparan desde la API.
 """
 
 import os
-from datetime import datetime, date, timedelta
-from typing import List, Dict, Optional
+import time
+from contextlib import ExitStack
+from datetime import datetime, timedelta
+from typing import List, Dict, Optional, Tuple
 from apscheduler.schedulers.background import BackgroundScheduler
 from apscheduler.triggers.cron import CronTrigger
+from apscheduler.triggers.interval import IntervalTrigger
+from sqlalchemy import bindparam, text, update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 from sqlalchemy.orm import Session
 
+from app.config import get_settings
 from app.database import SessionLocal
-from app.models.billing_communication import CommunicationType, CommunicationStatus
+from app.models.billing_communication import (
+    BillingSchedulerJob, CommunicationType, CommunicationStatus, OutboxStatus, SchedulerJobStatus
+)
 from app.crud.billing_communication import crud_billing_communication
-from app.services.billing_communication.sendgrid_service import sendgrid_service
-from app.services.twilio_sms_service import twilio_sms_service
+from app.crud.billing_outbox import crud_billing_outbox
+from app.services.billing_communication.billing_aggregates import billing_aggregates
+from app.services.billing_communication.outbox_worker import billing_outbox_worker
+from app.services.billing_communication.ventanas_envio import ventanas_envio
+from app.services.distributed_lock import distributed_lock
+from app.metrics import registry
+
+settings = get_settings()
+
+SCHEDULER_RUN_DURATION = registry.histogram(
+    "scheduler_run_duration_seconds", "Duración de cada corrida del scheduler (segundos)",
+    ["job", "status"],
+    buckets=(0.1, 0.5, 1, 5, 10, 30, 60, 300, 900, 1800, 3600)
+)
 
 
 class BillingReminderScheduler:
@@ -40,18 +62,47 @@ class BillingReminderScheduler:
     def start(self):
         """Inicia el scheduler."""
         if not self.is_running:
-            # Configurar job para ejecutar diariamente a las 9 AM
+            # Planificación diaria en hora local (settings.timezone); los
+            # envíos salen después, en la ventana de cada bufete
             self.scheduler.add_job(
                 func=self.process_overdue_invoices,
-                trigger=CronTrigger(hour=9, minute=0),
+                trigger=CronTrigger(
+                    hour=settings.billing_scheduler_plan_hour, minute=0, timezone=settings.timezone
+                ),
                 id='billing_reminders',
                 name='Process Overdue Invoices',
                 replace_existing=True
             )
             
+            # Recalcular agregados del dashboard al cambiar el día (y al
+            # iniciar, por si el proceso no estaba corriendo a medianoche)
+            self.scheduler.add_job(
+                func=self.refresh_dashboard_aggregates,
+                trigger=CronTrigger(hour=0, minute=5, timezone=settings.timezone),
+                id='billing_aggregates',
+                name='Refresh Billing Dashboard Aggregates',
+                replace_existing=True,
+                next_run_time=datetime.now()
+            )
+            
+            # Worker del outbox: envía lo que planificó el recordatorio diario
+            # y los reintentos con backoff
+            self.scheduler.add_job(
+                func=self.dispatch_outbox,
+                trigger=IntervalTrigger(seconds=settings.billing_outbox_poll_seconds),
+                id='billing_outbox',
+                name='Dispatch Billing Outbox',
+                replace_existing=True,
+                coalesce=True,
+                max_instances=1
+            )
+            
             self.scheduler.start()
             self.is_running = True
-            print("Billing Reminder Scheduler started - Daily at 9:00 AM")
+            print(
+                f"Billing Reminder Scheduler started - Daily at "
+                f"{settings.billing_scheduler_plan_hour:02d}:00 ({settings.timezone})"
+            )
     
     def stop(self):
         """Detiene el scheduler."""
@@ -62,130 +113,318 @@ class BillingReminderScheduler:
     
     def process_overdue_invoices(self):
         """
-        Procesa todas las facturas vencidas y envía recordatorios apropiados.
+        Procesa todas las facturas vencidas y encola los recordatorios apropiados.
         Este método se ejecuta automáticamente cada día.
+        
+        Una sola query decide qué facturas requieren acción hoy (recordatorio
+        o marca de danger zone). Por lote de billing_scheduler_chunk_size
+        facturas, los logs de danger zone y las intenciones de envío
+        (billing_outbox) se escriben en una sola transacción; los envíos
+        los hace el worker del outbox (dispatch_outbox).
+        
+        Cada proceso corre este job: un lock distribuido por shard
+        (billing_scheduler_shards, por firma_id) garantiza que cada shard
+        lo procese un solo proceso a la vez. Con un shard, el proceso que
+        toma el lock es el líder y los demás no hacen nada.
         """
         print(f"\n{'='*60}")
         print(f"Processing Overdue Invoices - {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
         print(f"{'='*60}\n")
         
         db = SessionLocal()
+        inicio = time.perf_counter()
+        run_status = "skipped"
         
         try:
-            # Obtener facturas no pagadas
-            overdue_invoices = self._get_overdue_invoices(db)
+            queued = 0
+            danger_zone = 0
             
-            print(f"Found {len(overdue_invoices)} overdue invoices")
-            
-            for invoice in overdue_invoices:
-                days_overdue = (date.today() - invoice['due_date']).days
-                
-                print(f"\n Processing Invoice #{invoice['invoice_number']}")
-                print(f"   Client: {invoice['client_name']}")
-                print(f"   Amount: ${invoice['amount']:,.2f}")
-                print(f"   Days Overdue: {days_overdue}")
-                
-                # Determinar si debe enviar recordatorio
-                if days_overdue >= self.danger_zone_days:
-                    print(f"DANGER ZONE - No automated action")
-                    self._mark_as_danger_zone(db, invoice)
-                
-                elif days_overdue in self.reminder_days:
-                    # Verificar si ya se envió recordatorio hoy
-                    if self._should_send_reminder(db, invoice['id'], days_overdue):
-                        print(f"   Sending reminder (level {self._get_reminder_level(days_overdue)})")
-                        self._send_multi_channel_reminder(db, invoice, days_overdue)
-                    else:
-                        print(f"   ✓ Reminder already sent today")
-                
-                else:
-                    print(f"   ⏸ Not at reminder threshold yet")
+            # Los locks se mantienen hasta terminar la corrida: un proceso
+            # que llega tarde no re-procesa un shard en curso
+            with ExitStack() as locks:
+                for shard in range(max(1, settings.billing_scheduler_shards)):
+                    lock_name = self._reminders_lock_name(shard)
+                    if not locks.enter_context(distributed_lock.adquirir(lock_name)):
+                        print(f"   {lock_name}: held by another worker - skipping")
+                        continue
+                    
+                    run_status = "success"
+                    shard_queued, shard_danger_zone = self._process_shard(db, shard)
+                    queued += shard_queued
+                    danger_zone += shard_danger_zone
             
             print(f"\n{'='*60}")
-            print(f"Processing complete")
+            print(f"Processing complete: {queued} sends queued, {danger_zone} marked as danger zone")
             print(f"{'='*60}\n")
+            
+            if queued:
+                self._despertar_outbox()
         
         except Exception as e:
+            run_status = "error"
+            db.rollback()
             print(f"Error processing invoices: {e}")
         
         finally:
             db.close()
+            SCHEDULER_RUN_DURATION.observe(
+                time.perf_counter() - inicio,
+                job="process_overdue_invoices",
+                status=run_status
+            )
+    
+    def _reminders_lock_name(self, shard: int) -> str:
+        """Nombre del lock del job de recordatorios para un shard."""
+        if settings.billing_scheduler_shards <= 1:
+            return "billing_reminders"
+        return f"billing_reminders:{shard}/{settings.billing_scheduler_shards}"
     
-    def _get_overdue_invoices(self, db: Session) -> List[Dict]:
+    def _process_shard(self, db: Session, shard: int) -> Tuple[int, int]:
+        """
+        Planifica las facturas de un shard. Retorna (envíos encolados,
+        facturas marcadas danger zone), sin contar los ya registrados.
         """
-        Obtiene todas las facturas vencidas y no pagadas.
+        # Facturas que requieren acción hoy
+        actions = self._get_pending_actions(db, shard)
         
-        NOTA: Esta función asume que existe una tabla 'invoices' en la base de datos.
-        Ajustar según tu esquema real.
+        print(f"Found {len(actions)} overdue invoices requiring action")
+        return self._plan(db, actions)
+    
+    def _plan(
+        self,
+        db: Session,
+        actions: List[Dict],
+        job_id: Optional[int] = None
+    ) -> Tuple[int, int]:
         """
-        # Query SQL directo (ajustar según tu modelo real)
-        query = """
-            SELECT 
-                i.id,
-                i.invoice_number,
-                i.amount,
-                i.due_date,
-                i.client_id,
-                c.nombre || ' ' || c.apellido as client_name,
-                c.email as client_email,
-                c.telefono as client_phone
-            FROM invoices i
-            JOIN clients c ON i.client_id = c.id
-            WHERE i.status = 'pending'
-            AND i.due_date < CURRENT_DATE
-            AND i.esta_activo = true
-            ORDER BY i.due_date ASC
+        Escribe, por lote de billing_scheduler_chunk_size facturas, los logs
+        de danger zone y las intenciones de envío (billing_outbox) en una
+        sola transacción. Con job_id, las intenciones quedan vinculadas a la
+        corrida manual y su progreso se incrementa (en SQL) en la misma
+        transacción.
         """
+        # Horario de envío de cada recordatorio dentro de la ventana de su bufete
+        horarios = self._schedule_reminders(db, [
+            invoice for invoice in actions if invoice['days_overdue'] < self.danger_zone_days
+        ])
         
-        result = db.execute(query)
-        
-        invoices = []
-        for row in result:
-            invoices.append({
-                'id': row[0],
-                'invoice_number': row[1],
-                'amount': row[2],
-                'due_date': row[3],
-                'client_id': row[4],
-                'client_name': row[5],
-                'client_email': row[6],
-                'client_phone': row[7]
-            })
+        queued = 0
+        danger_zone = 0
+        for chunk_start in range(0, len(actions), settings.billing_scheduler_chunk_size):
+            chunk = actions[chunk_start:chunk_start + settings.billing_scheduler_chunk_size]
+            logs: List[Dict] = []
+            intents: List[Dict] = []
+            
+            for invoice in chunk:
+                days_overdue = invoice['days_overdue']
+                
+                if days_overdue >= self.danger_zone_days:
+                    print(f"   Invoice #{invoice['invoice_number']}: DANGER ZONE - No automated action")
+                    logs.append(self._danger_zone_log(invoice))
+                else:
+                    print(
+                        f"   Invoice #{invoice['invoice_number']}: {days_overdue} days overdue - "
+                        f"queueing reminder (level {invoice['reminder_level']})"
+                    )
+                    intents.extend(self._reminder_intents(
+                        invoice, days_overdue, horarios[invoice['id']], job_id
+                    ))
+            
+            # Llaves de idempotencia: lo que otra corrida ya registró se ignora
+            marcas = crud_billing_communication.create_danger_zone_logs_bulk(db, logs, commit=False)
+            encoladas = crud_billing_outbox.enqueue_bulk(db, intents, commit=False)
+            if job_id is not None:
+                db.execute(
+                    update(BillingSchedulerJob)
+                    .where(BillingSchedulerJob.id == job_id)
+                    .values(
+                        invoices_processed=BillingSchedulerJob.invoices_processed + len(chunk),
+                        sends_queued=BillingSchedulerJob.sends_queued + encoladas,
+                        danger_zone_marked=BillingSchedulerJob.danger_zone_marked + marcas,
+                        actualizado_en=datetime.utcnow()
+                    )
+                )
+            db.commit()
+            queued += encoladas
+            danger_zone += marcas
+            
+            duplicados = (len(logs) - marcas) + (len(intents) - encoladas)
+            if duplicados:
+                print(f"   {duplicados} sends / danger-zone marks already registered - skipped")
         
-        return invoices
+        return queued, danger_zone
     
-    def _should_send_reminder(
-        self,
-        db: Session,
-        invoice_id: int,
-        days_overdue: int
-    ) -> bool:
+    def _despertar_outbox(self):
+        """
+        Despierta al worker del outbox en vez de esperar su intervalo. Sin
+        scheduler corriendo nadie despacha el outbox: se despacha aquí.
         """
-        Verifica si debe enviar recordatorio hoy.
-        Evita enviar múltiples recordatorios el mismo día.
+        if self.is_running:
+            self.scheduler.modify_job('billing_outbox', next_run_time=datetime.now())
+        else:
+            self.dispatch_outbox()
+    
+    def dispatch_outbox(self):
+        """
+        Envía los recordatorios pendientes del outbox (incluye reintentos
+        cuyo backoff venció). Puede correr en varios procesos a la vez.
         """
-        # Obtener último recordatorio
-        last_log = crud_billing_communication.get_last_communication(db, invoice_id)
+        db = SessionLocal()
+        inicio = time.perf_counter()
+        run_status = "success"
         
-        if not last_log:
-            return True  # Nunca se ha enviado recordatorio
+        try:
+            procesadas = billing_outbox_worker.procesar_pendientes(db)
+            if procesadas:
+                print(f"Billing outbox: {procesadas} sends processed")
+        except Exception as e:
+            run_status = "error"
+            db.rollback()
+            print(f"⚠️  Error dispatching billing outbox: {e}")
+        finally:
+            db.close()
+            SCHEDULER_RUN_DURATION.observe(
+                time.perf_counter() - inicio,
+                job="dispatch_outbox",
+                status=run_status
+            )
+    
+    def refresh_dashboard_aggregates(self):
+        """
+        Recalcula billing_aging_firma para todos los bufetes: los buckets
+        de antigüedad se desplazan un día cada día.
+        """
+        db = SessionLocal()
+        inicio = time.perf_counter()
+        run_status = "success"
         
-        # Verificar si el último recordatorio fue hoy
-        today = date.today()
-        last_sent_date = last_log.sent_at.date()
+        try:
+            with distributed_lock.adquirir("billing_aggregates") as adquirido:
+                if adquirido:
+                    firmas = billing_aggregates.recalcular(db)
+                    print(f"Billing dashboard aggregates refreshed for {firmas} firms")
+                else:
+                    run_status = "skipped"
+        except Exception as e:
+            run_status = "error"
+            db.rollback()
+            print(f"⚠️  Error refreshing billing aggregates: {e}")
+        finally:
+            db.close()
+            SCHEDULER_RUN_DURATION.observe(
+                time.perf_counter() - inicio,
+                job="refresh_dashboard_aggregates",
+                status=run_status
+            )
+    
+    def _get_pending_actions(
+        self,
+        db: Session,
+        shard: Optional[int] = None,
+        firm_id: Optional[int] = None
+    ) -> List[Dict]:
+        """
+        Obtiene, en una sola query, las facturas vencidas que requieren
+        acción hoy, con el último log y el conteo de comunicaciones.
         
-        if last_sent_date == today:
-            return False  # Ya se envió hoy
+        Reglas (antes evaluadas factura por factura):
+        - 60+ días: marcar danger zone, salvo que el último log ya lo sea
+        - 15/30/45 días: enviar recordatorio si nunca se envió uno, o si el
+          último no fue hoy y aún no se envió este nivel (conteo < nivel)
+        - Nunca si la factura tiene envíos abiertos en el outbox (pendientes
+          o en reintento): aún no tienen log
         
-        # Verificar si es el momento correcto para este nivel
-        reminder_level = self._get_reminder_level(days_overdue)
+        Con shard (y billing_scheduler_shards > 1) solo considera los
+        bufetes con firma_id % shards == shard; con firm_id, solo ese bufete.
+        """
+        shards = settings.billing_scheduler_shards
+        filtros = []
+        params = {}
+        if shard is not None and shards > 1:
+            filtros.append("AND c.firma_id % :shard_count = :shard_index")
+            params.update(shard_count=shards, shard_index=shard)
+        if firm_id is not None:
+            filtros.append("AND c.firma_id = :firm_id")
+            params["firm_id"] = firm_id
+
+        query = text(f"""
+            WITH vencidas AS (
+                SELECT 
+                    i.id,
+                    i.invoice_number,
+                    i.amount,
+                    i.due_date,
+                    i.client_id,
+                    c.firma_id,
+                    c.nombre || ' ' || COALESCE(c.apellido, '') as client_name,
+                    c.email as client_email,
+                    c.telefono as client_phone,
+                    CURRENT_DATE - i.due_date as days_overdue
+                FROM invoices i
+                JOIN clientes c ON i.client_id = c.id
+                WHERE i.status = 'pending'
+                AND i.esta_activo = true
+                AND i.due_date <= CURRENT_DATE - CAST(:min_days AS INTEGER)
+                {" ".join(filtros)}
+            ),
+            logs AS (
+                SELECT 
+                    l.invoice_id,
+                    l.sent_at,
+                    l.days_overdue_when_sent,
+                    ROW_NUMBER() OVER (PARTITION BY l.invoice_id ORDER BY l.sent_at DESC) as rn,
+                    COUNT(*) OVER (PARTITION BY l.invoice_id) as communication_count
+                FROM billing_communication_logs l
+                WHERE l.esta_activo = true
+                AND l.invoice_id IN (SELECT id FROM vencidas)
+            ),
+            evaluadas AS (
+                SELECT 
+                    v.*,
+                    CASE 
+                        WHEN v.days_overdue >= 45 THEN 3
+                        WHEN v.days_overdue >= 30 THEN 2
+                        WHEN v.days_overdue >= 15 THEN 1
+                        ELSE 0
+                    END as reminder_level,
+                    ul.sent_at as last_sent_at,
+                    ul.days_overdue_when_sent as last_days_overdue,
+                    COALESCE(ul.communication_count, 0) as communication_count
+                FROM vencidas v
+                LEFT JOIN logs ul ON ul.invoice_id = v.id AND ul.rn = 1
+            )
+            SELECT * FROM evaluadas e
+            WHERE (
+                (
+                    e.days_overdue >= :danger_zone_days
+                    AND (e.last_days_overdue IS NULL OR e.last_days_overdue < :danger_zone_days)
+                )
+                OR (
+                    e.days_overdue IN :reminder_days
+                    AND (
+                        e.last_sent_at IS NULL
+                        OR (CAST(e.last_sent_at AS DATE) < CURRENT_DATE AND e.communication_count < e.reminder_level)
+                    )
+                )
+            )
+            AND NOT EXISTS (
+                SELECT 1 FROM billing_outbox o
+                WHERE o.invoice_id = e.id
+                AND o.status IN (:outbox_pending, :outbox_processing)
+            )
+            ORDER BY e.due_date ASC, e.id
+        """).bindparams(bindparam("reminder_days", expanding=True))
         
-        # Si ya se envió este nivel de recordatorio, no enviar de nuevo
-        existing_count = crud_billing_communication.get_communication_count(
-            db, invoice_id
-        )
+        result = db.execute(query, {
+            "min_days": min(self.reminder_days),
+            "danger_zone_days": self.danger_zone_days,
+            "reminder_days": self.reminder_days,
+            "outbox_pending": OutboxStatus.PENDING,
+            "outbox_processing": OutboxStatus.PROCESSING,
+            **params
+        })
         
-        return existing_count < reminder_level
+        return [dict(row._mapping) for row in result]
     
     def _get_reminder_level(self, days_overdue: int) -> int:
         """Determina el nivel de recordatorio basado en días de atraso."""
@@ -198,120 +437,216 @@ class BillingReminderScheduler:
         else:
             return 0  # No enviar aún
     
-    def _send_multi_channel_reminder(
+    def _schedule_reminders(self, db: Session, invoices: List[Dict]) -> Dict[int, datetime]:
+        """
+        Horario de envío (UTC) por factura: los recordatorios de cada
+        bufete se reparten uniformemente en su próxima ventana abierta
+        (ventanas_cobro), con un desfase por bufete para que los bufetes
+        con la misma ventana no arranquen todos al mismo instante.
+        """
+        por_firma: Dict[int, List[int]] = {}
+        for invoice in invoices:
+            por_firma.setdefault(invoice['firma_id'], []).append(invoice['id'])
+        
+        ventanas = ventanas_envio.cargar(db, por_firma)
+        ahora = datetime.utcnow()
+        
+        horarios: Dict[int, datetime] = {}
+        for firma_id, invoice_ids in por_firma.items():
+            slots = ventanas[firma_id].repartir(len(invoice_ids), ahora, ventanas_envio.fase(firma_id))
+            horarios.update(zip(invoice_ids, slots))
+        return horarios
+    
+    def _reminder_intents(
         self,
-        db: Session,
         invoice: Dict,
-        days_overdue: int
-    ):
+        days_overdue: int,
+        send_at: datetime,
+        job_id: Optional[int] = None
+    ) -> List[Dict]:
         """
-        Envía recordatorio por múltiples canales (Email + SMS).
+        Intenciones de envío del recordatorio por múltiples canales
+        (Email + SMS) para el outbox, con todo lo que el worker necesita
+        para enviar sin volver a leer la factura. Ambos canales salen a
+        la hora programada (send_at, UTC).
         """
         reminder_level = self._get_reminder_level(days_overdue)
+        base = {
+            "invoice_id": invoice['id'],
+            "reminder_level": reminder_level,
+            "days_overdue": days_overdue,
+            "next_attempt_at": send_at,
+            "job_id": job_id
+        }
+        datos = {
+            "firma_id": invoice['firma_id'],
+            "client_name": invoice['client_name'],
+            "invoice_number": invoice['invoice_number'],
+            "amount_due": float(invoice['amount']),
+            "days_overdue": days_overdue
+        }
         
-        # Enviar Email
+        intents = []
         if invoice.get('client_email'):
-            email_result = sendgrid_service.send_payment_reminder(
-                to_email=invoice['client_email'],
-                client_name=invoice['client_name'],
-                invoice_number=invoice['invoice_number'],
-                amount_due=invoice['amount'],
-                days_overdue=days_overdue,
-                due_date=invoice['due_date'].strftime('%d/%m/%Y'),
-                reminder_level=reminder_level
-            )
-            
-            if email_result.get('success'):
-                print(f"      ✓ Email sent successfully")
-                crud_billing_communication.create_log(
-                    db=db,
-                    invoice_id=invoice['id'],
-                    type=CommunicationType.EMAIL,
-                    message_body=f"Payment reminder level {reminder_level}",
-                    days_overdue=days_overdue,
-                    reminder_sequence=reminder_level,
-                    subject=f"Payment Reminder - Invoice #{invoice['invoice_number']}",
-                    status=CommunicationStatus.SENT,
-                    external_id=email_result.get('message_id')
-                )
-            else:
-                print(f"      ✗ Email failed: {email_result.get('error')}")
-                crud_billing_communication.create_log(
-                    db=db,
-                    invoice_id=invoice['id'],
-                    type=CommunicationType.EMAIL,
-                    message_body=f"Payment reminder level {reminder_level}",
-                    days_overdue=days_overdue,
-                    reminder_sequence=reminder_level,
-                    status=CommunicationStatus.FAILED
-                )
-        
-        # Enviar SMS
+            intents.append({**base, "channel": CommunicationType.EMAIL, "payload": {
+                **datos,
+                "to_email": invoice['client_email'],
+                "due_date": invoice['due_date'].strftime('%d/%m/%Y')
+            }})
         if invoice.get('client_phone'):
-            sms_result = twilio_sms_service.send_payment_reminder_sms(
-                to_phone=invoice['client_phone'],
-                client_name=invoice['client_name'],
-                invoice_number=invoice['invoice_number'],
-                amount_due=invoice['amount'],
-                days_overdue=days_overdue,
-                reminder_level=reminder_level
-            )
-            
-            if sms_result.get('success'):
-                print(f"      ✓ SMS sent successfully")
-                crud_billing_communication.create_log(
-                    db=db,
-                    invoice_id=invoice['id'],
-                    type=CommunicationType.SMS,
-                    message_body=f"SMS reminder level {reminder_level}",
-                    days_overdue=days_overdue,
-                    reminder_sequence=reminder_level,
-                    status=CommunicationStatus.SENT,
-                    external_id=sms_result.get('message_sid')
-                )
-            else:
-                print(f"      ✗ SMS failed: {sms_result.get('error')}")
-                crud_billing_communication.create_log(
-                    db=db,
-                    invoice_id=invoice['id'],
-                    type=CommunicationType.SMS,
-                    message_body=f"SMS reminder level {reminder_level}",
-                    days_overdue=days_overdue,
-                    reminder_sequence=reminder_level,
-                    status=CommunicationStatus.FAILED
-                )
+            intents.append({**base, "channel": CommunicationType.SMS, "payload": {
+                **datos,
+                "to_phone": invoice['client_phone']
+            }})
+        return intents
     
-    def _mark_as_danger_zone(self, db: Session, invoice: Dict):
+    def _danger_zone_log(self, invoice: Dict) -> Dict:
+        """
+        Log que marca la factura como zona de peligro (60+ días).
+        No se envían recordatorios automáticos.
         """
-        Marca factura como zona de peligro (60+ días).
-        No envía recordatorios automáticos.
+        return {
+            "invoice_id": invoice['id'],
+            "type": CommunicationType.EMAIL,
+            "message_body": "Invoice entered danger zone (60+ days overdue)",
+            "days_overdue_when_sent": invoice['days_overdue'],
+            "reminder_sequence": 4,
+            "status": CommunicationStatus.SENT
+        }
+    
+    def crear_job(self, db: Session, firm_id: int) -> Tuple[BillingSchedulerJob, bool]:
         """
-        # Verificar si ya está marcada
-        last_log = crud_billing_communication.get_last_communication(db, invoice['id'])
+        Retorna el job manual abierto (pendiente o en curso) del bufete, o
+        crea uno nuevo: varios clics seguidos en "trigger" no encolan varias
+        corridas (ux_billing_scheduler_jobs_open, un job abierto por bufete).
+        
+        Un job abierto por más de billing_scheduler_job_timeout_seconds
+        (su proceso murió) se marca FAILED y se crea uno nuevo.
         
-        if last_log and last_log.days_overdue_when_sent >= self.danger_zone_days:
-            return  # Ya está marcada
+        Returns:
+            (job, creado): solo un job recién creado debe ejecutarse
+        """
+        limite = datetime.utcnow() - timedelta(seconds=settings.billing_scheduler_job_timeout_seconds)
+        abiertos = [SchedulerJobStatus.PENDING, SchedulerJobStatus.RUNNING]
         
-        # Crear log de danger zone
-        crud_billing_communication.create_log(
-            db=db,
-            invoice_id=invoice['id'],
-            type=CommunicationType.EMAIL,
-            message_body="Invoice entered danger zone (60+ days overdue)",
-            days_overdue=(date.today() - invoice['due_date']).days,
-            reminder_sequence=4,
-            status=CommunicationStatus.SENT
+        db.execute(
+            update(BillingSchedulerJob)
+            .where(
+                BillingSchedulerJob.firma_id == firm_id,
+                BillingSchedulerJob.esta_activo == True,
+                BillingSchedulerJob.status.in_(abiertos),
+                BillingSchedulerJob.actualizado_en < limite
+            )
+            .values(
+                status=SchedulerJobStatus.FAILED,
+                error="Job abandonado: superó billing_scheduler_job_timeout_seconds sin progreso",
+                finished_at=datetime.utcnow(),
+                actualizado_en=datetime.utcnow()
+            )
         )
         
-        print(f"Marked as DANGER ZONE")
+        while True:
+            stmt = pg_insert(BillingSchedulerJob).values(
+                firma_id=firm_id,
+                status=SchedulerJobStatus.PENDING
+            ).on_conflict_do_nothing(
+                index_elements=["firma_id"],
+                index_where=text("status IN ('PENDING', 'RUNNING') AND esta_activo = true")
+            ).returning(BillingSchedulerJob.id)
+            creado_id = db.scalar(stmt)
+            db.commit()
+            
+            job = (
+                db.query(BillingSchedulerJob)
+                .filter(
+                    BillingSchedulerJob.firma_id == firm_id,
+                    BillingSchedulerJob.esta_activo == True,
+                    BillingSchedulerJob.status.in_(abiertos)
+                )
+                .order_by(BillingSchedulerJob.id.desc())
+                .first()
+            )
+            # Si el job abierto terminó entre el INSERT y la lectura, reintentar
+            if job is not None:
+                return job, job.id == creado_id
     
-    def manual_trigger(self):
+    def ejecutar_job(self, job_id: int):
         """
-        Trigger manual para testing.
-        Ejecuta el proceso inmediatamente.
+        Ejecuta un job manual con su propia sesión (usado desde
+        BackgroundTasks): planifica solo las facturas del bufete del job
+        y despierta al worker del outbox.
+        
+        El job se reclama con un UPDATE condicional (PENDING -> RUNNING):
+        si otro proceso ya lo tomó, esta ejecución no hace nada.
+        No toma los locks de shard: las llaves de idempotencia del outbox
+        y de danger zone evitan duplicados si coincide con la corrida
+        diaria del mismo bufete.
         """
-        print("Manual trigger activated")
-        self.process_overdue_invoices()
+        db = SessionLocal()
+        inicio = time.perf_counter()
+        run_status = "success"
+        
+        try:
+            ahora = datetime.utcnow()
+            reclamado = db.execute(
+                update(BillingSchedulerJob)
+                .where(
+                    BillingSchedulerJob.id == job_id,
+                    BillingSchedulerJob.status == SchedulerJobStatus.PENDING
+                )
+                .values(status=SchedulerJobStatus.RUNNING, started_at=ahora, error=None, actualizado_en=ahora)
+            ).rowcount
+            db.commit()
+            
+            if not reclamado:
+                run_status = "skipped"
+                print(f"Billing scheduler job {job_id} already claimed - skipped")
+                return
+            
+            firm_id = db.query(BillingSchedulerJob.firma_id).filter(BillingSchedulerJob.id == job_id).scalar()
+            print(f"Manual trigger activated - job {job_id} (firm {firm_id})")
+            
+            try:
+                actions = self._get_pending_actions(db, firm_id=firm_id)
+                self._actualizar_job(db, job_id, invoices_scanned=len(actions))
+                
+                queued, danger_zone = self._plan(db, actions, job_id)
+            except Exception as e:
+                run_status = "error"
+                db.rollback()
+                self._actualizar_job(
+                    db, job_id, status=SchedulerJobStatus.FAILED, error=str(e), finished_at=datetime.utcnow()
+                )
+                print(f"⚠️  Billing scheduler job {job_id} failed: {e}")
+                return
+            
+            self._actualizar_job(
+                db, job_id, status=SchedulerJobStatus.COMPLETED, finished_at=datetime.utcnow()
+            )
+            print(f"Job {job_id} complete: {queued} sends queued, {danger_zone} marked as danger zone")
+            
+            if queued:
+                self._despertar_outbox()
+        
+        finally:
+            db.close()
+            SCHEDULER_RUN_DURATION.observe(
+                time.perf_counter() - inicio,
+                job="manual_trigger",
+                status=run_status
+            )
+    
+    def _actualizar_job(self, db: Session, job_id: int, **valores):
+        """Actualiza columnas del job en curso y confirma."""
+        db.execute(
+            update(BillingSchedulerJob)
+            .where(
+                BillingSchedulerJob.id == job_id,
+                BillingSchedulerJob.status == SchedulerJobStatus.RUNNING
+            )
+            .values(actualizado_en=datetime.utcnow(), **valores)
+        )
+        db.commit()
 
 
 # Instancia global del scheduler
@@ -0,0 +1,269 @@
+"""
+Eventos de entrega de los proveedores (SendGrid Event Webhook y status
+callbacks de Twilio).
+
+Los webhooks solo verifican la firma, traducen los eventos y los guardan
+en la bandeja billing_delivery_events (un INSERT por request) antes de
+responder: un evento confirmado al proveedor nunca se pierde. Un thread
+vacía la bandeja cada billing_webhook_flush_seconds en lotes de
+billing_webhook_batch_size: combina los eventos de cada external_id y
+los aplica con un UPDATE masivo en la misma transacción que los saca de
+la bandeja. Un callback puede llegar antes que su log (el outbox escribe
+los logs al cerrar cada lote de envíos): esos eventos esperan en la
+bandeja hasta que el log exista, o billing_webhook_event_ttl_seconds. Miles de callbacks por minuto cuestan unos pocos UPDATE en
+vez de una transacción por evento sobre los logs.
+"""
+
+import os
+import threading
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+
+from sendgrid.helpers.eventwebhook import EventWebhook
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+from twilio.request_validator import RequestValidator
+
+from app.config import get_settings
+from app.database import SessionLocal
+from app.crud.billing_communication import crud_billing_communication
+from app.models.billing_communication import CommunicationStatus
+from app.metrics import registry
+
+settings = get_settings()
+
+DELIVERY_EVENTS_TOTAL = registry.counter(
+    "billing_delivery_events_total", "Eventos de entrega recibidos por webhook",
+    ["provider", "status"]
+)
+DELIVERY_LOGS_UPDATED_TOTAL = registry.counter(
+    "billing_delivery_logs_updated_total", "Logs de comunicación actualizados por eventos de entrega"
+)
+DELIVERY_EVENTS_EXPIRED_TOTAL = registry.counter(
+    "billing_delivery_events_expired_total", "Eventos de entrega descartados sin log tras billing_webhook_event_ttl_seconds"
+)
+
+# Evento de SendGrid -> estado del log (processed/deferred no cambian nada)
+SENDGRID_ESTADOS = {
+    "delivered": CommunicationStatus.DELIVERED,
+    "open": CommunicationStatus.READ,
+    "click": CommunicationStatus.READ,
+    "bounce": CommunicationStatus.BOUNCED,
+    "dropped": CommunicationStatus.FAILED,
+}
+
+# MessageStatus de Twilio -> estado del log (queued/sending/sent no cambian nada)
+TWILIO_ESTADOS = {
+    "delivered": CommunicationStatus.DELIVERED,
+    "read": CommunicationStatus.READ,
+    "undelivered": CommunicationStatus.FAILED,
+    "failed": CommunicationStatus.FAILED,
+}
+
+# Mismo orden que el UPDATE masivo: un mensaje solo avanza de estado
+_RANGO = {
+    CommunicationStatus.SENT: 0,
+    CommunicationStatus.DELIVERED: 1,
+    CommunicationStatus.READ: 2,
+}
+
+
+def _rango(evento: Dict) -> int:
+    return _RANGO.get(evento["status"], 3)
+
+
+def _combinar(actual: Optional[Dict], nuevo: Dict) -> Dict:
+    """Combina dos eventos del mismo mensaje: estado mayor, fechas más tempranas."""
+    if actual is None:
+        return nuevo
+
+    combinado = dict(actual if _rango(actual) >= _rango(nuevo) else nuevo)
+    for campo in ("delivered_at", "read_at"):
+        fechas = [f for f in (actual.get(campo), nuevo.get(campo)) if f]
+        combinado[campo] = min(fechas) if fechas else None
+    combinado["error_message"] = combinado.get("error_message") or actual.get("error_message") or nuevo.get("error_message")
+    return combinado
+
+
+def _evento(provider: str, external_id: str, status: str, fecha: datetime, error_message: Optional[str] = None) -> Dict:
+    """Evento normalizado (fila de billing_delivery_events)."""
+    return {
+        "provider": provider,
+        "external_id": external_id,
+        "status": status,
+        "delivered_at": fecha if status in (CommunicationStatus.DELIVERED, CommunicationStatus.READ) else None,
+        "read_at": fecha if status == CommunicationStatus.READ else None,
+        "error_message": error_message
+    }
+
+
+class DeliveryEventQueue:
+    """
+    Verificación de firmas de los webhooks + bandeja de eventos
+    (billing_delivery_events) que se aplica en lotes desde un thread de fondo.
+    """
+
+    def __init__(self):
+        """Inicializa verificadores con las llaves de los proveedores."""
+        self.twilio_auth_token = os.getenv("TWILIO_AUTH_TOKEN")
+
+        self.sendgrid_webhook = None
+        public_key = os.getenv("SENDGRID_WEBHOOK_PUBLIC_KEY")
+        if public_key:
+            try:
+                self.sendgrid_webhook = EventWebhook(public_key)
+            except Exception as e:
+                print(f"⚠️  Invalid SENDGRID_WEBHOOK_PUBLIC_KEY: {e}")
+
+        self._despertar = threading.Event()
+        self._detener = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    # ------------------------------------------------------------------
+    # Firmas
+    # ------------------------------------------------------------------
+
+    def verificar_sendgrid(self, body: bytes, signature: Optional[str], timestamp: Optional[str]) -> bool:
+        """Firma ECDSA del Event Webhook (headers X-Twilio-Email-Event-Webhook-*)."""
+        if self.sendgrid_webhook is None or not signature or not timestamp:
+            return False
+        try:
+            return self.sendgrid_webhook.verify_signature(body.decode("utf-8"), signature, timestamp)
+        except Exception:
+            return False
+
+    def verificar_twilio(self, url: str, params: Dict[str, str], signature: Optional[str]) -> bool:
+        """Firma HMAC del status callback (header X-Twilio-Signature) sobre la URL pública."""
+        if not self.twilio_auth_token or not signature:
+            return False
+        return RequestValidator(self.twilio_auth_token).validate(url, params, signature)
+
+    # ------------------------------------------------------------------
+    # Traducción de eventos
+    # ------------------------------------------------------------------
+
+    def desde_sendgrid(self, payload: List[Dict]) -> List[Dict]:
+        """
+        Eventos del Event Webhook que cambian el estado de un log. El
+        custom arg log_reference (external_id del log) viene en cada evento.
+        """
+        eventos = []
+        for evento in payload:
+            status = SENDGRID_ESTADOS.get(evento.get("event"))
+            external_id = evento.get("log_reference")
+            if status is None or not external_id:
+                continue
+
+            DELIVERY_EVENTS_TOTAL.inc(provider="sendgrid", status=status)
+            fecha = datetime.utcfromtimestamp(evento["timestamp"]) if evento.get("timestamp") else datetime.utcnow()
+            error = evento.get("reason") if status in (CommunicationStatus.BOUNCED, CommunicationStatus.FAILED) else None
+            eventos.append(_evento("sendgrid", str(external_id), status, fecha, error))
+        return eventos
+
+    def desde_twilio(self, params: Dict[str, str]) -> List[Dict]:
+        """Status callback de un mensaje (MessageSid = external_id del log)."""
+        status = TWILIO_ESTADOS.get(params.get("MessageStatus"))
+        external_id = params.get("MessageSid")
+        if status is None or not external_id:
+            return []
+
+        DELIVERY_EVENTS_TOTAL.inc(provider="twilio", status=status)
+        error = f"Twilio error {params['ErrorCode']}" if params.get("ErrorCode") else None
+        return [_evento("twilio", external_id, status, datetime.utcnow(), error)]
+
+    # ------------------------------------------------------------------
+    # Bandeja
+    # ------------------------------------------------------------------
+
+    async def encolar(self, db: AsyncSession, eventos: List[Dict]) -> int:
+        """Persiste los eventos en la bandeja (antes de responder al proveedor)."""
+        return await crud_billing_communication.enqueue_delivery_events_async(db, eventos)
+
+    def flush(self) -> int:
+        """
+        Vacía la bandeja en lotes de billing_webhook_batch_size, un lote por
+        transacción: si falla, el lote vuelve a la bandeja. Los eventos sin
+        log siguen en la bandeja hasta que aparezca o venza
+        billing_webhook_event_ttl_seconds. Retorna el número de logs
+        actualizados.
+        """
+        lote = max(1, settings.billing_webhook_batch_size)
+        actualizados = 0
+
+        db = SessionLocal()
+        try:
+            while True:
+                reclamados, n = self.aplicar_lote(db, lote)
+                db.commit()
+                actualizados += n
+                if reclamados < lote:
+                    break
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+
+        return actualizados
+
+    def aplicar_lote(self, db: Session, lote: int) -> Tuple[int, int]:
+        """
+        Saca de la bandeja un lote de eventos aplicables y los aplica (un
+        UPDATE, eventos combinados por external_id). No hace commit.
+
+        Returns:
+            (eventos sacados de la bandeja, logs actualizados)
+        """
+        expira_antes_de = datetime.utcnow() - timedelta(seconds=settings.billing_webhook_event_ttl_seconds)
+        eventos = crud_billing_communication.claim_delivery_events(db, lote, expira_antes_de)
+        if not eventos:
+            return 0, 0
+
+        combinados: Dict[str, Dict] = {}
+        vencidos = 0
+        for evento in eventos:
+            if not evento["con_log"]:
+                vencidos += 1
+                continue
+            external_id = evento["external_id"]
+            combinados[external_id] = _combinar(combinados.get(external_id), evento)
+
+        actualizados = crud_billing_communication.apply_delivery_events(db, list(combinados.values()), commit=False)
+        DELIVERY_LOGS_UPDATED_TOTAL.inc(actualizados)
+        if vencidos:
+            DELIVERY_EVENTS_EXPIRED_TOTAL.inc(vencidos)
+            print(f"⚠️  Dropped {vencidos} delivery events with no matching log")
+
+        return len(eventos), actualizados
+
+    def start(self):
+        """Inicia el thread que aplica la bandeja."""
+        if self._thread is None:
+            self._detener.clear()
+            self._thread = threading.Thread(target=self._loop, name="delivery-events", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        """Detiene el thread y aplica lo que quede en la bandeja."""
+        if self._thread is not None:
+            self._detener.set()
+            self._despertar.set()
+            self._thread.join(timeout=30)
+            self._thread = None
+        try:
+            self.flush()
+        except Exception as e:
+            print(f"⚠️  Error applying delivery events: {e}")
+
+    def _loop(self):
+        while not self._detener.is_set():
+            self._despertar.wait(settings.billing_webhook_flush_seconds)
+            self._despertar.clear()
+            try:
+                self.flush()
+            except Exception as e:
+                print(f"⚠️  Error applying delivery events: {e}")
+
+
+# Singleton instance
+delivery_events = DeliveryEventQueue()
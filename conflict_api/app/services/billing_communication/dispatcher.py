@@ -0,0 +1,101 @@
+"""
+Despacho concurrente de recordatorios (Email + SMS).
+
+Los SDKs de SendGrid y Twilio son bloqueantes, así que los envíos corren
+en un pool de threads acotado (billing_dispatch_workers). Cada proveedor
+tiene además su propio límite de envíos simultáneos y un rate limiter
+(token bucket), para que muchos envíos en vuelo no excedan las cuotas.
+
+Uso:
+    envios = [("email", lambda: ...), ("sms", lambda: ...)]
+    resultados = reminder_dispatcher.despachar(envios)
+"""
+
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Tuple
+
+from app.config import get_settings
+from app.metrics import registry
+from app.services.rate_limiter import RateLimiter
+
+settings = get_settings()
+
+DISPATCH_WAIT = registry.histogram(
+    "notification_dispatch_wait_seconds",
+    "Espera por cupo de concurrencia / rate limit antes de enviar (segundos)",
+    ["channel"],
+    buckets=(0.001, 0.01, 0.05, 0.1, 0.5, 1, 5, 10, 30, 60)
+)
+DISPATCH_IN_FLIGHT = registry.gauge(
+    "notification_dispatch_in_flight", "Envíos en curso por canal", ["channel"]
+)
+
+# Envío pendiente: (canal, función que envía y retorna el resultado)
+Envio = Tuple[str, Callable[[], Any]]
+
+
+class _LimitesCanal:
+    """Concurrencia máxima + rate limit de un proveedor."""
+
+    def __init__(self, max_concurrencia: int, rate_por_segundo: float):
+        self.semaforo = threading.BoundedSemaphore(max(1, max_concurrencia))
+        self.rate_limiter = RateLimiter(rate_por_segundo)
+
+
+class ReminderDispatcher:
+    """
+    Ejecuta envíos en paralelo respetando los límites de cada canal.
+    Los límites (semáforo y token bucket) son del proceso: se comparten
+    entre corridas del scheduler y envíos manuales.
+    """
+
+    def __init__(self):
+        self.canales: Dict[str, _LimitesCanal] = {
+            "email": _LimitesCanal(
+                settings.billing_email_max_concurrency, settings.billing_email_rate_per_second
+            ),
+            # El rate limit de SMS (MPS del número emisor) lo aplica
+            # twilio_sms_service por mensaje; aquí solo la concurrencia
+            "sms": _LimitesCanal(settings.billing_sms_max_concurrency, 0),
+        }
+
+    def _ejecutar(self, canal: str, enviar: Callable[[], Any]) -> Any:
+        limites = self.canales[canal]
+
+        inicio = time.perf_counter()
+        with limites.semaforo:
+            limites.rate_limiter.acquire()
+            DISPATCH_WAIT.observe(time.perf_counter() - inicio, channel=canal)
+
+            DISPATCH_IN_FLIGHT.inc(channel=canal)
+            try:
+                return enviar()
+            finally:
+                DISPATCH_IN_FLIGHT.dec(channel=canal)
+
+    def despachar(self, envios: List[Envio]) -> List[Any]:
+        """
+        Ejecuta los envíos en el pool y retorna sus resultados en el mismo
+        orden. Un envío que lanza excepción retorna None.
+        """
+        if not envios:
+            return []
+
+        workers = min(settings.billing_dispatch_workers, len(envios))
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="reminder-dispatch") as pool:
+            futuros = [pool.submit(self._ejecutar, canal, enviar) for canal, enviar in envios]
+
+            resultados = []
+            for (canal, _enviar), futuro in zip(envios, futuros):
+                try:
+                    resultados.append(futuro.result())
+                except Exception as e:
+                    print(f"⚠️  {canal} dispatch failed: {e}")
+                    resultados.append(None)
+            return resultados
+
+
+# Singleton instance
+reminder_dispatcher = ReminderDispatcher()
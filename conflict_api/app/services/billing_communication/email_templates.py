@@ -0,0 +1,119 @@
+"""
+Registro de plantillas de email de cobro (Jinja2).
+
+Las plantillas (app/templates/email) se compilan una sola vez al crear el
+registro. Por bufete y nivel se renderiza una sola vez la plantilla con
+el branding del bufete (Perfil / Firma) y los campos de la factura como
+tags de sustitución (-client_name-, -amount_due-, ...); el resultado se
+guarda en cache y SendGrid reemplaza los tags por destinatario.
+
+Un bufete puede sobrescribir cualquier plantilla creando
+app/templates/email/firmas/<firma_id>/<plantilla>.html.
+"""
+
+import os
+from functools import lru_cache
+from typing import Dict, Iterable, NamedTuple, Optional, Tuple
+
+from jinja2 import Environment, FileSystemLoader, select_autoescape
+from sqlalchemy.orm import Session
+
+from app.config import get_settings
+from app.models.firma import Firma
+from app.models.perfil import Perfil
+
+settings = get_settings()
+
+TEMPLATES_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), "templates", "email")
+
+# Plantilla y asunto por nivel de recordatorio (4 = danger zone)
+PLANTILLAS = {
+    1: ("recordatorio_1.html", "Recordatorio de Pago - Factura #{invoice_number}"),
+    2: ("recordatorio_2.html", "URGENTE: Pago Vencido - Factura #{invoice_number}"),
+    3: ("recordatorio_3.html", "ÚLTIMA NOTIFICACIÓN: Factura #{invoice_number} - Acción Inminente"),
+    4: ("zona_peligro.html", "Cuenta Crítica - Factura #{invoice_number}"),
+}
+
+# Tags de sustitución de los campos por factura
+TEMPLATE_TAGS = {
+    "client_name": "-client_name-",
+    "invoice_number": "-invoice_number-",
+    "amount_due": "-amount_due-",
+    "days_overdue": "-days_overdue-",
+    "due_date": "-due_date-",
+}
+
+
+class BrandingFirma(NamedTuple):
+    """Datos del bufete usados en las plantillas (hashable: llave del cache)."""
+    firma_id: Optional[int] = None
+    nombre: str = "Professional Hubs"
+    email: str = os.getenv("SENDGRID_FROM_EMAIL", "billing@professionalhubs.com")
+    telefono: Optional[str] = None
+    direccion: Optional[str] = None
+    logo_url: Optional[str] = None
+
+
+class EmailTemplateRegistry:
+    """
+    Plantillas compiladas + cache de renders por (nivel, branding).
+    Un cambio en el Perfil produce otro BrandingFirma, y por lo tanto
+    otra entrada del cache, sin recompilar las plantillas.
+    """
+
+    def __init__(self, directorio: str = TEMPLATES_DIR):
+        self.env = Environment(
+            loader=FileSystemLoader(directorio),
+            autoescape=select_autoescape(["html"]),
+            auto_reload=False,
+            cache_size=-1  # Nunca descartar plantillas compiladas
+        )
+        # Compilar todas las plantillas base al iniciar
+        for nombre, _asunto in PLANTILLAS.values():
+            self.env.get_template(nombre)
+
+        self._renderizar_cache = lru_cache(maxsize=settings.email_template_cache_size)(self._renderizar)
+
+    def obtener(self, reminder_level: int, branding: Optional[BrandingFirma] = None) -> Tuple[str, str]:
+        """
+        (subject, body) del nivel para el bufete, con los campos de la
+        factura como tags de sustitución.
+        """
+        return self._renderizar_cache(reminder_level if reminder_level in PLANTILLAS else 4, branding or BrandingFirma())
+
+    def _renderizar(self, reminder_level: int, branding: BrandingFirma) -> Tuple[str, str]:
+        nombre, asunto = PLANTILLAS[reminder_level]
+
+        candidatas = [nombre]
+        if branding.firma_id is not None:
+            candidatas.insert(0, f"firmas/{branding.firma_id}/{nombre}")
+
+        body = self.env.select_template(candidatas).render(firma=branding, **TEMPLATE_TAGS)
+        return asunto.format(**TEMPLATE_TAGS), body
+
+    def cargar_brandings(self, db: Session, firm_ids: Iterable[int]) -> Dict[int, BrandingFirma]:
+        """Branding de varios bufetes en una sola query (Firma + Perfil)."""
+        ids = set(firm_ids)
+        if not ids:
+            return {}
+
+        filas = db.query(Firma, Perfil).outerjoin(
+            Perfil, Perfil.firma_id == Firma.id
+        ).filter(Firma.id.in_(ids)).all()
+
+        defecto = BrandingFirma()
+        return {
+            firma.id: BrandingFirma(
+                firma_id=firma.id,
+                nombre=firma.nombre or defecto.nombre,
+                email=defecto.email,
+                telefono=(perfil.telefono if perfil else None) or firma.telefono,
+                direccion=(perfil.direccion if perfil else None) or firma.direccion,
+                logo_url=perfil.logo_empresa_url if perfil else None
+            )
+            for firma, perfil in filas
+        }
+
+
+# Singleton instance
+email_templates = EmailTemplateRegistry()
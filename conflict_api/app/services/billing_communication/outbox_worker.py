@@ -0,0 +1,246 @@
+"""
+Worker del outbox de envíos de cobro.
+
+El scheduler solo planifica: escribe en billing_outbox una intención por
+canal y factura. Este worker reclama lotes (FOR UPDATE SKIP LOCKED, así
+que pueden correr varios en paralelo, en este proceso o en otros), envía
+con reminder_dispatcher y registra el resultado:
+- éxito: fila SENT + log de comunicación SENT
+- error: reintento con backoff exponencial (billing_outbox_backoff_seconds
+  * 2^(intento-1)); al agotar billing_outbox_max_attempts, fila FAILED +
+  log FAILED
+- error permanente (p. ej. destinatario rechazado con 4xx): fila FAILED +
+  log FAILED sin reintentos
+
+Si un worker muere a mitad de un lote, sus filas quedan PROCESSING hasta
+que vence el lease y otro worker las vuelve a reclamar (entrega "al menos
+una vez").
+
+Los envíos respetan la ventana de su bufete (ventanas_envio): una fila
+reclamada fuera de ventana (p. ej. un worker atrasado) se devuelve a la
+cola para la próxima apertura sin contar como intento, y los reintentos
+que caerían fuera de ventana se mueven a la próxima apertura.
+"""
+
+from datetime import datetime, timedelta
+from functools import partial
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlalchemy.orm import Session
+
+from app.config import get_settings
+from app.crud.billing_outbox import crud_billing_outbox
+from app.models.billing_communication import CommunicationType, CommunicationStatus, OutboxStatus
+from app.services.billing_communication.sendgrid_service import sendgrid_service
+from app.services.billing_communication.dispatcher import reminder_dispatcher, Envio
+from app.services.billing_communication.email_templates import email_templates, BrandingFirma
+from app.services.billing_communication.ventanas_envio import ventanas_envio, VentanaEnvio
+from app.services.twilio_sms_service import twilio_sms_service
+from app.metrics import registry
+
+settings = get_settings()
+
+OUTBOX_PROCESSED_TOTAL = registry.counter(
+    "billing_outbox_processed_total", "Envíos del outbox procesados por canal y resultado",
+    ["channel", "result"]
+)
+
+# Resultado normalizado de un envío:
+# (id de la fila del outbox, éxito, external_id, error, reintentable)
+ResultadoEnvio = Tuple[int, bool, Optional[str], Optional[str], bool]
+
+
+class BillingOutboxWorker:
+    """
+    Procesa el outbox por lotes: reclamar, enviar, registrar.
+    """
+    
+    def procesar_pendientes(self, db: Session) -> int:
+        """
+        Procesa lotes hasta vaciar los envíos listos. Retorna el número
+        de filas procesadas.
+        """
+        total = 0
+        while True:
+            procesadas = self.procesar_lote(db)
+            total += procesadas
+            if procesadas < settings.billing_outbox_batch_size:
+                return total
+    
+    def procesar_lote(self, db: Session) -> int:
+        """Reclama, envía y registra un lote. Retorna las filas procesadas."""
+        filas = crud_billing_outbox.claim(
+            db, settings.billing_outbox_batch_size, settings.billing_outbox_lease_seconds
+        )
+        if not filas:
+            return 0
+        
+        ventanas = ventanas_envio.cargar(db, {fila["payload"].get("firma_id") for fila in filas})
+        ahora = datetime.utcnow()
+        
+        # Fuera de la ventana del bufete: de vuelta a la cola, sin gastar intento
+        diferidas: List[Dict[str, Any]] = []
+        listas: List[Dict[str, Any]] = []
+        for fila in filas:
+            ventana = ventanas.get(fila["payload"].get("firma_id"))
+            apertura = ventana.ajustar(ahora) if ventana else ahora
+            if apertura > ahora:
+                diferidas.append({
+                    "id": fila["id"],
+                    "status": OutboxStatus.PENDING,
+                    "next_attempt_at": apertura,
+                    "attempts": fila["attempts"] - 1
+                })
+            else:
+                listas.append(fila)
+        
+        resultados: Dict[int, ResultadoEnvio] = {}
+        for resultado in reminder_dispatcher.despachar(self._envios(db, listas)):
+            for fila_resultado in resultado or []:
+                resultados[fila_resultado[0]] = fila_resultado
+        
+        actualizaciones, logs = self._resultados(listas, resultados, ventanas)
+        crud_billing_outbox.finalizar(db, diferidas + actualizaciones, logs)
+        
+        enviados = sum(1 for fila in actualizaciones if fila["status"] == OutboxStatus.SENT)
+        print(f"   Outbox: {enviados}/{len(listas)} sends completed, {len(diferidas)} deferred to their send window")
+        return len(filas)
+    
+    def _envios(self, db: Session, filas: List[Dict[str, Any]]) -> List[Envio]:
+        """
+        Envíos del lote para despachar en paralelo: los emails de un mismo
+        bufete y nivel en un solo batch de SendGrid; los SMS en un batch de
+        Twilio. Cada envío retorna la lista de ResultadoEnvio de sus filas.
+        """
+        sends: List[Envio] = []
+        emails_por_grupo: Dict[Tuple[int, int], List[Dict[str, Any]]] = {}
+        sms: List[Dict[str, Any]] = []
+        
+        for fila in filas:
+            if fila["channel"] == CommunicationType.EMAIL:
+                grupo = (fila["payload"].get("firma_id"), fila["reminder_level"])
+                emails_por_grupo.setdefault(grupo, []).append(fila)
+            else:
+                sms.append(fila)
+        
+        brandings = email_templates.cargar_brandings(
+            db, {firma_id for firma_id, _level in emails_por_grupo if firma_id is not None}
+        )
+        for (firma_id, reminder_level), grupo in emails_por_grupo.items():
+            sends.append(("email", partial(self._enviar_emails, grupo, reminder_level, brandings.get(firma_id))))
+        if sms:
+            sends.append(("sms", partial(self._enviar_sms, sms)))
+        
+        return sends
+    
+    def _enviar_emails(
+        self,
+        filas: List[Dict[str, Any]],
+        reminder_level: int,
+        branding: Optional[BrandingFirma] = None
+    ) -> List[ResultadoEnvio]:
+        payloads = [fila["payload"] for fila in filas]
+        results = sendgrid_service.send_payment_reminders_batch([
+            {
+                "to_email": payload["to_email"],
+                "client_name": payload["client_name"],
+                "invoice_number": payload["invoice_number"],
+                "amount_due": payload["amount_due"],
+                "days_overdue": payload["days_overdue"],
+                "due_date": payload["due_date"],
+                "reminder_level": reminder_level,
+                "branding": branding
+            }
+            for payload in payloads
+        ])
+        # external_id = custom arg log_reference del mensaje
+        return [
+            (fila["id"], bool(r.get("success")), r.get("reference"), r.get("error"), r.get("retryable", True))
+            for fila, r in zip(filas, results)
+        ]
+    
+    def _enviar_sms(self, filas: List[Dict[str, Any]]) -> List[ResultadoEnvio]:
+        results = twilio_sms_service.send_payment_reminders_sms_batch([
+            {
+                "to_phone": fila["payload"]["to_phone"],
+                "client_name": fila["payload"]["client_name"],
+                "invoice_number": fila["payload"]["invoice_number"],
+                "amount_due": fila["payload"]["amount_due"],
+                "days_overdue": fila["payload"]["days_overdue"],
+                "reminder_level": fila["reminder_level"]
+            }
+            for fila in filas
+        ])
+        return [
+            (fila["id"], bool(r.get("success")), r.get("message_sid"), r.get("error"), r.get("retryable", True))
+            for fila, r in zip(filas, results)
+        ]
+    
+    def _resultados(
+        self,
+        filas: List[Dict[str, Any]],
+        resultados: Dict[int, ResultadoEnvio],
+        ventanas: Dict[int, VentanaEnvio]
+    ) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+        """
+        Actualizaciones del outbox y logs de comunicación del lote. Un
+        envío sin resultado (el despacho lanzó excepción) cuenta como error.
+        """
+        ahora = datetime.utcnow()
+        actualizaciones: List[Dict[str, Any]] = []
+        logs: List[Dict[str, Any]] = []
+        
+        for fila in filas:
+            _id, success, external_id, error, reintentable = resultados.get(
+                fila["id"], (fila["id"], False, None, "dispatch failed", True)
+            )
+            reminder_level = fila["reminder_level"]
+            invoice_number = fila["payload"]["invoice_number"]
+            es_email = fila["channel"] == CommunicationType.EMAIL
+            
+            log = {
+                "invoice_id": fila["invoice_id"],
+                "type": fila["channel"],
+                "message_body": f"Payment reminder level {reminder_level}" if es_email else f"SMS reminder level {reminder_level}",
+                "days_overdue_when_sent": fila["days_overdue"],
+                "reminder_sequence": reminder_level
+            }
+            
+            if success:
+                actualizaciones.append({"id": fila["id"], "status": OutboxStatus.SENT, "external_id": external_id, "last_error": None})
+                log.update({"status": CommunicationStatus.SENT, "external_id": external_id})
+                if es_email:
+                    log["subject"] = f"Payment Reminder - Invoice #{invoice_number}"
+                logs.append(log)
+                OUTBOX_PROCESSED_TOTAL.inc(channel=fila["channel"], result="sent")
+            
+            elif reintentable and fila["attempts"] < settings.billing_outbox_max_attempts:
+                espera = settings.billing_outbox_backoff_seconds * (2 ** (fila["attempts"] - 1))
+                reintento = ahora + timedelta(seconds=espera)
+                ventana = ventanas.get(fila["payload"].get("firma_id"))
+                if ventana:
+                    reintento = ventana.ajustar(reintento)
+                print(f"      ✗ {fila['channel']} failed (#{invoice_number}), retry at {reintento:%Y-%m-%d %H:%M} UTC: {error}")
+                actualizaciones.append({
+                    "id": fila["id"],
+                    "status": OutboxStatus.PENDING,
+                    "next_attempt_at": reintento,
+                    "last_error": error
+                })
+                OUTBOX_PROCESSED_TOTAL.inc(channel=fila["channel"], result="retry")
+            
+            else:
+                if reintentable:
+                    print(f"      ✗ {fila['channel']} failed (#{invoice_number}) after {fila['attempts']} attempts: {error}")
+                else:
+                    print(f"      ✗ {fila['channel']} failed (#{invoice_number}), not retryable: {error}")
+                actualizaciones.append({"id": fila["id"], "status": OutboxStatus.FAILED, "last_error": error})
+                log.update({"status": CommunicationStatus.FAILED, "error_message": error})
+                logs.append(log)
+                OUTBOX_PROCESSED_TOTAL.inc(channel=fila["channel"], result="failed")
+        
+        return actualizaciones, logs
+
+
+# Singleton instance
+billing_outbox_worker = BillingOutboxWorker()
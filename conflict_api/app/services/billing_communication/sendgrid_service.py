@@ -1,13 +1,66 @@
 """
 Servicio de Email usando SendGrid para recordatorios de facturación.
+
+Los recordatorios del mismo nivel se envían en lote: un solo request a
+/v3/mail/send con una personalization por destinatario (sustituciones
+con sus datos y un custom arg log_reference que identifica el mensaje en
+los logs y en los eventos del webhook de SendGrid). Los requests usan
+una sesión HTTP persistente (keep-alive).
+
+SendGrid rechaza el request completo (400) por un solo destinatario
+inválido: las direcciones se validan antes de armar los lotes, y un lote
+rechazado se divide en mitades hasta aislar las filas malas. Los errores
+4xx de un destinatario son permanentes (retryable = False): el outbox no
+los reintenta.
 """
 
+import html
 import os
-from typing import Optional, Dict
-from sendgrid import SendGridAPIClient
-from sendgrid.helpers.mail import Mail, Email, To, Content
+import re
+import time
+import uuid
+from typing import Optional, Dict, List, Tuple
+import requests
+from requests.adapters import HTTPAdapter
+from sendgrid.helpers.mail import Mail, Email, To, Content, Personalization, Substitution, CustomArg
 from datetime import datetime
 
+from app.config import get_settings
+from app.metrics import registry
+from app.services.billing_communication.email_templates import email_templates, BrandingFirma, TEMPLATE_TAGS
+from app.services.provider_backends import montar_backend
+
+settings = get_settings()
+
+NOTIFICATION_SEND_DURATION = registry.histogram(
+    "notification_send_duration_seconds", "Latencia de envío a proveedores de email/SMS (segundos)",
+    ["channel", "status"]
+)
+
+SENDGRID_MAIL_SEND_URL = "https://api.sendgrid.com/v3/mail/send"
+
+# Máximo de personalizations por request según SendGrid
+SENDGRID_MAX_PERSONALIZATIONS = 1000
+
+# Validación sintáctica de destinatarios (lo que SendGrid rechaza con 400)
+EMAIL_VALIDO = re.compile(r"^[^@\s<>(),;:\"\[\]]+@[^@\s<>(),;:\"\[\]]+\.[A-Za-z]{2,}$")
+
+# Rechazo del request por su contenido: dividir el lote aísla las filas malas
+SENDGRID_ERRORES_DE_CONTENIDO = (400, 413)
+
+
+def email_valido(email: Optional[str]) -> bool:
+    """True si la dirección tiene forma válida para SendGrid."""
+    return bool(email) and len(email) <= 254 and EMAIL_VALIDO.match(email.strip()) is not None
+
+
+def error_reintentable(status_code: int) -> bool:
+    """
+    Los 4xx son permanentes para el mensaje, salvo 429 (throttling) y
+    401/403 (credenciales del servicio, no del destinatario).
+    """
+    return not 400 <= status_code < 500 or status_code in (401, 403, 429)
+
 
 class SendGridEmailService:
     """
@@ -18,10 +71,33 @@ class SendGridEmailService:
         """Inicializa servicio de SendGrid."""
         self.api_key = os.getenv("SENDGRID_API_KEY")
         self.from_email = os.getenv("SENDGRID_FROM_EMAIL", "billing@professionalhubs.com")
+        self._session: Optional[requests.Session] = None
         
-        if not self.api_key:
+        # Backend local (sink / mock): no requiere credenciales reales
+        self.backend = settings.email_backend
+        if self.backend != "real":
+            self.api_key = self.api_key or self.backend
+            print(f"SendGrid backend: {self.backend}")
+        elif not self.api_key:
             print("⚠️  SENDGRID_API_KEY not configured - email features disabled")
     
+    @property
+    def session(self) -> requests.Session:
+        """Sesión HTTP persistente, compartida entre threads de envío."""
+        if self._session is None:
+            session = requests.Session()
+            session.headers.update({
+                "Authorization": f"Bearer {self.api_key}",
+                "Content-Type": "application/json"
+            })
+            session.mount("https://", HTTPAdapter(
+                pool_connections=1,
+                pool_maxsize=max(1, settings.billing_email_max_concurrency)
+            ))
+            montar_backend(session, self.backend, settings.billing_email_max_concurrency)
+            self._session = session
+        return self._session
+    
     def send_payment_reminder(
         self,
         to_email: str,
@@ -30,7 +106,8 @@ class SendGridEmailService:
         amount_due: float,
         days_overdue: int,
         due_date: str,
-        reminder_level: int = 1
+        reminder_level: int = 1,
+        branding: Optional[BrandingFirma] = None
     ) -> Dict:
         """
         Envía recordatorio de pago por email.
@@ -43,283 +120,150 @@ class SendGridEmailService:
             days_overdue: Días de atraso
             due_date: Fecha de vencimiento
             reminder_level: Nivel de recordatorio (1=primer aviso, 2=segundo, etc.)
+            branding: Branding del bufete (None = Professional Hubs)
         
         Returns:
             Dict con resultado del envío
         """
+        return self.send_payment_reminders_batch([{
+            "to_email": to_email,
+            "client_name": client_name,
+            "invoice_number": invoice_number,
+            "amount_due": amount_due,
+            "days_overdue": days_overdue,
+            "due_date": due_date,
+            "reminder_level": reminder_level,
+            "branding": branding
+        }])[0]
+    
+    def send_payment_reminders_batch(self, reminders: List[Dict]) -> List[Dict]:
+        """
+        Envía varios recordatorios agrupando por nivel y bufete (misma
+        plantilla renderizada) en requests de hasta sendgrid_batch_size
+        destinatarios.
+        
+        Args:
+            reminders: Dicts con los argumentos de send_payment_reminder
+                (branding opcional)
+        
+        Returns:
+            Un resultado por recordatorio, en el mismo orden. Cada resultado
+            exitoso trae message_id (X-Message-Id del request) y reference
+            (log_reference del mensaje individual); cada error trae
+            retryable (False = no reintentar).
+        """
         if not self.api_key:
-            return {"success": False, "error": "SendGrid not configured"}
+            return [{"success": False, "error": "SendGrid not configured"} for _ in reminders]
         
-        # Seleccionar plantilla según nivel de recordatorio
-        if reminder_level == 1:
-            subject, body = self._get_first_reminder_template(
-                client_name, invoice_number, amount_due, days_overdue, due_date
-            )
-        elif reminder_level == 2:
-            subject, body = self._get_second_reminder_template(
-                client_name, invoice_number, amount_due, days_overdue, due_date
-            )
-        elif reminder_level == 3:
-            subject, body = self._get_final_reminder_template(
-                client_name, invoice_number, amount_due, days_overdue, due_date
-            )
-        else:
-            subject, body = self._get_danger_zone_template(
-                client_name, invoice_number, amount_due, days_overdue, due_date
-            )
+        results: List[Optional[Dict]] = [None] * len(reminders)
+        batch_size = max(1, min(settings.sendgrid_batch_size, SENDGRID_MAX_PERSONALIZATIONS))
         
-        try:
-            # Crear mensaje
-            message = Mail(
-                from_email=Email(self.from_email),
-                to_emails=To(to_email),
-                subject=subject,
-                html_content=Content("text/html", body)
-            )
-            
-            # Enviar
-            sg = SendGridAPIClient(self.api_key)
-            response = sg.send(message)
-            
-            if response.status_code in [200, 201, 202]:
-                return {
-                    "success": True,
-                    "message_id": response.headers.get('X-Message-Id'),
-                    "status_code": response.status_code
-                }
-            else:
-                return {
+        grupos: Dict[Tuple[int, Optional[BrandingFirma]], List[int]] = {}
+        for i, reminder in enumerate(reminders):
+            if not email_valido(reminder.get("to_email")):
+                results[i] = {
                     "success": False,
-                    "error": f"SendGrid API error: {response.status_code}",
-                    "details": response.body
+                    "error": f"Invalid recipient email: {reminder.get('to_email')!r}",
+                    "retryable": False
                 }
+                continue
+            llave = (reminder.get("reminder_level", 1), reminder.get("branding"))
+            grupos.setdefault(llave, []).append(i)
         
-        except Exception as e:
-            return {
-                "success": False,
-                "error": f"Failed to send email: {str(e)}"
-            }
-    
-    def _get_first_reminder_template(
-        self, client_name, invoice_number, amount_due, days_overdue, due_date
-    ) -> tuple:
-        """Primera notificación amistosa (15 días)."""
-        subject = f"Recordatorio de Pago - Factura #{invoice_number}"
+        for (reminder_level, branding), indices in grupos.items():
+            subject, body = email_templates.obtener(reminder_level, branding)
+            for inicio in range(0, len(indices), batch_size):
+                lote = indices[inicio:inicio + batch_size]
+                batch = [reminders[i] for i in lote]
+                for i, result in zip(lote, self._send_batch(subject, body, batch)):
+                    results[i] = result
         
-        body = f"""
-<!DOCTYPE html>
-<html>
-<head>
-    <style>
-        body {{ font-family: Arial, sans-serif; line-height: 1.6; color: #333; }}
-        .container {{ max-width: 600px; margin: 0 auto; padding: 20px; }}
-        .header {{ background: #667eea; color: white; padding: 20px; border-radius: 8px 8px 0 0; }}
-        .content {{ background: #f9f9f9; padding: 20px; }}
-        .amount {{ font-size: 24px; font-weight: bold; color: #667eea; }}
-        .button {{ display: inline-block; background: #667eea; color: white; 
-                   padding: 12px 24px; text-decoration: none; border-radius: 5px; margin: 20px 0; }}
-    </style>
-</head>
-<body>
-    <div class="container">
-        <div class="header">
-            <h1>Recordatorio de Pago</h1>
-        </div>
-        <div class="content">
-            <p>Estimado(a) {client_name},</p>
-            
-            <p>Este es un recordatorio amistoso de que su factura está pendiente de pago.</p>
-            
-            <div style="background: white; padding: 15px; margin: 20px 0; border-left: 4px solid #667eea;">
-                <p><strong>Factura:</strong> #{invoice_number}</p>
-                <p><strong>Monto:</strong> <span class="amount">${amount_due:,.2f}</span></p>
-                <p><strong>Fecha de Vencimiento:</strong> {due_date}</p>
-                <p><strong>Días de Atraso:</strong> {days_overdue} días</p>
-            </div>
-            
-            <p>Para evitar cargos adicionales y mantener su cuenta al día, le solicitamos procesar el pago lo antes posible.</p>
-            
-            <p><strong>Opciones de Pago:</strong></p>
-            <ul>
-                <li>Transferencia bancaria (detalles al final)</li>
-                <li>Cheque a nombre de Professional Hubs</li>
-                <li>ATH Móvil: [NÚMERO]</li>
-            </ul>
-            
-            <p>Si ya realizó el pago, por favor ignore este mensaje y acepte nuestras disculpas por el inconveniente.</p>
-            
-            <p>Si tiene alguna pregunta o necesita hacer arreglos de pago, no dude en contactarnos.</p>
-            
-            <p>Cordialmente,<br>
-            <strong>Professional Hubs</strong><br>
-            Departamento de Facturación</p>
-            
-            <hr>
-            <p style="font-size: 12px; color: #666;">
-                <strong>Información Bancaria:</strong><br>
-                Banco: [BANCO]<br>
-                Cuenta: [NÚMERO]<br>
-                Routing: [ROUTING]
-            </p>
-        </div>
-    </div>
-</body>
-</html>
-"""
-        return subject, body
+        return results
     
-    def _get_second_reminder_template(
-        self, client_name, invoice_number, amount_due, days_overdue, due_date
-    ) -> tuple:
-        """Segunda notificación más firme (30 días)."""
-        subject = f"URGENTE: Pago Vencido - Factura #{invoice_number}"
+    def _send_batch(
+        self,
+        subject: str,
+        body: str,
+        reminders: List[Dict],
+        references: Optional[List[str]] = None
+    ) -> List[Dict]:
+        """
+        Un request /mail/send con una personalization por recordatorio.
+        Si SendGrid rechaza el contenido del request (400 / 413) no se
+        envió nada: el lote se reenvía en dos mitades, recursivamente,
+        hasta que solo fallan las filas rechazadas.
+        """
+        references = references or [uuid.uuid4().hex for _ in reminders]
+        message = Mail(
+            from_email=Email(self.from_email),
+            subject=subject,
+            html_content=Content("text/html", body)
+        )
         
-        body = f"""
-<!DOCTYPE html>
-<html>
-<head>
-    <style>
-        body {{ font-family: Arial, sans-serif; line-height: 1.6; color: #333; }}
-        .container {{ max-width: 600px; margin: 0 auto; padding: 20px; }}
-        .header {{ background: #d69e2e; color: white; padding: 20px; border-radius: 8px 8px 0 0; }}
-        .content {{ background: #f9f9f9; padding: 20px; }}
-        .amount {{ font-size: 24px; font-weight: bold; color: #d69e2e; }}
-        .warning {{ background: #fefcbf; border-left: 4px solid #d69e2e; padding: 15px; margin: 20px 0; }}
-    </style>
-</head>
-<body>
-    <div class="container">
-        <div class="header">
-            <h1>Segundo Recordatorio de Pago</h1>
-        </div>
-        <div class="content">
-            <p>Estimado(a) {client_name},</p>
-            
-            <p>Nuestros registros indican que aún no hemos recibido el pago de la siguiente factura:</p>
-            
-            <div class="warning">
-                <p><strong>Factura:</strong> #{invoice_number}</p>
-                <p><strong>Monto:</strong> <span class="amount">${amount_due:,.2f}</span></p>
-                <p><strong>Vencida hace:</strong> {days_overdue} días</p>
-                <p><strong>Fecha Original:</strong> {due_date}</p>
-            </div>
-            
-            <p><strong>Es importante que atienda este asunto de inmediato.</strong></p>
-            
-            <p>Si no recibimos el pago o una comunicación de su parte en los próximos 15 días, nos veremos obligados a:</p>
-            <ul>
-                <li>Aplicar cargos por mora según nuestros términos de servicio</li>
-                <li>Suspender servicios adicionales hasta regularizar su cuenta</li>
-                <li>Iniciar proceso de cobro formal</li>
-            </ul>
-            
-            <p>Entendemos que pueden surgir circunstancias imprevistas. Si necesita establecer un plan de pago o discutir su situación, por favor contáctenos de inmediato.</p>
-            
-            <p><strong>Contacto Directo:</strong><br>
-            Email: billing@professionalhubs.com<br>
-            Teléfono: [NÚMERO]</p>
-            
-            <p>Cordialmente,<br>
-            <strong>Professional Hubs</strong><br>
-            Departamento de Facturación</p>
-        </div>
-    </div>
-</body>
-</html>
-"""
-        return subject, body
-    
-    def _get_final_reminder_template(
-        self, client_name, invoice_number, amount_due, days_overdue, due_date
-    ) -> tuple:
-        """Última advertencia antes de acción legal (45 días)."""
-        subject = f"ÚLTIMA NOTIFICACIÓN: Factura #{invoice_number} - Acción Inminente"
+        for reminder, reference in zip(reminders, references):
+            personalization = Personalization()
+            personalization.add_to(To(reminder["to_email"]))
+            valores = {
+                "client_name": reminder["client_name"],
+                "invoice_number": reminder["invoice_number"],
+                "amount_due": f"{float(reminder['amount_due']):,.2f}",
+                "days_overdue": str(reminder["days_overdue"]),
+                "due_date": reminder["due_date"],
+            }
+            for campo, tag in TEMPLATE_TAGS.items():
+                # Las sustituciones van al HTML sin escapar (la plantilla ya está renderizada)
+                personalization.add_substitution(Substitution(tag, html.escape(str(valores[campo] or ""), quote=False)))
+            personalization.add_custom_arg(CustomArg("log_reference", reference))
+            message.add_personalization(personalization)
         
-        body = f"""
-<!DOCTYPE html>
-<html>
-<head>
-    <style>
-        body {{ font-family: Arial, sans-serif; line-height: 1.6; color: #333; }}
-        .container {{ max-width: 600px; margin: 0 auto; padding: 20px; }}
-        .header {{ background: #e53e3e; color: white; padding: 20px; border-radius: 8px 8px 0 0; }}
-        .content {{ background: #f9f9f9; padding: 20px; }}
-        .amount {{ font-size: 28px; font-weight: bold; color: #e53e3e; }}
-        .critical {{ background: #fed7d7; border-left: 4px solid #e53e3e; padding: 15px; margin: 20px 0; }}
-    </style>
-</head>
-<body>
-    <div class="container">
-        <div class="header">
-            <h1>ÚLTIMA ADVERTENCIA</h1>
-        </div>
-        <div class="content">
-            <p>Estimado(a) {client_name},</p>
-            
-            <p><strong>Esta es nuestra última comunicación antes de proceder con acciones legales.</strong></p>
-            
-            <div class="critical">
-                <p><strong>Factura:</strong> #{invoice_number}</p>
-                <p><strong>Monto Total Adeudado:</strong> <span class="amount">${amount_due:,.2f}</span></p>
-                <p><strong>Días de Atraso:</strong> {days_overdue} días</p>
-            </div>
-            
-            <p>A pesar de nuestras múltiples comunicaciones, su cuenta permanece sin pagar. Lamentablemente, nos vemos obligados a tomar las siguientes medidas:</p>
-            
-            <ol>
-                <li><strong>Plazo Final:</strong> 7 días calendario para regularizar el pago</li>
-                <li><strong>Después del plazo:</strong> Iniciaremos proceso de cobro judicial</li>
-                <li><strong>Costos adicionales:</strong> Usted será responsable de todos los costos legales y de cobranza</li>
-                <li><strong>Reporte crediticio:</strong> Su cuenta será reportada a las agencias de crédito</li>
-            </ol>
-            
-            <p style="color: #e53e3e; font-weight: bold;">ESTA ES SU ÚLTIMA OPORTUNIDAD DE RESOLVER ESTO AMIGABLEMENTE.</p>
-            
-            <p>Si hay circunstancias atenuantes que le han impedido realizar el pago, debe comunicarse con nosotros INMEDIATAMENTE.</p>
-            
-            <p><strong>Contacto Urgente:</strong><br>
-            Email: billing@professionalhubs.com<br>
-            Teléfono: [NÚMERO]<br>
-            Horario: Lunes a Viernes, 9:00 AM - 5:00 PM</p>
-            
-            <p>Cordialmente,<br>
-            <strong>Professional Hubs</strong><br>
-            Departamento Legal y de Cobranzas</p>
-            
-            <hr>
-            <p style="font-size: 11px; color: #666;">
-                Este mensaje constituye una notificación formal de cobro según las leyes de Puerto Rico.
-            </p>
-        </div>
-    </div>
-</body>
-</html>
-"""
-        return subject, body
-    
-    def _get_danger_zone_template(
-        self, client_name, invoice_number, amount_due, days_overdue, due_date
-    ) -> tuple:
-        """Notificación de zona de peligro (60+ días) - solo informativa."""
-        subject = f"Cuenta Crítica - Factura #{invoice_number}"
+        try:
+            inicio = time.perf_counter()
+            send_status = "error"
+            try:
+                response = self.session.post(
+                    SENDGRID_MAIL_SEND_URL,
+                    json=message.get(),
+                    timeout=settings.sendgrid_timeout_seconds
+                )
+                if response.status_code in [200, 201, 202]:
+                    send_status = "success"
+            finally:
+                NOTIFICATION_SEND_DURATION.observe(
+                    time.perf_counter() - inicio, channel="email", status=send_status
+                )
         
-        body = f"""
-<!DOCTYPE html>
-<html>
-<body style="font-family: Arial; padding: 20px;">
-    <h2 style="color: #e53e3e;">Estado de Cuenta Crítico</h2>
-    
-    <p>{client_name},</p>
-    
-    <p>Su factura #{invoice_number} por ${amount_due:,.2f} lleva {days_overdue} días vencida.</p>
-    
-    <p>Este mensaje es solo informativo. Nuestro departamento legal tomará las acciones apropiadas.</p>
-    
-    <p>Professional Hubs</p>
-</body>
-</html>
-"""
-        return subject, body
+        except Exception as e:
+            return [
+                {"success": False, "error": f"Failed to send email: {str(e)}", "retryable": True}
+                for _ in references
+            ]
+        
+        if response.status_code in [200, 201, 202]:
+            message_id = response.headers.get('X-Message-Id')
+            return [
+                {
+                    "success": True,
+                    "message_id": message_id,
+                    "reference": reference,
+                    "status_code": response.status_code
+                }
+                for reference in references
+            ]
+        
+        if response.status_code in SENDGRID_ERRORES_DE_CONTENIDO and len(reminders) > 1:
+            mitad = len(reminders) // 2
+            return (
+                self._send_batch(subject, body, reminders[:mitad], references[:mitad])
+                + self._send_batch(subject, body, reminders[mitad:], references[mitad:])
+            )
+        
+        error = {
+            "success": False,
+            "error": f"SendGrid API error: {response.status_code}",
+            "details": response.text,
+            "retryable": error_reintentable(response.status_code)
+        }
+        return [dict(error) for _ in references]
 
 
 # Singleton instance
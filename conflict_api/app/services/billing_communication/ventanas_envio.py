@@ -0,0 +1,133 @@
+"""
+Ventanas de envío de recordatorios por bufete.
+
+Cada bufete define en ventanas_cobro en qué horario local (zona horaria,
+días de la semana, feriados) se le pueden enviar recordatorios a sus
+clientes; los bufetes sin ventana usan billing_window_* de la config.
+
+La planificación diaria no envía: asigna a cada recordatorio un horario
+(next_attempt_at del outbox) repartido uniformemente en la ventana del
+bufete, con un desfase distinto por bufete. El tráfico del día sale como
+una cola pareja en vez de una ráfaga a la misma hora.
+"""
+
+from datetime import date, datetime, time, timedelta, timezone
+from typing import Dict, FrozenSet, Iterable, List, NamedTuple, Tuple
+from zoneinfo import ZoneInfo
+
+from sqlalchemy.orm import Session
+
+from app.config import get_settings
+from app.models.ventana_cobro import VentanaCobro
+
+settings = get_settings()
+
+# Desfase por bufete: múltiplos de la razón áurea (mod 1) quedan bien
+# distribuidos en [0, 1) para ids consecutivos
+_RAZON_AUREA = 0.6180339887498949
+
+# Días hacia adelante que se buscan para la próxima ventana válida
+_MAX_DIAS_BUSQUEDA = 366
+
+
+def _utc(momento: datetime) -> datetime:
+    """Datetime con zona -> UTC naive (como se guardan los timestamps)."""
+    return momento.astimezone(timezone.utc).replace(tzinfo=None)
+
+
+class VentanaEnvio(NamedTuple):
+    """Ventana de envío de un bufete (hashable)."""
+    zona_horaria: str
+    hora_inicio: time
+    hora_fin: time
+    dias_semana: FrozenSet[int]
+    feriados: FrozenSet[date]
+
+    def permite(self, dia: date) -> bool:
+        """El día (local) admite envíos."""
+        return dia.weekday() in self.dias_semana and dia not in self.feriados
+
+    def abierta_desde(self, desde: datetime) -> Tuple[datetime, datetime]:
+        """
+        (inicio, fin), en UTC naive, del tramo de ventana en que se puede
+        enviar a partir de `desde` (UTC naive): el resto de la ventana de
+        hoy si está abierta, o la próxima ventana completa.
+        """
+        zona = ZoneInfo(self.zona_horaria)
+        local = desde.replace(tzinfo=timezone.utc).astimezone(zona)
+
+        for dias in range(_MAX_DIAS_BUSQUEDA):
+            dia = local.date() + timedelta(days=dias)
+            if not self.permite(dia):
+                continue
+            inicio = datetime.combine(dia, self.hora_inicio, zona)
+            fin = datetime.combine(dia, self.hora_fin, zona)
+            if fin > local:
+                return _utc(max(inicio, local)), _utc(fin)
+
+        # Ventana sin días válidos (mal configurada): no retener los envíos
+        print(f"⚠️  Billing send window without valid days: {self}")
+        return desde, desde
+
+    def ajustar(self, momento: datetime) -> datetime:
+        """`momento` si cae dentro de la ventana; si no, la próxima apertura."""
+        return self.abierta_desde(momento)[0]
+
+    def repartir(self, cantidad: int, desde: datetime, fase: float = 0.0) -> List[datetime]:
+        """
+        `cantidad` horarios (UTC naive) equiespaciados en la ventana a
+        partir de `desde`, desplazados `fase` (0-1) de un intervalo.
+        """
+        inicio, fin = self.abierta_desde(desde)
+        intervalo = (fin - inicio) / max(cantidad, 1)
+        return [inicio + intervalo * (i + fase) for i in range(cantidad)]
+
+
+def _parse_hora(valor: str) -> time:
+    horas, minutos = valor.split(":")
+    return time(int(horas), int(minutos))
+
+
+class VentanasEnvio:
+    """
+    Carga de ventanas por bufete y reparto de envíos.
+    """
+
+    def por_defecto(self) -> VentanaEnvio:
+        """Ventana de config (billing_window_*) en la zona horaria de la app."""
+        return VentanaEnvio(
+            zona_horaria=settings.timezone,
+            hora_inicio=_parse_hora(settings.billing_window_start),
+            hora_fin=_parse_hora(settings.billing_window_end),
+            dias_semana=frozenset(int(dia) for dia in settings.billing_window_weekdays.split(",") if dia.strip()),
+            feriados=frozenset()
+        )
+
+    def cargar(self, db: Session, firm_ids: Iterable[int]) -> Dict[int, VentanaEnvio]:
+        """Ventana de cada bufete en una sola query (por defecto si no tiene)."""
+        ids = {firm_id for firm_id in firm_ids if firm_id is not None}
+        if not ids:
+            return {}
+
+        defecto = self.por_defecto()
+        ventanas = {firm_id: defecto for firm_id in ids}
+        for fila in db.query(VentanaCobro).filter(
+            VentanaCobro.firma_id.in_(ids),
+            VentanaCobro.esta_activo == True
+        ).all():
+            ventanas[fila.firma_id] = VentanaEnvio(
+                zona_horaria=fila.zona_horaria,
+                hora_inicio=fila.hora_inicio,
+                hora_fin=fila.hora_fin,
+                dias_semana=frozenset(fila.dias_semana or defecto.dias_semana),
+                feriados=frozenset(date.fromisoformat(feriado) for feriado in fila.feriados or [])
+            )
+        return ventanas
+
+    def fase(self, firm_id: int) -> float:
+        """Desfase (0-1) del bufete dentro de su intervalo de envío."""
+        return (firm_id * _RAZON_AUREA) % 1.0
+
+
+# Singleton instance
+ventanas_envio = VentanasEnvio()
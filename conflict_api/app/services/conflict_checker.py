@@ -2,9 +2,11 @@
 Servicio de verificación de conflictos de interés con fuzzy matching.
 """
 
-from typing import List, Optional, Tuple
+from typing import Callable, List, Optional, Tuple
 from sqlalchemy.orm import Session
-from sqlalchemy import func, or_
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import func, or_, select, Select
+from starlette.concurrency import run_in_threadpool
 from fuzzywuzzy import fuzz
 from unidecode import unidecode
 
@@ -13,9 +15,19 @@ from app.models.asunto import Asunto
 from app.models.parte_relacionada import ParteRelacionada
 from app.schemas.conflicto import BusquedaConflicto, ResultadoConflicto, ConflictoEncontrado
 from app.config import get_settings
+from app.metrics import registry
 
 settings = get_settings()
 
+# Filas candidatas evaluadas con fuzzy matching por búsqueda
+CONFLICT_CHECK_CANDIDATES = registry.histogram(
+    "conflict_check_candidates", "Candidatos evaluados por búsqueda de conflictos", ["fuente"],
+    buckets=(0, 10, 50, 100, 500, 1000, 5000, 10000, 50000, 100000)
+)
+
+# (fuente, consulta de candidatos, evaluador de filas -> conflictos)
+PasoBusqueda = Tuple[str, Select, Callable[[list], List[ConflictoEncontrado]]]
+
 
 class ConflictChecker:
     """
@@ -57,35 +69,88 @@ class ConflictChecker:
             ResultadoConflicto con lista de conflictos encontrados
         """
         conflictos: List[ConflictoEncontrado] = []
-        termino_busqueda = self._construir_termino_busqueda(busqueda)
+
+        for fuente, stmt, evaluar in self._plan_busqueda(firm_id, busqueda):
+            resultados = db.execute(stmt).all()
+            CONFLICT_CHECK_CANDIDATES.observe(len(resultados), fuente=fuente)
+            conflictos.extend(evaluar(resultados))
+
+        return self._construir_resultado(busqueda, conflictos)
+
+    async def verificar_conflictos_async(
+        self,
+        db: AsyncSession,
+        firm_id: int,
+        busqueda: BusquedaConflicto
+    ) -> ResultadoConflicto:
+        """
+        Versión async de verificar_conflictos.
+
+        Las consultas corren en el AsyncSession; el fuzzy matching (CPU)
+        corre en el threadpool para no bloquear el event loop.
+        """
+        lotes = []
+        for fuente, stmt, evaluar in self._plan_busqueda(firm_id, busqueda):
+            resultados = (await db.execute(stmt)).all()
+            CONFLICT_CHECK_CANDIDATES.observe(len(resultados), fuente=fuente)
+            lotes.append((evaluar, resultados))
+
+        def _evaluar_lotes() -> List[ConflictoEncontrado]:
+            conflictos = []
+            for evaluar, resultados in lotes:
+                conflictos.extend(evaluar(resultados))
+            return conflictos
+
+        conflictos = await run_in_threadpool(_evaluar_lotes)
+        return self._construir_resultado(busqueda, conflictos)
+
+    def _plan_busqueda(self, firm_id: int, busqueda: BusquedaConflicto) -> List[PasoBusqueda]:
+        """
+        Consultas de candidatos y evaluadores según los criterios de búsqueda.
+
+        Busca en:
+        - Clientes persona y partes relacionadas (si hay nombre/apellido)
+        - Clientes empresa y partes relacionadas (si hay nombre_empresa)
+        """
+        plan: List[PasoBusqueda] = []
 
         # Buscar por nombre de persona
         if busqueda.nombre or busqueda.apellido:
-            # Buscar en clientes
-            conflictos_clientes = self._buscar_en_clientes_persona(
-                db, firm_id, busqueda
-            )
-            conflictos.extend(conflictos_clientes)
-
-            # Buscar en partes relacionadas
-            conflictos_partes = self._buscar_en_partes_relacionadas(
-                db, firm_id, busqueda
-            )
-            conflictos.extend(conflictos_partes)
+            nombre_busqueda = self._nombre_persona(busqueda)
+            plan.append((
+                "clientes_persona",
+                self._consulta_clientes_persona(firm_id),
+                lambda filas: self._evaluar_clientes_persona(filas, nombre_busqueda)
+            ))
+            plan.append((
+                "partes_persona",
+                self._consulta_partes(firm_id),
+                lambda filas: self._evaluar_partes(filas, nombre_busqueda)
+            ))
 
         # Buscar por nombre de empresa
         if busqueda.nombre_empresa:
-            # Buscar en clientes empresa
-            conflictos_empresa = self._buscar_en_clientes_empresa(
-                db, firm_id, busqueda.nombre_empresa
-            )
-            conflictos.extend(conflictos_empresa)
-
-            # Buscar en partes relacionadas empresa
-            conflictos_partes_empresa = self._buscar_en_partes_empresa(
-                db, firm_id, busqueda.nombre_empresa
-            )
-            conflictos.extend(conflictos_partes_empresa)
+            nombre_empresa = busqueda.nombre_empresa
+            plan.append((
+                "clientes_empresa",
+                self._consulta_clientes_empresa(firm_id),
+                lambda filas: self._evaluar_clientes_empresa(filas, nombre_empresa)
+            ))
+            plan.append((
+                "partes_empresa",
+                self._consulta_partes(firm_id),
+                lambda filas: self._evaluar_partes(filas, nombre_empresa)
+            ))
+
+        return plan
+
+    def _construir_resultado(
+        self,
+        busqueda: BusquedaConflicto,
+        conflictos: List[ConflictoEncontrado]
+    ) -> ResultadoConflicto:
+        """Elimina duplicados, ordena por confianza y arma el mensaje."""
+        termino_busqueda = self._construir_termino_busqueda(busqueda)
 
         # Eliminar duplicados (mismo asunto puede aparecer múltiples veces)
         conflictos = self._eliminar_duplicados(conflictos)
@@ -108,6 +173,13 @@ class ConflictChecker:
             mensaje=mensaje
         )
 
+    def _nombre_persona(self, busqueda: BusquedaConflicto) -> str:
+        """Nombre completo buscado (nombre + apellido(s)), vacío si no hay."""
+        partes_busqueda = [
+            p for p in [busqueda.nombre, busqueda.apellido, busqueda.segundo_apellido] if p
+        ]
+        return " ".join(partes_busqueda)
+
     def _construir_termino_busqueda(self, busqueda: BusquedaConflicto) -> str:
         """Construye string descriptivo del término buscado."""
         partes = []
@@ -187,39 +259,12 @@ class ConflictChecker:
         else:
             return "media"
 
-    def _buscar_en_clientes_persona(
-        self,
-        db: Session,
-        firm_id: int,
-        busqueda: BusquedaConflicto
-    ) -> List[ConflictoEncontrado]:
-        """
-        Busca coincidencias en clientes usando fuzzy matching.
-
-        Args:
-            db: Sesión de base de datos
-            firm_id: ID del bufete
-            busqueda: Datos de búsqueda
-
-        Returns:
-            Lista de conflictos encontrados
-        """
-        conflictos = []
-
-        # Construir nombre completo buscado
-        partes_busqueda = [
-            p for p in [busqueda.nombre, busqueda.apellido, busqueda.segundo_apellido] if p
-        ]
-        nombre_busqueda = " ".join(partes_busqueda)
-
-        if not nombre_busqueda:
-            return []
-
-        # Obtener todos los clientes activos del bufete con sus asuntos
-        query = (
-            db.query(Cliente, Asunto)
+    def _consulta_clientes_persona(self, firm_id: int) -> Select:
+        """Clientes persona activos del bufete con sus asuntos activos."""
+        return (
+            select(Cliente, Asunto)
             .join(Asunto, Cliente.id == Asunto.cliente_id)
-            .filter(
+            .where(
                 Cliente.firma_id == firm_id,
                 Cliente.esta_activo == True,
                 Asunto.esta_activo == True,
@@ -228,9 +273,46 @@ class ConflictChecker:
             )
         )
 
-        resultados = query.all()
+    def _consulta_clientes_empresa(self, firm_id: int) -> Select:
+        """Clientes empresa activos del bufete con sus asuntos activos."""
+        return (
+            select(Cliente, Asunto)
+            .join(Asunto, Cliente.id == Asunto.cliente_id)
+            .where(
+                Cliente.firma_id == firm_id,
+                Cliente.esta_activo == True,
+                Asunto.esta_activo == True,
+                Cliente.nombre_empresa.isnot(None)
+            )
+        )
+
+    def _consulta_partes(self, firm_id: int) -> Select:
+        """Partes relacionadas activas de asuntos activos del bufete."""
+        return (
+            select(ParteRelacionada, Asunto, Cliente)
+            .join(Asunto, ParteRelacionada.asunto_id == Asunto.id)
+            .join(Cliente, Asunto.cliente_id == Cliente.id)
+            .where(
+                Cliente.firma_id == firm_id,
+                ParteRelacionada.esta_activo == True,
+                Asunto.esta_activo == True,
+                Cliente.esta_activo == True
+            )
+        )
+
+    def _evaluar_clientes_persona(self, resultados: list, nombre_busqueda: str) -> List[ConflictoEncontrado]:
+        """
+        Calcula similitud contra el nombre completo de cada cliente persona.
+
+        Args:
+            resultados: Filas (Cliente, Asunto)
+            nombre_busqueda: Nombre completo buscado
+
+        Returns:
+            Lista de conflictos encontrados
+        """
+        conflictos = []
 
-        # Calcular similitud para cada resultado
         for cliente, asunto in resultados:
             # Construir nombre completo del cliente
             partes_cliente = [
@@ -238,7 +320,6 @@ class ConflictChecker:
             ]
             nombre_cliente = " ".join(partes_cliente)
 
-            # Calcular similitud
             score = self._calcular_similitud(nombre_busqueda, nombre_cliente)
 
             # Solo incluir si supera el umbral
@@ -257,40 +338,19 @@ class ConflictChecker:
 
         return conflictos
 
-    def _buscar_en_clientes_empresa(
-        self,
-        db: Session,
-        firm_id: int,
-        nombre_empresa: str
-    ) -> List[ConflictoEncontrado]:
+    def _evaluar_clientes_empresa(self, resultados: list, nombre_empresa: str) -> List[ConflictoEncontrado]:
         """
-        Busca coincidencias en empresas usando fuzzy matching.
+        Calcula similitud contra el nombre de cada cliente empresa.
 
         Args:
-            db: Sesión de base de datos
-            firm_id: ID del bufete
-            nombre_empresa: Nombre de empresa a buscar
+            resultados: Filas (Cliente, Asunto)
+            nombre_empresa: Nombre de empresa buscado
 
         Returns:
             Lista de conflictos encontrados
         """
         conflictos = []
 
-        # Obtener todos los clientes empresa del bufete con sus asuntos
-        query = (
-            db.query(Cliente, Asunto)
-            .join(Asunto, Cliente.id == Asunto.cliente_id)
-            .filter(
-                Cliente.firma_id == firm_id,
-                Cliente.esta_activo == True,
-                Asunto.esta_activo == True,
-                Cliente.nombre_empresa.isnot(None)
-            )
-        )
-
-        resultados = query.all()
-
-        # Calcular similitud para cada resultado
         for cliente, asunto in resultados:
             score = self._calcular_similitud(nombre_empresa, cliente.nombre_empresa)
 
@@ -310,119 +370,36 @@ class ConflictChecker:
 
         return conflictos
 
-    def _buscar_en_partes_relacionadas(
-        self,
-        db: Session,
-        firm_id: int,
-        busqueda: BusquedaConflicto
-    ) -> List[ConflictoEncontrado]:
+    def _evaluar_partes(self, resultados: list, nombre_buscado: str) -> List[ConflictoEncontrado]:
         """
-        Busca coincidencias en partes relacionadas de asuntos.
+        Calcula similitud contra el nombre de cada parte relacionada
+        (persona o empresa).
 
         Args:
-            db: Sesión de base de datos
-            firm_id: ID del bufete
-            busqueda: Datos de búsqueda
+            resultados: Filas (ParteRelacionada, Asunto, Cliente)
+            nombre_buscado: Nombre de persona o empresa buscado
 
         Returns:
             Lista de conflictos encontrados
         """
         conflictos = []
 
-        # Construir nombre completo buscado
-        partes_busqueda = [
-            p for p in [busqueda.nombre, busqueda.apellido, busqueda.segundo_apellido] if p
-        ]
-        nombre_busqueda = " ".join(partes_busqueda)
-
-        if not nombre_busqueda:
-            return []
-
-        # Obtener todas las partes relacionadas activas de asuntos del bufete
-        query = (
-            db.query(ParteRelacionada, Asunto, Cliente)
-            .join(Asunto, ParteRelacionada.asunto_id == Asunto.id)
-            .join(Cliente, Asunto.cliente_id == Cliente.id)
-            .filter(
-                Cliente.firma_id == firm_id,
-                ParteRelacionada.esta_activo == True,
-                Asunto.esta_activo == True,
-                Cliente.esta_activo == True
-            )
-        )
-
-        resultados = query.all()
-
-        # Calcular similitud para cada resultado
-        for parte, asunto, cliente in resultados:
-            score = self._calcular_similitud(nombre_busqueda, parte.nombre)
-
-            # Solo incluir si supera el umbral
-            if score >= self.fuzzy_threshold:
-                conflictos.append(ConflictoEncontrado(
-                    cliente_id=cliente.id,
-                    cliente_nombre=cliente.nombre_completo,
-                    asunto_id=asunto.id,
-                    asunto_nombre=asunto.nombre_asunto,
-                    estado_asunto=asunto.estado,
-                    tipo_coincidencia=f"parte_relacionada_{parte.tipo_relacion.value}",
-                    similitud_score=score,
-                    nivel_confianza=self._determinar_nivel_confianza(score),
-                    campo_coincidente=f"parte_relacionada ({parte.tipo_relacion.value}: {parte.nombre})"
-                ))
-
-        return conflictos
-
-    def _buscar_en_partes_empresa(
-        self,
-        db: Session,
-        firm_id: int,
-        nombre_empresa: str
-    ) -> List[ConflictoEncontrado]:
-        """
-        Busca coincidencias de empresas en partes relacionadas.
-
-        Args:
-            db: Sesión de base de datos
-            firm_id: ID del bufete
-            nombre_empresa: Nombre de empresa a buscar
-
-        Returns:
-            Lista de conflictos encontrados
-        """
-        conflictos = []
-
-        # Obtener todas las partes relacionadas activas de asuntos del bufete
-        query = (
-            db.query(ParteRelacionada, Asunto, Cliente)
-            .join(Asunto, ParteRelacionada.asunto_id == Asunto.id)
-            .join(Cliente, Asunto.cliente_id == Cliente.id)
-            .filter(
-                Cliente.firma_id == firm_id,
-                ParteRelacionada.esta_activo == True,
-                Asunto.esta_activo == True,
-                Cliente.esta_activo == True
-            )
-        )
-
-        resultados = query.all()
-
-        # Calcular similitud para cada resultado
         for parte, asunto, cliente in resultados:
-            score = self._calcular_similitud(nombre_empresa, parte.nombre)
+            score = self._calcular_similitud(nombre_buscado, parte.nombre)
 
             # Solo incluir si supera el umbral
             if score >= self.fuzzy_threshold:
+                # tipo_relacion se guarda como String (no Enum)
                 conflictos.append(ConflictoEncontrado(
                     cliente_id=cliente.id,
                     cliente_nombre=cliente.nombre_completo,
                     asunto_id=asunto.id,
                     asunto_nombre=asunto.nombre_asunto,
                     estado_asunto=asunto.estado,
-                    tipo_coincidencia=f"parte_relacionada_{parte.tipo_relacion.value}",
+                    tipo_coincidencia=f"parte_relacionada_{parte.tipo_relacion}",
                     similitud_score=score,
                     nivel_confianza=self._determinar_nivel_confianza(score),
-                    campo_coincidente=f"parte_relacionada ({parte.tipo_relacion.value}: {parte.nombre})"
+                    campo_coincidente=f"parte_relacionada ({parte.tipo_relacion}: {parte.nombre})"
                 ))
 
         return conflictos
@@ -0,0 +1,121 @@
+"""
+Locks entre procesos para jobs programados.
+
+Con varios workers de gunicorn (o réplicas) cada proceso inicia su propio
+scheduler; el lock decide cuál ejecuta un job. En PostgreSQL se usa un
+advisory lock de sesión (pg_try_advisory_lock) sobre una conexión
+dedicada: se libera solo si el proceso muere. Sin PostgreSQL (un solo
+host) se usa un file lock (flock).
+
+Uso:
+    with distributed_lock.adquirir("billing_reminders") as adquirido:
+        if adquirido:
+            ...
+"""
+
+import hashlib
+import os
+import tempfile
+from contextlib import contextmanager
+from typing import Callable, Iterator, Optional
+
+from sqlalchemy import text
+
+from app.config import get_settings
+from app.database import engine
+
+try:
+    import fcntl
+except ImportError:  # Windows: sin file locks
+    fcntl = None
+
+settings = get_settings()
+
+
+def _clave_advisory(nombre: str) -> int:
+    """Clave bigint estable (entre procesos y reinicios) para un nombre de lock."""
+    return int.from_bytes(hashlib.blake2b(nombre.encode(), digest_size=8).digest(), "big", signed=True)
+
+
+class DistributedLock:
+    """
+    Try-lock no bloqueante: si otro proceso tiene el lock, adquirir()
+    retorna False de inmediato en vez de esperar.
+    """
+
+    def __init__(self, backend: Optional[str] = None):
+        backend = backend or settings.billing_scheduler_lock_backend
+        if backend == "auto":
+            backend = "postgres" if engine.dialect.name == "postgresql" else "file"
+        if backend == "file" and fcntl is None:
+            print("⚠️  File locks not supported on this platform - scheduler jobs run in every process")
+            backend = "none"
+        self.backend = backend
+        self.directorio = settings.billing_scheduler_lock_dir or tempfile.gettempdir()
+
+    @contextmanager
+    def adquirir(self, nombre: str) -> Iterator[bool]:
+        """Intenta tomar el lock `nombre` durante el bloque."""
+        liberar = self._intentar(nombre)
+        try:
+            yield liberar is not None
+        finally:
+            if liberar is not None:
+                liberar()
+
+    def _intentar(self, nombre: str) -> Optional[Callable[[], None]]:
+        """Toma el lock y retorna la función que lo libera, o None si está tomado."""
+        if self.backend == "postgres":
+            return self._intentar_advisory(nombre)
+        if self.backend == "file":
+            return self._intentar_archivo(nombre)
+        return lambda: None
+
+    def _intentar_advisory(self, nombre: str) -> Optional[Callable[[], None]]:
+        # Lock de sesión: requiere una conexión directa a PostgreSQL (no
+        # PgBouncer en modo transaction). La conexión queda fuera de
+        # transacción mientras se mantiene el lock.
+        clave = _clave_advisory(nombre)
+        conn = engine.connect()
+        try:
+            adquirido = conn.execute(text("SELECT pg_try_advisory_lock(:clave)"), {"clave": clave}).scalar()
+            conn.commit()
+        except Exception:
+            conn.close()
+            raise
+
+        if not adquirido:
+            conn.close()
+            return None
+
+        def liberar():
+            try:
+                conn.execute(text("SELECT pg_advisory_unlock(:clave)"), {"clave": clave})
+                conn.commit()
+            except Exception as e:
+                # Cerrar la conexión invalidada libera el lock en el servidor
+                print(f"⚠️  Failed to release advisory lock {nombre}: {e}")
+                conn.invalidate()
+            finally:
+                conn.close()
+
+        return liberar
+
+    def _intentar_archivo(self, nombre: str) -> Optional[Callable[[], None]]:
+        ruta = os.path.join(self.directorio, f"professionalhubs-{nombre.replace('/', '_').replace(':', '_')}.lock")
+        archivo = open(ruta, "a")
+        try:
+            fcntl.flock(archivo.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            archivo.close()
+            return None
+
+        def liberar():
+            fcntl.flock(archivo.fileno(), fcntl.LOCK_UN)
+            archivo.close()
+
+        return liberar
+
+
+# Singleton instance
+distributed_lock = DistributedLock()
@@ -0,0 +1,195 @@
+"""
+Servicio de exportación masiva de datos del bufete (auditorías).
+
+- Consultas Core (tuplas, no objetos ORM) con yield_per: en PostgreSQL
+  usa un cursor de servidor y trae las filas por bloques.
+- Serializa a CSV o NDJSON bloque por bloque, con memoria constante.
+- Cada exportación usa su propia sesión, abierta y cerrada por el
+  generador que alimenta el StreamingResponse.
+"""
+
+import csv
+import io
+import json
+from datetime import date, datetime
+from decimal import Decimal
+from typing import Any, Iterator, List, Sequence
+
+from sqlalchemy import select, text
+
+from app.config import get_settings
+from app.database import SessionLocal
+from app.models.asunto import Asunto
+from app.models.cliente import Cliente
+from app.models.parte_relacionada import ParteRelacionada
+
+settings = get_settings()
+
+MEDIA_TYPES = {
+    "csv": "text/csv; charset=utf-8",
+    "ndjson": "application/x-ndjson",
+}
+
+
+class FirmExporter:
+    """
+    Exportador en streaming de clientes, asuntos, partes relacionadas y
+    logs de comunicación de cobro, siempre filtrado por firma_id.
+    """
+
+    def __init__(self):
+        self.chunk_size = settings.export_chunk_size
+
+        self._consultas = {
+            "clientes": self._consulta_clientes,
+            "asuntos": self._consulta_asuntos,
+            "partes-relacionadas": self._consulta_partes,
+            "comunicaciones": self._consulta_comunicaciones,
+        }
+
+    def exportar(
+        self,
+        firm_id: int,
+        entidad: str,
+        formato: str = "csv",
+        incluir_inactivos: bool = False
+    ) -> Iterator[bytes]:
+        """
+        Generador de bytes para StreamingResponse.
+
+        Args:
+            firm_id: ID del bufete
+            entidad: "clientes", "asuntos", "partes-relacionadas" o "comunicaciones"
+            formato: "csv" o "ndjson"
+            incluir_inactivos: Incluir registros con soft delete
+
+        Yields:
+            Bloques codificados en UTF-8 (uno por cada chunk_size filas)
+        """
+        db = SessionLocal()
+        try:
+            stmt, params = self._consultas[entidad](firm_id, incluir_inactivos)
+            result = db.execute(
+                stmt.execution_options(yield_per=self.chunk_size),
+                params
+            )
+            columnas = list(result.keys())
+
+            if formato == "ndjson":
+                bloques = self._ndjson(columnas, result.partitions())
+            else:
+                bloques = self._csv(columnas, result.partitions())
+
+            for bloque in bloques:
+                yield bloque.encode("utf-8")
+        finally:
+            db.close()
+
+    # ------------------------------------------------------------------
+    # Serialización
+    # ------------------------------------------------------------------
+
+    def _csv(self, columnas: List[str], particiones: Iterator[Sequence]) -> Iterator[str]:
+        """CSV con encabezado; un bloque de texto por partición."""
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+
+        writer.writerow(columnas)
+        yield buffer.getvalue()
+
+        for filas in particiones:
+            buffer.seek(0)
+            buffer.truncate()
+            writer.writerows(filas)
+            yield buffer.getvalue()
+
+    def _ndjson(self, columnas: List[str], particiones: Iterator[Sequence]) -> Iterator[str]:
+        """Un objeto JSON por línea; un bloque de texto por partición."""
+        for filas in particiones:
+            yield "".join(
+                json.dumps(dict(zip(columnas, fila)), default=self._json_default, ensure_ascii=False) + "\n"
+                for fila in filas
+            )
+
+    def _json_default(self, valor: Any) -> Any:
+        """Serializa fechas (ISO 8601) y decimales."""
+        if isinstance(valor, (datetime, date)):
+            return valor.isoformat()
+        if isinstance(valor, Decimal):
+            return str(valor)
+        raise TypeError(f"Tipo no serializable: {type(valor).__name__}")
+
+    # ------------------------------------------------------------------
+    # Consultas por entidad (ordenadas por id para un export estable)
+    # ------------------------------------------------------------------
+
+    def _consulta_clientes(self, firm_id: int, incluir_inactivos: bool):
+        stmt = select(
+            Cliente.id, Cliente.nombre, Cliente.apellido, Cliente.segundo_apellido,
+            Cliente.nombre_empresa, Cliente.email, Cliente.telefono,
+            Cliente.direccion, Cliente.direccion_postal,
+            Cliente.has_late_invoices, Cliente.has_potential_conflict,
+            Cliente.esta_activo, Cliente.creado_en, Cliente.actualizado_en
+        ).where(Cliente.firma_id == firm_id)
+
+        if not incluir_inactivos:
+            stmt = stmt.where(Cliente.esta_activo == True)
+
+        return stmt.order_by(Cliente.id), {}
+
+    def _consulta_asuntos(self, firm_id: int, incluir_inactivos: bool):
+        stmt = (
+            select(
+                Asunto.id, Asunto.cliente_id, Asunto.nombre_asunto,
+                Asunto.fecha_apertura, Asunto.estado,
+                Asunto.esta_activo, Asunto.creado_en, Asunto.actualizado_en
+            )
+            .join(Cliente, Asunto.cliente_id == Cliente.id)
+            .where(Cliente.firma_id == firm_id)
+        )
+
+        if not incluir_inactivos:
+            stmt = stmt.where(Asunto.esta_activo == True)
+
+        return stmt.order_by(Asunto.id), {}
+
+    def _consulta_partes(self, firm_id: int, incluir_inactivos: bool):
+        stmt = (
+            select(
+                ParteRelacionada.id, ParteRelacionada.asunto_id,
+                Asunto.cliente_id, ParteRelacionada.nombre,
+                ParteRelacionada.tipo_relacion, ParteRelacionada.esta_activo,
+                ParteRelacionada.creado_en, ParteRelacionada.actualizado_en
+            )
+            .join(Asunto, ParteRelacionada.asunto_id == Asunto.id)
+            .join(Cliente, Asunto.cliente_id == Cliente.id)
+            .where(Cliente.firma_id == firm_id)
+        )
+
+        if not incluir_inactivos:
+            stmt = stmt.where(ParteRelacionada.esta_activo == True)
+
+        return stmt.order_by(ParteRelacionada.id), {}
+
+    def _consulta_comunicaciones(self, firm_id: int, incluir_inactivos: bool):
+        # invoices no tiene modelo ORM; mismo estilo SQL que el router de billing
+        stmt = text(f"""
+            SELECT
+                bcl.id, bcl.invoice_id, i.invoice_number, i.client_id,
+                bcl.type, bcl.status, bcl.subject, bcl.message_body,
+                bcl.sent_at, bcl.delivered_at, bcl.read_at,
+                bcl.external_id, bcl.error_message,
+                bcl.days_overdue_when_sent, bcl.reminder_sequence,
+                bcl.esta_activo, bcl.creado_en
+            FROM billing_communication_logs bcl
+            JOIN invoices i ON bcl.invoice_id = i.id
+            JOIN clientes c ON i.client_id = c.id
+            WHERE c.firma_id = :firm_id
+            {"" if incluir_inactivos else "AND bcl.esta_activo = true"}
+            ORDER BY bcl.id
+        """)
+        return stmt, {"firm_id": firm_id}
+
+
+# Singleton instance
+firm_exporter = FirmExporter()
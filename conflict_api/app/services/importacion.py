@@ -0,0 +1,498 @@
+"""
+Servicio de importación masiva de clientes, asuntos y partes relacionadas.
+
+- Lee CSV (csv.DictReader) o XLSX (openpyxl read_only) fila por fila,
+  sin cargar el archivo completo en memoria.
+- Valida cada fila con los schemas Pydantic existentes.
+- Resuelve llaves foráneas por lote (una consulta por lote, no por fila).
+- Inserta cada lote con un INSERT multi-fila y un commit. Si el archivo
+  deja de poder leerse a mitad (encoding, CSV mal formado), la importación
+  se detiene ahí y el resultado reporta la fila: los lotes anteriores ya
+  quedaron importados. Si el INSERT
+  falla, el lote se divide en mitades bajo SAVEPOINT hasta aislar las
+  filas que fallan; el resto del lote se importa.
+- Al final actualiza estadísticas (ANALYZE) de la tabla una sola vez.
+"""
+
+import codecs
+import csv
+import os
+import zipfile
+from typing import Any, BinaryIO, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from pydantic import BaseModel, ValidationError
+from sqlalchemy import func, insert, text
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.orm import Session
+
+from app.config import get_settings
+from app.models.asunto import Asunto
+from app.models.cliente import Cliente
+from app.models.parte_relacionada import ParteRelacionada
+from app.schemas.asunto import AsuntoCreate
+from app.schemas.cliente import ClienteCreate
+from app.schemas.parte_relacionada import ParteRelacionadaCreate
+from app.schemas.importacion import ErrorFilaImportacion, ResultadoImportacion
+
+settings = get_settings()
+
+# Fila numerada: (número de fila en el archivo, valores por columna)
+FilaArchivo = Tuple[int, Dict[str, Any]]
+
+FORMATOS_SOPORTADOS = (".csv", ".xlsx")
+
+
+class FormatoImportacionInvalido(ValueError):
+    """El archivo no es CSV/XLSX válido o no tiene encabezados."""
+    pass
+
+
+class BulkImporter:
+    """
+    Importador masivo por lotes.
+
+    Columnas esperadas (encabezados, sin distinguir mayúsculas):
+    - clientes: campos de ClienteCreate
+    - asuntos: campos de AsuntoCreate; el cliente se indica con
+      cliente_id o cliente_email
+    - partes-relacionadas: campos de ParteRelacionadaCreate; el asunto se
+      indica con asunto_id o con cliente_email + nombre_asunto
+    """
+
+    def __init__(self):
+        self.chunk_size = settings.import_chunk_size
+        self.max_errors = settings.import_max_errors
+
+        self._preparadores = {
+            "clientes": (Cliente, self._preparar_clientes),
+            "asuntos": (Asunto, self._preparar_asuntos),
+            "partes-relacionadas": (ParteRelacionada, self._preparar_partes),
+        }
+
+    # ------------------------------------------------------------------
+    # Lectura de archivos
+    # ------------------------------------------------------------------
+
+    def leer_filas(
+        self,
+        archivo: BinaryIO,
+        nombre_archivo: str,
+        delimitador: str = ","
+    ) -> Iterator[FilaArchivo]:
+        """
+        Retorna un iterador de filas según la extensión del archivo.
+
+        Raises:
+            FormatoImportacionInvalido: Si la extensión no es soportada
+        """
+        ext = os.path.splitext(nombre_archivo or "")[1].lower()
+
+        if ext == ".csv":
+            return self._leer_csv(archivo, delimitador)
+        if ext == ".xlsx":
+            return self._leer_xlsx(archivo)
+
+        raise FormatoImportacionInvalido(
+            f"Formato no soportado. Formatos aceptados: {', '.join(FORMATOS_SOPORTADOS)}"
+        )
+
+    def _leer_csv(self, archivo: BinaryIO, delimitador: str) -> Iterator[FilaArchivo]:
+        """Lee un CSV en streaming (UTF-8, con o sin BOM)."""
+        lector = csv.DictReader(
+            codecs.iterdecode(archivo, "utf-8-sig"),
+            delimiter=delimitador
+        )
+        if not lector.fieldnames:
+            raise FormatoImportacionInvalido("El archivo CSV no tiene encabezados")
+
+        # Fila 1 es el encabezado
+        for numero, fila in enumerate(lector, start=2):
+            yield numero, self._limpiar_fila(fila)
+
+    def _leer_xlsx(self, archivo: BinaryIO) -> Iterator[FilaArchivo]:
+        """Lee la primera hoja de un XLSX en modo read_only (streaming)."""
+        from openpyxl import load_workbook
+        from openpyxl.utils.exceptions import InvalidFileException
+
+        try:
+            libro = load_workbook(archivo, read_only=True, data_only=True)
+        except (zipfile.BadZipFile, InvalidFileException, KeyError) as e:
+            # No es un ZIP, o es un ZIP sin las partes de un libro de Excel
+            raise FormatoImportacionInvalido(f"El archivo XLSX no es válido: {e}")
+        try:
+            filas = libro.active.iter_rows(values_only=True)
+            encabezados = next(filas, None)
+            if not encabezados:
+                raise FormatoImportacionInvalido("El archivo XLSX no tiene encabezados")
+
+            columnas = [str(c) if c is not None else None for c in encabezados]
+            for numero, valores in enumerate(filas, start=2):
+                if valores is None or all(v is None for v in valores):
+                    continue
+                valores = [self._celda_xlsx(v) for v in valores]
+                yield numero, self._limpiar_fila(dict(zip(columnas, valores)))
+        finally:
+            libro.close()
+
+    def _celda_xlsx(self, valor: Any) -> Any:
+        """
+        Convierte números de Excel a texto (teléfonos, códigos postales);
+        Pydantic vuelve a convertirlos a int donde el schema lo pide.
+        """
+        if isinstance(valor, bool):
+            return valor
+        if isinstance(valor, float) and valor.is_integer():
+            return str(int(valor))
+        if isinstance(valor, (int, float)):
+            return str(valor)
+        return valor
+
+    def _limpiar_fila(self, fila: Dict[Optional[str], Any]) -> Dict[str, Any]:
+        """Normaliza encabezados y convierte celdas vacías en None."""
+        limpia = {}
+        for columna, valor in fila.items():
+            if columna is None:
+                continue  # Celdas sin encabezado
+            if isinstance(valor, str):
+                valor = valor.strip() or None
+            limpia[columna.strip().lower()] = valor
+        return limpia
+
+    # ------------------------------------------------------------------
+    # Importación por lotes
+    # ------------------------------------------------------------------
+
+    def importar(
+        self,
+        db: Session,
+        firm_id: int,
+        entidad: str,
+        filas: Iterable[FilaArchivo]
+    ) -> ResultadoImportacion:
+        """
+        Importa filas de una entidad por lotes.
+
+        Args:
+            db: Sesión de base de datos
+            firm_id: ID del bufete
+            entidad: "clientes", "asuntos" o "partes-relacionadas"
+            filas: Iterador de (número de fila, valores)
+
+        Returns:
+            ResultadoImportacion con conteos y errores por fila
+        """
+        modelo, preparar = self._preparadores[entidad]
+        resultado = ResultadoImportacion(
+            entidad=entidad,
+            filas_procesadas=0,
+            filas_importadas=0,
+            filas_con_error=0
+        )
+
+        for lote in self._en_lotes(self._hasta_error_de_lectura(filas, resultado)):
+            resultado.filas_procesadas += len(lote)
+
+            validas, errores = preparar(db, firm_id, lote)
+            for error in errores:
+                self._registrar_error(resultado, error)
+
+            if not validas:
+                continue
+
+            try:
+                importadas, errores = self._insertar(db, modelo, validas)
+                db.commit()
+                resultado.filas_importadas += importadas
+                for error in errores:
+                    self._registrar_error(resultado, error)
+            except Exception as e:
+                db.rollback()
+                mensaje = f"Error de base de datos en el lote: {str(e)[:300]}"
+                for numero, _datos in validas:
+                    self._registrar_error(
+                        resultado, ErrorFilaImportacion(fila=numero, errores=[mensaje])
+                    )
+
+        if resultado.filas_importadas:
+            self._actualizar_estadisticas(db, modelo.__tablename__)
+
+        return resultado
+
+    def _insertar(
+        self,
+        db: Session,
+        modelo: type,
+        filas: List[Tuple[int, Dict]]
+    ) -> Tuple[int, List[ErrorFilaImportacion]]:
+        """
+        INSERT multi-fila bajo SAVEPOINT. Si falla (duplicado, dato fuera
+        de rango, ...) divide las filas en mitades y reintenta cada una,
+        hasta que solo las filas que fallan solas quedan como error:
+        O(k log n) INSERTs para k filas malas. El caller hace commit.
+
+        Returns:
+            (filas insertadas, errores por fila)
+        """
+        try:
+            with db.begin_nested():
+                db.execute(insert(modelo), [datos for _numero, datos in filas])
+            return len(filas), []
+        except DBAPIError as e:
+            if len(filas) == 1:
+                detalle = str(e.orig).strip().splitlines()[0] if e.orig else str(e)
+                return 0, [ErrorFilaImportacion(
+                    fila=filas[0][0],
+                    errores=[f"Error de base de datos: {detalle[:300]}"]
+                )]
+
+        mitad = len(filas) // 2
+        primeras, errores_primeras = self._insertar(db, modelo, filas[:mitad])
+        restantes, errores_restantes = self._insertar(db, modelo, filas[mitad:])
+        return primeras + restantes, errores_primeras + errores_restantes
+
+    def _hasta_error_de_lectura(
+        self,
+        filas: Iterable[FilaArchivo],
+        resultado: ResultadoImportacion
+    ) -> Iterator[FilaArchivo]:
+        """
+        Entrega las filas hasta que el lector falla. Un error antes de la
+        primera fila (encabezados, encoding) se propaga: el archivo se
+        rechaza completo. Después, el error se registra en la fila
+        siguiente a la última leída y la lectura se detiene, para que el
+        resultado parcial (y el barrido de conflictos) refleje lo importado.
+        """
+        ultima = None
+        try:
+            for ultima, fila in filas:
+                yield ultima, fila
+        except (UnicodeDecodeError, csv.Error, FormatoImportacionInvalido) as e:
+            if ultima is None:
+                raise
+            if isinstance(e, UnicodeDecodeError):
+                mensaje = "El archivo CSV debe estar codificado en UTF-8; la importación se detuvo en esta fila"
+            else:
+                mensaje = f"Archivo ilegible desde esta fila; la importación se detuvo: {str(e)[:300]}"
+            resultado.lectura_interrumpida = True
+            self._registrar_error(resultado, ErrorFilaImportacion(fila=ultima + 1, errores=[mensaje]))
+
+    def _en_lotes(self, filas: Iterable[FilaArchivo]) -> Iterator[List[FilaArchivo]]:
+        """Agrupa el iterador de filas en listas de chunk_size."""
+        lote: List[FilaArchivo] = []
+        for fila in filas:
+            lote.append(fila)
+            if len(lote) >= self.chunk_size:
+                yield lote
+                lote = []
+        if lote:
+            yield lote
+
+    def _registrar_error(self, resultado: ResultadoImportacion, error: ErrorFilaImportacion):
+        """Cuenta el error y lo agrega al reporte hasta el límite configurado."""
+        resultado.filas_con_error += 1
+        if len(resultado.errores) < self.max_errors:
+            resultado.errores.append(error)
+        else:
+            resultado.errores_truncados = True
+
+    def _actualizar_estadisticas(self, db: Session, tabla: str):
+        """
+        ANALYZE una sola vez al final para que el planificador use los
+        índices de búsqueda de conflictos con las estadísticas nuevas.
+        """
+        try:
+            db.execute(text(f"ANALYZE {tabla}"))
+            db.commit()
+        except Exception as e:
+            db.rollback()
+            print(f"⚠️  ANALYZE {tabla} failed after import: {e}")
+
+    # ------------------------------------------------------------------
+    # Validación y resolución de llaves foráneas por entidad
+    # ------------------------------------------------------------------
+
+    def _validar(
+        self,
+        schema: type,
+        numero: int,
+        datos: Dict[str, Any]
+    ) -> Tuple[Optional[BaseModel], Optional[ErrorFilaImportacion]]:
+        """Valida una fila con un schema Pydantic."""
+        try:
+            return schema(**datos), None
+        except ValidationError as e:
+            mensajes = [
+                f"{'.'.join(str(p) for p in err['loc'])}: {err['msg']}"
+                for err in e.errors()
+            ]
+            return None, ErrorFilaImportacion(fila=numero, errores=mensajes)
+
+    def _preparar_clientes(
+        self,
+        db: Session,
+        firm_id: int,
+        lote: List[FilaArchivo]
+    ) -> Tuple[List[Tuple[int, Dict]], List[ErrorFilaImportacion]]:
+        """Valida clientes del lote y asigna firma_id."""
+        validas, errores = [], []
+
+        for numero, fila in lote:
+            obj, error = self._validar(ClienteCreate, numero, fila)
+            if error:
+                errores.append(error)
+                continue
+            datos = obj.model_dump(exclude_none=True)
+            datos["firma_id"] = firm_id
+            validas.append((numero, datos))
+
+        return validas, errores
+
+    def _preparar_asuntos(
+        self,
+        db: Session,
+        firm_id: int,
+        lote: List[FilaArchivo]
+    ) -> Tuple[List[Tuple[int, Dict]], List[ErrorFilaImportacion]]:
+        """Resuelve cliente_id (directo o por email) en dos consultas por lote."""
+        ids = {self._entero(f.get("cliente_id")) for _n, f in lote} - {None}
+        emails = {
+            str(f["cliente_email"]).lower()
+            for _n, f in lote
+            if self._entero(f.get("cliente_id")) is None and f.get("cliente_email")
+        }
+
+        ids_validos = set()
+        if ids:
+            ids_validos = {
+                row[0] for row in db.query(Cliente.id).filter(
+                    Cliente.id.in_(ids),
+                    Cliente.firma_id == firm_id,
+                    Cliente.esta_activo == True
+                )
+            }
+
+        por_email: Dict[str, List[int]] = {}
+        if emails:
+            for email, cliente_id in db.query(func.lower(Cliente.email), Cliente.id).filter(
+                func.lower(Cliente.email).in_(emails),
+                Cliente.firma_id == firm_id,
+                Cliente.esta_activo == True
+            ):
+                por_email.setdefault(email, []).append(cliente_id)
+
+        validas, errores = [], []
+
+        for numero, fila in lote:
+            cliente_id = self._entero(fila.get("cliente_id"))
+            if cliente_id is not None:
+                if cliente_id not in ids_validos:
+                    errores.append(ErrorFilaImportacion(fila=numero, errores=["cliente_id: Cliente no encontrado"]))
+                    continue
+            else:
+                email = str(fila.get("cliente_email") or "").lower()
+                candidatos = por_email.get(email, [])
+                if not email:
+                    errores.append(ErrorFilaImportacion(fila=numero, errores=["Se requiere cliente_id o cliente_email"]))
+                    continue
+                if len(candidatos) != 1:
+                    detalle = "no encontrado" if not candidatos else "ambiguo (varios clientes con ese email)"
+                    errores.append(ErrorFilaImportacion(fila=numero, errores=[f"cliente_email: Cliente {detalle}"]))
+                    continue
+                cliente_id = candidatos[0]
+
+            obj, error = self._validar(AsuntoCreate, numero, {**fila, "cliente_id": cliente_id})
+            if error:
+                errores.append(error)
+                continue
+            validas.append((numero, obj.model_dump(exclude_none=True)))
+
+        return validas, errores
+
+    def _preparar_partes(
+        self,
+        db: Session,
+        firm_id: int,
+        lote: List[FilaArchivo]
+    ) -> Tuple[List[Tuple[int, Dict]], List[ErrorFilaImportacion]]:
+        """Resuelve asunto_id (directo o por cliente_email + nombre_asunto) por lote."""
+        ids = {self._entero(f.get("asunto_id")) for _n, f in lote} - {None}
+        claves = {
+            (str(f["cliente_email"]).lower(), str(f["nombre_asunto"]))
+            for _n, f in lote
+            if self._entero(f.get("asunto_id")) is None
+            and f.get("cliente_email") and f.get("nombre_asunto")
+        }
+
+        ids_validos = set()
+        if ids:
+            ids_validos = {
+                row[0] for row in db.query(Asunto.id)
+                .join(Cliente, Asunto.cliente_id == Cliente.id)
+                .filter(
+                    Asunto.id.in_(ids),
+                    Cliente.firma_id == firm_id,
+                    Asunto.esta_activo == True
+                )
+            }
+
+        por_clave: Dict[Tuple[str, str], List[int]] = {}
+        if claves:
+            emails = {email for email, _nombre in claves}
+            nombres = {nombre for _email, nombre in claves}
+            for email, nombre, asunto_id in (
+                db.query(func.lower(Cliente.email), Asunto.nombre_asunto, Asunto.id)
+                .join(Cliente, Asunto.cliente_id == Cliente.id)
+                .filter(
+                    Cliente.firma_id == firm_id,
+                    Cliente.esta_activo == True,
+                    Asunto.esta_activo == True,
+                    func.lower(Cliente.email).in_(emails),
+                    Asunto.nombre_asunto.in_(nombres)
+                )
+            ):
+                por_clave.setdefault((email, nombre), []).append(asunto_id)
+
+        validas, errores = [], []
+
+        for numero, fila in lote:
+            asunto_id = self._entero(fila.get("asunto_id"))
+            if asunto_id is not None:
+                if asunto_id not in ids_validos:
+                    errores.append(ErrorFilaImportacion(fila=numero, errores=["asunto_id: Asunto no encontrado"]))
+                    continue
+            else:
+                if not (fila.get("cliente_email") and fila.get("nombre_asunto")):
+                    errores.append(ErrorFilaImportacion(
+                        fila=numero,
+                        errores=["Se requiere asunto_id o cliente_email + nombre_asunto"]
+                    ))
+                    continue
+                candidatos = por_clave.get(
+                    (str(fila["cliente_email"]).lower(), str(fila["nombre_asunto"])), []
+                )
+                if len(candidatos) != 1:
+                    detalle = "no encontrado" if not candidatos else "ambiguo (varios asuntos con ese nombre)"
+                    errores.append(ErrorFilaImportacion(fila=numero, errores=[f"nombre_asunto: Asunto {detalle}"]))
+                    continue
+                asunto_id = candidatos[0]
+
+            obj, error = self._validar(ParteRelacionadaCreate, numero, {**fila, "asunto_id": asunto_id})
+            if error:
+                errores.append(error)
+                continue
+            validas.append((numero, obj.model_dump(exclude_none=True)))
+
+        return validas, errores
+
+    def _entero(self, valor: Any) -> Optional[int]:
+        """Convierte IDs de celdas (str/float/int) a int; None si no aplica."""
+        if valor is None:
+            return None
+        try:
+            return int(float(valor))
+        except (TypeError, ValueError):
+            return None
+
+
+# Singleton instance
+bulk_importer = BulkImporter()
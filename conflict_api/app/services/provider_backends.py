@@ -0,0 +1,182 @@
+"""
+Backends locales de los proveedores externos (SendGrid, Twilio, OpenAI)
+para pruebas de carga y benchmarks sin tocar los servicios reales.
+
+Cada servicio elige su backend por configuración (email_backend,
+sms_backend, llm_backend):
+- real: el proveedor real (default)
+- sink: los requests van al sink HTTP local (scripts/provider_sink.py)
+  con el mismo path; la latencia es la de una red real
+- mock: se responden en proceso, con latencia simulada y una fracción
+  configurable de errores (500) y throttling (429)
+
+El reemplazo ocurre en el transporte HTTP: batching, rate limiting,
+reintentos, métricas y logs de los servicios corren igual que en producción.
+"""
+
+import json
+import random
+import time
+import uuid
+from typing import Dict, Optional, Tuple
+from urllib.parse import parse_qs, urlsplit, urlunsplit
+
+import httpx
+import requests
+from requests.adapters import BaseAdapter, HTTPAdapter
+from requests.structures import CaseInsensitiveDict
+
+from app.config import get_settings
+
+settings = get_settings()
+
+# Respuesta simulada: (status, headers, body)
+Respuesta = Tuple[int, Dict[str, str], bytes]
+
+
+def _json(status: int, datos: Dict, headers: Optional[Dict[str, str]] = None) -> Respuesta:
+    return status, {"Content-Type": "application/json", **(headers or {})}, json.dumps(datos).encode("utf-8")
+
+
+def _respuesta_sendgrid(body: bytes) -> Respuesta:
+    """POST /v3/mail/send: 202 sin body, con X-Message-Id."""
+    return 202, {"X-Message-Id": uuid.uuid4().hex}, b""
+
+
+def _respuesta_twilio(body: bytes) -> Respuesta:
+    """POST /2010-04-01/Accounts/{sid}/Messages.json: el Message creado."""
+    form = {k: v[0] for k, v in parse_qs(body.decode("utf-8")).items()}
+    return _json(201, {
+        "sid": f"SM{uuid.uuid4().hex}",
+        "status": "queued",
+        "to": form.get("To"),
+        "from": form.get("From"),
+        "body": form.get("Body"),
+        "num_segments": "1",
+        "direction": "outbound-api"
+    })
+
+
+def _respuesta_openai(body: bytes) -> Respuesta:
+    """POST /v1/chat/completions: una completion con texto fijo."""
+    request = json.loads(body or b"{}")
+    prompt_tokens = sum(len(m.get("content") or "") for m in request.get("messages", [])) // 4
+    contenido = "Carta de renuncia de representación generada por el backend simulado."
+    return _json(200, {
+        "id": f"chatcmpl-{uuid.uuid4().hex}",
+        "object": "chat.completion",
+        "created": int(time.time()),
+        "model": request.get("model", "mock"),
+        "choices": [{
+            "index": 0,
+            "message": {"role": "assistant", "content": contenido},
+            "finish_reason": "stop"
+        }],
+        "usage": {
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": len(contenido) // 4,
+            "total_tokens": prompt_tokens + len(contenido) // 4
+        }
+    })
+
+
+def responder(
+    path: str,
+    body: bytes,
+    latencia_ms: float = 0,
+    error_rate: float = 0,
+    throttle_rate: float = 0
+) -> Respuesta:
+    """
+    Respuesta simulada del proveedor según el path del request, después
+    de la latencia simulada (media latencia_ms, desviación provider_mock_jitter).
+    Usado por el backend mock y por el sink HTTP.
+    """
+    if latencia_ms > 0:
+        time.sleep(max(0.0, random.gauss(latencia_ms, latencia_ms * settings.provider_mock_jitter)) / 1000)
+
+    sorteo = random.random()
+    if sorteo < throttle_rate:
+        return _json(429, {"code": 20429, "message": "Too Many Requests (simulated)", "status": 429})
+    if sorteo < throttle_rate + error_rate:
+        return _json(500, {"code": 20500, "message": "Internal Server Error (simulated)", "status": 500})
+
+    if path.endswith("/mail/send"):
+        return _respuesta_sendgrid(body)
+    if path.endswith("/Messages.json"):
+        return _respuesta_twilio(body)
+    if path.endswith("/chat/completions"):
+        return _respuesta_openai(body)
+    return _json(404, {"message": f"Unknown provider path: {path}"})
+
+
+class MockAdapter(BaseAdapter):
+    """Adapter de requests que responde en proceso (backend mock), sin red."""
+
+    def __init__(self, latencia_ms: float):
+        super().__init__()
+        self.latencia_ms = latencia_ms
+
+    def send(self, request, **kwargs):
+        body = request.body or b""
+        if isinstance(body, str):
+            body = body.encode("utf-8")
+
+        status, headers, contenido = responder(
+            urlsplit(request.url).path, body, self.latencia_ms,
+            settings.provider_mock_error_rate, settings.provider_mock_throttle_rate
+        )
+
+        response = requests.Response()
+        response.status_code = status
+        response.headers = CaseInsensitiveDict(headers)
+        response._content = contenido
+        response.encoding = "utf-8"
+        response.url = request.url
+        response.request = request
+        return response
+
+    def close(self):
+        pass
+
+
+class SinkAdapter(HTTPAdapter):
+    """Adapter de requests que envía cada request al sink local, mismo path."""
+
+    def __init__(self, sink_url: str, **kwargs):
+        super().__init__(**kwargs)
+        self.sink = urlsplit(sink_url)
+
+    def send(self, request, **kwargs):
+        partes = urlsplit(request.url)
+        request.url = urlunsplit((self.sink.scheme, self.sink.netloc, partes.path, partes.query, ""))
+        return super().send(request, **kwargs)
+
+
+def montar_backend(session: requests.Session, backend: str, pool_maxsize: int = 10):
+    """
+    Monta en la sesión HTTP de un servicio el adapter de su backend
+    (no hace nada con backend "real").
+    """
+    if backend == "mock":
+        session.mount("https://", MockAdapter(settings.provider_mock_latency_ms))
+    elif backend == "sink":
+        session.mount("https://", SinkAdapter(
+            settings.provider_sink_url, pool_connections=1, pool_maxsize=max(1, pool_maxsize)
+        ))
+
+
+def openai_kwargs(backend: str) -> Dict:
+    """Argumentos extra del cliente de OpenAI para el backend (vacío = real)."""
+    if backend == "sink":
+        return {"base_url": f"{settings.provider_sink_url.rstrip('/')}/v1"}
+    if backend == "mock":
+        def handler(request: httpx.Request) -> httpx.Response:
+            status, headers, contenido = responder(
+                request.url.path, request.content, settings.provider_mock_llm_latency_ms,
+                settings.provider_mock_error_rate, settings.provider_mock_throttle_rate
+            )
+            return httpx.Response(status, headers=headers, content=contenido)
+
+        return {"http_client": httpx.Client(transport=httpx.MockTransport(handler))}
+    return {}
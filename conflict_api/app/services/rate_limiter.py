@@ -0,0 +1,129 @@
+"""
+Rate limiters (token bucket) compartidos por los servicios de envío.
+
+RateLimiter limita un proceso. SharedRateLimiter limita a todos los
+procesos (workers de gunicorn, réplicas) que envían por el mismo
+emisor: la cuota vive en una fila de billing_rate_limits en PostgreSQL.
+"""
+
+import threading
+import time
+from typing import Optional
+
+from sqlalchemy import text
+
+from app.config import get_settings
+from app.database import engine
+
+settings = get_settings()
+
+
+class RateLimiter:
+    """
+    Token bucket seguro entre threads: hasta `rate` adquisiciones por
+    segundo con ráfagas de hasta `burst`. rate <= 0 desactiva el límite.
+    """
+
+    def __init__(self, rate: float, burst: Optional[int] = None):
+        self.rate = rate
+        self.capacidad = float(burst or max(1, int(rate)))
+        self._tokens = self.capacidad
+        self._ultimo = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """Bloquea hasta que haya un token disponible."""
+        if self.rate <= 0:
+            return
+
+        while True:
+            with self._lock:
+                ahora = time.monotonic()
+                self._tokens = min(self.capacidad, self._tokens + (ahora - self._ultimo) * self.rate)
+                self._ultimo = ahora
+
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                espera = (1 - self._tokens) / self.rate
+
+            time.sleep(espera)
+
+
+# Turno = max(siguiente, ahora - ráfaga); siguiente avanza un intervalo.
+# El lock de la fila serializa a los procesos; RETURNING ve la fila nueva.
+_SQL_RESERVAR = text("""
+    UPDATE billing_rate_limits
+    SET siguiente = GREATEST(siguiente, clock_timestamp() - make_interval(secs => :rafaga))
+        + make_interval(secs => :intervalo)
+    WHERE nombre = :nombre
+    RETURNING EXTRACT(EPOCH FROM (
+        siguiente - make_interval(secs => :intervalo) - clock_timestamp()
+    ))
+""")
+
+
+class SharedRateLimiter:
+    """
+    Token bucket entre procesos (GCRA): la fila `nombre` de
+    billing_rate_limits guarda el instante del próximo turno libre. Cada
+    acquire() reserva un turno con un UPDATE atómico (un round-trip) y
+    duerme hasta que llegue; con varios procesos los turnos se reparten
+    sin exceder `rate` en total. Las ráfagas de hasta `burst` se permiten
+    si el bucket estuvo ocioso.
+
+    Sin PostgreSQL (o sin la tabla) degrada a un RateLimiter del proceso.
+    """
+
+    def __init__(self, nombre: str, rate: float, burst: Optional[int] = None, backend: Optional[str] = None):
+        self.nombre = nombre
+        self.rate = rate
+        self.capacidad = burst or max(1, int(rate))
+
+        backend = backend or settings.billing_rate_limit_backend
+        if backend == "auto":
+            backend = "postgres" if engine.dialect.name == "postgresql" else "local"
+        self.backend = backend
+
+        self._local = RateLimiter(rate, burst)
+
+    def acquire(self):
+        """Bloquea hasta el turno reservado en el bucket compartido."""
+        if self.rate <= 0:
+            return
+        if self.backend != "postgres":
+            self._local.acquire()
+            return
+
+        try:
+            espera = self._reservar()
+        except Exception as e:
+            # Sin la fila compartida el límite sigue aplicando por proceso
+            print(f"⚠️  Shared rate limit {self.nombre} unavailable, using per-process limit: {e}")
+            self._local.acquire()
+            return
+
+        if espera > 0:
+            time.sleep(espera)
+
+    def _reservar(self) -> float:
+        """Reserva el próximo turno y retorna los segundos a esperar."""
+        intervalo = 1.0 / self.rate
+        params = {
+            "nombre": self.nombre,
+            "intervalo": intervalo,
+            "rafaga": (self.capacidad - 1) * intervalo
+        }
+
+        with engine.begin() as conn:
+            espera = conn.execute(_SQL_RESERVAR, params).scalar()
+            if espera is None:
+                # Primer uso del emisor: crear la fila y reservar de nuevo
+                conn.execute(text("""
+                    INSERT INTO billing_rate_limits (nombre, siguiente)
+                    VALUES (:nombre, clock_timestamp())
+                    ON CONFLICT (nombre) DO NOTHING
+                """), {"nombre": self.nombre})
+                espera = conn.execute(_SQL_RESERVAR, params).scalar()
+
+        return float(espera or 0)
@@ -1,11 +1,36 @@
 """
 Servicio de SMS usando Twilio para recordatorios de facturación.
+
+Los mensajes salen por un pool de conexiones HTTP persistente (keep-alive)
+y pasan por un token bucket a la tasa (MPS) del número emisor, de modo que
+una corrida grande envía al máximo que permite Twilio sin provocar 429.
+Si aun así Twilio responde 429, el mensaje se reintenta con backoff.
 """
 
 import os
-from typing import Dict
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List
+from requests.adapters import HTTPAdapter
+from twilio.base.exceptions import TwilioRestException
+from twilio.http.http_client import TwilioHttpClient
 from twilio.rest import Client
 
+from app.config import get_settings
+from app.metrics import registry
+from app.services.provider_backends import montar_backend
+from app.services.rate_limiter import SharedRateLimiter
+
+settings = get_settings()
+
+NOTIFICATION_SEND_DURATION = registry.histogram(
+    "notification_send_duration_seconds", "Latencia de envío a proveedores de email/SMS (segundos)",
+    ["channel", "status"]
+)
+SMS_THROTTLED_TOTAL = registry.counter(
+    "sms_throttled_total", "Respuestas 429 de Twilio (mensaje reintentado o fallido)"
+)
+
 
 class TwilioSMSService:
     """
@@ -18,15 +43,59 @@ class TwilioSMSService:
         self.auth_token = os.getenv("TWILIO_AUTH_TOKEN")
         self.from_number = os.getenv("TWILIO_FROM_NUMBER")
         
+        # Backend local (sink / mock): no requiere credenciales reales
+        self.backend = settings.sms_backend
+        if self.backend != "real":
+            self.account_sid = self.account_sid or f"AC{'0' * 32}"
+            self.auth_token = self.auth_token or self.backend
+            self.from_number = self.from_number or "+15005550006"
+            print(f"Twilio backend: {self.backend}")
+        
+        # Twilio limita el throughput por número emisor: un solo bucket,
+        # compartido entre procesos, para todos los mensajes de from_number
+        self.rate_limiter = SharedRateLimiter(
+            f"twilio_sms:{self.from_number}", settings.billing_sms_rate_per_second
+        )
+        
+        # Status callback de entrega (webhook /billing/webhooks/twilio)
+        self.status_callback = None
+        if settings.billing_webhook_base_url:
+            self.status_callback = (
+                f"{settings.billing_webhook_base_url.rstrip('/')}"
+                f"/api/{settings.api_version}/billing/webhooks/twilio"
+            )
+        
         self.client = None
         if self.account_sid and self.auth_token:
             try:
-                self.client = Client(self.account_sid, self.auth_token)
+                self.client = Client(
+                    self.account_sid, self.auth_token,
+                    http_client=self._create_http_client()
+                )
             except Exception as e:
                 print(f"⚠️  Failed to initialize Twilio client: {e}")
         else:
             print("⚠️  TWILIO credentials not configured - SMS features disabled")
     
+    def _create_http_client(self) -> TwilioHttpClient:
+        """
+        Cliente HTTP con una sesión persistente y un pool de conexiones del
+        tamaño de la concurrencia de SMS (una conexión por envío en vuelo).
+        Reintenta solo errores de conexión: un POST que llegó a Twilio no
+        se reenvía (duplicaría el SMS).
+        """
+        http_client = TwilioHttpClient(
+            pool_connections=True,
+            timeout=settings.twilio_timeout_seconds
+        )
+        http_client.session.mount("https://", HTTPAdapter(
+            pool_connections=1,
+            pool_maxsize=max(1, settings.billing_sms_max_concurrency),
+            max_retries=2
+        ))
+        montar_backend(http_client.session, self.backend, settings.billing_sms_max_concurrency)
+        return http_client
+    
     def send_payment_reminder_sms(
         self,
         to_phone: str,
@@ -53,11 +122,6 @@ class TwilioSMSService:
         if not self.client:
             return {"success": False, "error": "Twilio not configured"}
         
-        # Asegurar formato correcto del número
-        if not to_phone.startswith('+'):
-            # Asumir Puerto Rico (+1 787/939)
-            to_phone = f"+1{to_phone.replace('-', '').replace(' ', '')}"
-        
         # Seleccionar mensaje según nivel
         if reminder_level == 1:
             message = self._get_first_reminder_message(
@@ -74,13 +138,38 @@ class TwilioSMSService:
         else:
             message = f"Professional Hubs: Factura #{invoice_number} vencida. Contacte billing@professionalhubs.com"
         
+        return self._send(message, to_phone)
+    
+    def send_payment_reminders_sms_batch(self, reminders: List[Dict]) -> List[Dict]:
+        """
+        Envía varios recordatorios en paralelo (hasta billing_sms_max_concurrency
+        a la vez, al MPS del número emisor).
+        
+        Args:
+            reminders: Lista de dicts con los argumentos de
+                send_payment_reminder_sms (to_phone, client_name, ...)
+        
+        Returns:
+            Un dict de resultado por recordatorio, en el mismo orden
+        """
+        if not reminders:
+            return []
+        if not self.client:
+            return [{"success": False, "error": "Twilio not configured"} for _ in reminders]
+        
+        workers = min(max(1, settings.billing_sms_max_concurrency), len(reminders))
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="twilio-sms") as pool:
+            return list(pool.map(lambda reminder: self.send_payment_reminder_sms(**reminder), reminders))
+    
+    def _send(self, body: str, to_phone: str) -> Dict:
+        """Envía un SMS y lo traduce al dict de resultado del servicio."""
+        # Asegurar formato correcto del número
+        if not to_phone.startswith('+'):
+            # Asumir Puerto Rico (+1 787/939)
+            to_phone = f"+1{to_phone.replace('-', '').replace(' ', '')}"
+        
         try:
-            # Enviar SMS
-            message_obj = self.client.messages.create(
-                body=message,
-                from_=self.from_number,
-                to=to_phone
-            )
+            message_obj = self._create_message(body, to_phone)
             
             return {
                 "success": True,
@@ -96,6 +185,43 @@ class TwilioSMSService:
                 "to": to_phone
             }
     
+    def _create_message(self, body: str, to_phone: str):
+        """
+        Envía el mensaje por la API de Twilio (respetando el MPS del número
+        emisor) midiendo la latencia. Ante un 429 espera con backoff
+        exponencial y reintenta hasta twilio_max_retries veces.
+        """
+        intento = 0
+        while True:
+            self.rate_limiter.acquire()
+            
+            inicio = time.perf_counter()
+            send_status = "error"
+            try:
+                extra = {"status_callback": self.status_callback} if self.status_callback else {}
+                message_obj = self.client.messages.create(
+                    body=body,
+                    from_=self.from_number,
+                    to=to_phone,
+                    **extra
+                )
+                send_status = "success"
+                return message_obj
+            except TwilioRestException as e:
+                if e.status != 429:
+                    raise
+                SMS_THROTTLED_TOTAL.inc()
+                if intento >= settings.twilio_max_retries:
+                    raise
+                send_status = "throttled"
+            finally:
+                NOTIFICATION_SEND_DURATION.observe(
+                    time.perf_counter() - inicio, channel="sms", status=send_status
+                )
+            
+            time.sleep(settings.twilio_retry_backoff_seconds * (2 ** intento))
+            intento += 1
+    
     def _get_first_reminder_message(
         self, client_name, invoice_number, amount_due, days_overdue
     ) -> str:
@@ -141,30 +267,7 @@ class TwilioSMSService:
         if not self.client:
             return {"success": False, "error": "Twilio not configured"}
         
-        # Asegurar formato correcto del número
-        if not to_phone.startswith('+'):
-            to_phone = f"+1{to_phone.replace('-', '').replace(' ', '')}"
-        
-        try:
-            message_obj = self.client.messages.create(
-                body=message,
-                from_=self.from_number,
-                to=to_phone
-            )
-            
-            return {
-                "success": True,
-                "message_sid": message_obj.sid,
-                "status": message_obj.status,
-                "to": to_phone
-            }
-        
-        except Exception as e:
-            return {
-                "success": False,
-                "error": f"Failed to send SMS: {str(e)}",
-                "to": to_phone
-            }
+        return self._send(message, to_phone)
 
 
 # Singleton instance
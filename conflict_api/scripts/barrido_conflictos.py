@@ -0,0 +1,47 @@
+"""
+Script para ejecutar el barrido de conflictos de un bufete.
+Pensado para cron / ejecución periódica. Reanuda automáticamente
+un barrido inconcluso desde su último checkpoint.
+
+Ejecutar: python -m scripts.barrido_conflictos --firma 1
+"""
+
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import argparse
+
+from app.database import SessionLocal
+from app.models.barrido_conflictos import EstadoBarrido
+from app.services.barrido_conflictos import conflict_sweeper
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Barrido de conflictos a nivel de bufete")
+    parser.add_argument("--firma", type=int, required=True, help="ID del bufete")
+    args = parser.parse_args()
+
+    db = SessionLocal()
+
+    try:
+        barrido = conflict_sweeper.crear_o_reanudar(db, args.firma)
+        print(f"Barrido {barrido.id} (desde cliente_id > {barrido.ultimo_cliente_id})")
+
+        barrido = conflict_sweeper.ejecutar_barrido(db, barrido.id)
+        if barrido is None:
+            return 1
+
+        print(f"Estado: {barrido.estado}")
+        print(f"Clientes procesados: {barrido.clientes_procesados}")
+        print(f"Pares evaluados: {barrido.pares_evaluados}")
+        print(f"Coincidencias: {barrido.coincidencias_encontradas}")
+
+        return 0 if barrido.estado == EstadoBarrido.COMPLETADO else 1
+
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,58 @@
+"""
+Worker dedicado del outbox de envíos de cobro.
+
+Además del job del scheduler en cada instancia de la API, se pueden
+correr cuantos workers se quiera en paralelo: cada lote se reclama con
+FOR UPDATE SKIP LOCKED, así que dos workers nunca envían la misma fila.
+
+Ejecutar: python -m scripts.billing_outbox_worker
+          python -m scripts.billing_outbox_worker --once
+"""
+
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import argparse
+import time
+
+from app.config import get_settings
+from app.database import SessionLocal
+from app.services.billing_communication.outbox_worker import billing_outbox_worker
+
+settings = get_settings()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Worker del outbox de facturación")
+    parser.add_argument("--once", action="store_true", help="Procesar lo pendiente y salir")
+    parser.add_argument(
+        "--poll", type=float, default=settings.billing_outbox_poll_seconds,
+        help=f"Segundos entre sondeos cuando no hay trabajo (default: {settings.billing_outbox_poll_seconds})"
+    )
+    args = parser.parse_args()
+
+    while True:
+        db = SessionLocal()
+        try:
+            procesadas = billing_outbox_worker.procesar_pendientes(db)
+            if procesadas:
+                print(f"Billing outbox: {procesadas} sends processed")
+        except Exception as e:
+            db.rollback()
+            print(f"⚠️  Error dispatching billing outbox: {e}")
+            if args.once:
+                return 1
+        finally:
+            db.close()
+
+        if args.once:
+            return 0
+        time.sleep(args.poll)
+
+
+if __name__ == "__main__":
+    try:
+        sys.exit(main())
+    except KeyboardInterrupt:
+        sys.exit(0)
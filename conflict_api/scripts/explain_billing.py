@@ -0,0 +1,134 @@
+"""
+Script para verificar que las queries de facturación usan los índices
+parciales de invoices (migración 006).
+
+Siembra un bufete de prueba con facturas (mayoría pagadas) dentro de una
+transacción, ejecuta ANALYZE y EXPLAIN (FORMAT JSON) sobre el listado de
+facturas vencidas, y falla si el plan no usa el índice esperado. Al final
+hace rollback: no deja datos en la base.
+
+Requiere PostgreSQL con las migraciones aplicadas.
+
+Ejecutar: python -m scripts.explain_billing
+          python -m scripts.explain_billing --clientes 500 --facturas 200000 --verbose
+"""
+
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import argparse
+import json
+from typing import Iterator
+
+from sqlalchemy import text
+
+from app.database import engine
+from app.routers.billing import consulta_facturas_vencidas
+
+
+# (descripción, orden, con_max_days, parámetros, índices aceptados)
+CHECKS = [
+    (
+        "Facturas vencidas (todas)", "days_overdue", False, {"min_days": 0},
+        {"ix_invoices_pending_client_due", "ix_invoices_pending_due"}
+    ),
+    (
+        "Facturas vencidas 30-59 días", "amount", True, {"min_days": 30, "max_days": 59},
+        {"ix_invoices_pending_client_due", "ix_invoices_pending_due"}
+    ),
+    (
+        "Danger zone (60+ días)", "last_communication", False, {"min_days": 60},
+        {"ix_invoices_pending_client_due", "ix_invoices_pending_due"}
+    ),
+]
+
+
+def indices_del_plan(nodo: dict) -> Iterator[str]:
+    """Nombres de índice usados en un nodo del plan y sus hijos."""
+    if "Index Name" in nodo:
+        yield nodo["Index Name"]
+    for hijo in nodo.get("Plans", []):
+        yield from indices_del_plan(hijo)
+
+
+def sembrar(conn, clientes: int, facturas: int) -> int:
+    """Crea un bufete con clientes y facturas (5% pendientes). Retorna firm_id."""
+    firm_id = conn.execute(text("""
+        INSERT INTO firmas (nombre, esta_activo, creado_en, actualizado_en)
+        VALUES ('EXPLAIN billing', true, now(), now())
+        RETURNING id
+    """)).scalar()
+
+    conn.execute(text("""
+        INSERT INTO clientes (
+            firma_id, nombre, apellido, email, telefono, direccion,
+            has_late_invoices, has_potential_conflict, esta_activo, creado_en, actualizado_en
+        )
+        SELECT :firm_id, 'Cliente', 'Explain ' || g, 'explain' || g || '@example.com',
+               '787-555-0000', 'San Juan', false, false, true, now(), now()
+        FROM generate_series(1, :clientes) g
+    """), {"firm_id": firm_id, "clientes": clientes})
+
+    conn.execute(text("""
+        INSERT INTO invoices (client_id, invoice_number, amount, due_date, status, esta_activo)
+        SELECT c.ids[1 + (g % array_length(c.ids, 1))],
+               'EXPLAIN-' || :firm_id || '-' || g,
+               100 + (g % 900),
+               CURRENT_DATE - (g % 120),
+               CASE WHEN g % 20 = 0 THEN 'pending' ELSE 'paid' END,
+               true
+        FROM generate_series(1, :facturas) g,
+             (SELECT array_agg(id) AS ids FROM clientes WHERE firma_id = :firm_id) c
+    """), {"firm_id": firm_id, "facturas": facturas})
+
+    conn.execute(text("ANALYZE clientes"))
+    conn.execute(text("ANALYZE invoices"))
+    conn.execute(text("ANALYZE billing_communication_logs"))
+    return firm_id
+
+
+def main():
+    parser = argparse.ArgumentParser(description="EXPLAIN de las queries de facturación")
+    parser.add_argument("--clientes", type=int, default=200, help="Clientes a sembrar (default: 200)")
+    parser.add_argument("--facturas", type=int, default=100000, help="Facturas a sembrar (default: 100000)")
+    parser.add_argument("--verbose", action="store_true", help="Imprimir el plan completo")
+    args = parser.parse_args()
+
+    if engine.dialect.name != "postgresql":
+        print("❌ Este script requiere PostgreSQL")
+        return 1
+
+    fallas = 0
+    with engine.connect() as conn:
+        trans = conn.begin()
+        try:
+            firm_id = sembrar(conn, args.clientes, args.facturas)
+            print(f"Sembrado: bufete {firm_id}, {args.clientes} clientes, {args.facturas} facturas\n")
+
+            for descripcion, orden, con_max_days, params, esperados in CHECKS:
+                query = consulta_facturas_vencidas(orden, con_max_days)
+                params = {"firm_id": firm_id, "skip": 0, "limit": 100, **params}
+
+                plan = conn.execute(
+                    text(f"EXPLAIN (FORMAT JSON) {query.text}"), params
+                ).scalar()
+                if isinstance(plan, str):
+                    plan = json.loads(plan)
+
+                usados = set(indices_del_plan(plan[0]["Plan"]))
+                ok = bool(usados & esperados)
+                fallas += 0 if ok else 1
+
+                print(f"{'✓' if ok else '✗'} {descripcion}: índices {sorted(usados) or 'ninguno'}")
+                if args.verbose or not ok:
+                    print(json.dumps(plan[0]["Plan"], indent=2))
+        finally:
+            trans.rollback()
+
+    print(f"\n{len(CHECKS) - fallas}/{len(CHECKS)} queries usan los índices de invoices")
+    return 1 if fallas else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
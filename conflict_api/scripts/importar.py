@@ -0,0 +1,67 @@
+"""
+Script para importar clientes, asuntos o partes relacionadas desde CSV/XLSX.
+
+Ejecutar: python -m scripts.importar --firma 1 --entidad clientes clientes.csv
+          python -m scripts.importar --firma 1 --entidad asuntos asuntos.xlsx --barrido
+"""
+
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import argparse
+
+from app.database import SessionLocal
+from app.services.importacion import bulk_importer, FormatoImportacionInvalido
+from app.services.barrido_conflictos import conflict_sweeper
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Importación masiva desde CSV/XLSX")
+    parser.add_argument("--firma", type=int, required=True, help="ID del bufete")
+    parser.add_argument(
+        "--entidad", required=True,
+        choices=["clientes", "asuntos", "partes-relacionadas"],
+        help="Tipo de registro a importar"
+    )
+    parser.add_argument("--delimitador", default=",", help="Delimitador CSV (default: ,)")
+    parser.add_argument(
+        "--barrido", action="store_true",
+        help="Ejecutar el barrido de conflictos al terminar"
+    )
+    parser.add_argument("archivo", help="Ruta del archivo .csv o .xlsx")
+    args = parser.parse_args()
+
+    db = SessionLocal()
+
+    try:
+        with open(args.archivo, "rb") as archivo:
+            try:
+                filas = bulk_importer.leer_filas(archivo, args.archivo, args.delimitador)
+                resultado = bulk_importer.importar(db, args.firma, args.entidad, filas)
+            except FormatoImportacionInvalido as e:
+                print(f"❌ {e}")
+                return 1
+
+        print(f"Filas procesadas: {resultado.filas_procesadas}")
+        print(f"Filas importadas: {resultado.filas_importadas}")
+        print(f"Filas con error: {resultado.filas_con_error}")
+        for error in resultado.errores:
+            print(f"  Fila {error.fila}: {'; '.join(error.errores)}")
+        if resultado.errores_truncados:
+            print("  ... (errores adicionales omitidos)")
+
+        if args.barrido and resultado.filas_importadas:
+            barrido = conflict_sweeper.crear_o_reanudar(db, args.firma, nuevo=True)
+            barrido = conflict_sweeper.ejecutar_barrido(db, barrido.id)
+            if barrido is not None:
+                print(f"Barrido {barrido.id}: {barrido.estado} ({barrido.coincidencias_encontradas} coincidencias)")
+
+        return 0 if resultado.filas_con_error == 0 else 1
+
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
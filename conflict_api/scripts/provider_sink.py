@@ -0,0 +1,104 @@
+"""
+Sink HTTP local que reemplaza a SendGrid, Twilio y OpenAI en pruebas de
+carga (backend "sink": email_backend / sms_backend / llm_backend).
+
+Responde como el proveedor según el path (POST /v3/mail/send,
+/2010-04-01/Accounts/{sid}/Messages.json, /v1/chat/completions), con
+latencia y errores simulados opcionales, y cuenta los requests por
+proveedor. GET /stats retorna los conteos; al salir (Ctrl+C) se imprimen.
+
+Ejecutar: python -m scripts.provider_sink
+          python -m scripts.provider_sink --port 8025 --latency-ms 150 --error-rate 0.01
+"""
+
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import argparse
+import json
+import threading
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from app.services.provider_backends import responder
+
+
+def proveedor(path: str) -> str:
+    """Proveedor al que corresponde un path."""
+    if path.endswith("/mail/send"):
+        return "sendgrid"
+    if path.endswith("/Messages.json"):
+        return "twilio"
+    if path.endswith("/chat/completions"):
+        return "openai"
+    return "unknown"
+
+
+def crear_handler(args, conteos: Counter, lock: threading.Lock):
+    class SinkHandler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"  # keep-alive: los pools de los servicios reusan conexiones
+
+        def do_POST(self):
+            body = self.rfile.read(int(self.headers.get("Content-Length") or 0))
+            latencia = args.llm_latency_ms if proveedor(self.path) == "openai" else args.latency_ms
+            status, headers, contenido = responder(
+                self.path.split("?")[0], body, latencia, args.error_rate, args.throttle_rate
+            )
+
+            with lock:
+                conteos[f"{proveedor(self.path)} {status}"] += 1
+
+            self._responder(status, headers, contenido)
+
+        def do_GET(self):
+            if self.path != "/stats":
+                self._responder(404, {}, b"")
+                return
+            with lock:
+                contenido = json.dumps(dict(conteos)).encode("utf-8")
+            self._responder(200, {"Content-Type": "application/json"}, contenido)
+
+        def _responder(self, status, headers, contenido):
+            self.send_response(status)
+            for nombre, valor in headers.items():
+                self.send_header(nombre, valor)
+            self.send_header("Content-Length", str(len(contenido)))
+            self.end_headers()
+            self.wfile.write(contenido)
+
+        def log_message(self, format, *log_args):
+            if args.verbose:
+                super().log_message(format, *log_args)
+
+    return SinkHandler
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Sink HTTP de proveedores (SendGrid / Twilio / OpenAI)")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8025)
+    parser.add_argument("--latency-ms", type=float, default=0, help="Latencia media de email / SMS (default: 0)")
+    parser.add_argument("--llm-latency-ms", type=float, default=0, help="Latencia media de completions (default: 0)")
+    parser.add_argument("--error-rate", type=float, default=0, help="Fracción de respuestas 500")
+    parser.add_argument("--throttle-rate", type=float, default=0, help="Fracción de respuestas 429")
+    parser.add_argument("--verbose", action="store_true", help="Imprimir cada request")
+    args = parser.parse_args()
+
+    conteos: Counter = Counter()
+    server = ThreadingHTTPServer((args.host, args.port), crear_handler(args, conteos, threading.Lock()))
+    server.daemon_threads = True
+
+    print(f"Provider sink listening on http://{args.host}:{args.port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        print(f"\nRequests: {json.dumps(dict(conteos), indent=2)}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
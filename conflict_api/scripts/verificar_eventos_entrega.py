@@ -0,0 +1,131 @@
+"""
+Script para verificar la bandeja de eventos de entrega (billing_delivery_events)
+cuando el callback del proveedor llega antes que el log de comunicación.
+
+Dentro de una transacción: encola un evento "delivered" sin log, aplica la
+bandeja y comprueba que el evento sigue ahí; crea el log, aplica de nuevo
+y comprueba que el log pasó a DELIVERED y el evento salió de la bandeja.
+Por último comprueba que un evento sin log más viejo que
+billing_webhook_event_ttl_seconds se descarta. Al final hace rollback:
+no deja datos en la base.
+
+Requiere PostgreSQL con las migraciones aplicadas.
+
+Ejecutar: python -m scripts.verificar_eventos_entrega
+"""
+
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import uuid
+from datetime import datetime, timedelta
+
+from sqlalchemy import insert, text
+from sqlalchemy.orm import Session
+
+from app.config import get_settings
+from app.database import engine
+from app.models.billing_communication import BillingDeliveryEvent, CommunicationStatus
+from app.services.billing_communication.delivery_events import delivery_events
+
+settings = get_settings()
+
+# Lote grande: la bandeja de la base puede tener otros eventos pendientes
+LOTE = 100000
+
+
+def sembrar_factura(db: Session) -> int:
+    """Crea bufete, cliente y factura de prueba. Retorna invoice_id."""
+    firm_id = db.execute(text("""
+        INSERT INTO firmas (nombre, esta_activo, creado_en, actualizado_en)
+        VALUES ('Verificación eventos de entrega', true, now(), now())
+        RETURNING id
+    """)).scalar()
+    client_id = db.execute(text("""
+        INSERT INTO clientes (
+            firma_id, nombre, apellido, email, telefono, direccion,
+            has_late_invoices, has_potential_conflict, esta_activo, creado_en, actualizado_en
+        )
+        VALUES (:firm_id, 'Cliente', 'Eventos', 'eventos@example.com', '787-555-0000',
+                'San Juan', false, false, true, now(), now())
+        RETURNING id
+    """), {"firm_id": firm_id}).scalar()
+    return db.execute(text("""
+        INSERT INTO invoices (client_id, invoice_number, amount, due_date, status, esta_activo)
+        VALUES (:client_id, 'EVENTOS-1', 100, CURRENT_DATE - 20, 'pending', true)
+        RETURNING id
+    """), {"client_id": client_id}).scalar()
+
+
+def encolar(db: Session, external_id: str, recibido_en: datetime):
+    db.execute(insert(BillingDeliveryEvent), [{
+        "provider": "twilio",
+        "external_id": external_id,
+        "status": CommunicationStatus.DELIVERED,
+        "delivered_at": recibido_en,
+        "recibido_en": recibido_en
+    }])
+
+
+def en_bandeja(db: Session, external_id: str) -> bool:
+    return db.execute(text(
+        "SELECT EXISTS (SELECT 1 FROM billing_delivery_events WHERE external_id = :external_id)"
+    ), {"external_id": external_id}).scalar()
+
+
+def main():
+    if engine.dialect.name != "postgresql":
+        print("❌ Este script requiere PostgreSQL")
+        return 1
+
+    fallas = 0
+
+    def verificar(descripcion: str, ok: bool):
+        nonlocal fallas
+        fallas += 0 if ok else 1
+        print(f"{'✓' if ok else '✗'} {descripcion}")
+
+    with engine.connect() as conn:
+        trans = conn.begin()
+        db = Session(bind=conn, join_transaction_mode="create_savepoint")
+        try:
+            invoice_id = sembrar_factura(db)
+            external_id = f"SMverif{uuid.uuid4().hex}"
+            ahora = datetime.utcnow()
+
+            # 1. El callback llega antes que el log
+            encolar(db, external_id, ahora)
+            delivery_events.aplicar_lote(db, LOTE)
+            verificar("Evento sin log se conserva en la bandeja", en_bandeja(db, external_id))
+
+            # 2. El outbox escribe el log; la siguiente pasada aplica el evento
+            db.execute(text("""
+                INSERT INTO billing_communication_logs (
+                    invoice_id, type, message_body, status, sent_at, external_id,
+                    days_overdue_when_sent, reminder_sequence, esta_activo, creado_en, actualizado_en
+                )
+                VALUES (:invoice_id, 'SMS', 'SMS reminder level 1', 'SENT', now(), :external_id,
+                        20, 1, true, now(), now())
+            """), {"invoice_id": invoice_id, "external_id": external_id})
+            delivery_events.aplicar_lote(db, LOTE)
+            estado = db.execute(text(
+                "SELECT status FROM billing_communication_logs WHERE external_id = :external_id"
+            ), {"external_id": external_id}).scalar()
+            verificar(f"Log actualizado al llegar (status = {estado})", estado == CommunicationStatus.DELIVERED)
+            verificar("Evento aplicado sale de la bandeja", not en_bandeja(db, external_id))
+
+            # 3. Un evento sin log más viejo que el TTL se descarta
+            huerfano = f"SMverif{uuid.uuid4().hex}"
+            encolar(db, huerfano, ahora - timedelta(seconds=settings.billing_webhook_event_ttl_seconds + 60))
+            delivery_events.aplicar_lote(db, LOTE)
+            verificar("Evento sin log vencido se descarta", not en_bandeja(db, huerfano))
+        finally:
+            db.close()
+            trans.rollback()
+
+    return 1 if fallas else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())